@@ -1,6 +1,7 @@
 import streamlit as st, os
-from app_pages import home, custom_urls, search_engine, doc_chat
-from scripts.config import CSS_FILE_PATH
+from app_pages import home, custom_urls, search_engine, doc_chat, admin
+from scripts.config import CSS_FILE_PATH, METRICS_ENABLED, METRICS_PORT, ADMIN_PAGE_ENABLED
+from scripts.metrics import start_metrics_server
 
 # 🎨 Set Streamlit page configuration
 st.set_page_config(page_title="AI Search Engine", page_icon="🔍", layout="wide")
@@ -36,7 +37,14 @@ st.session_state["llm_model"] = available_llms[selected_llm]
 
 # 🏠 Sidebar Navigation
 st.sidebar.markdown('<div class="main-title"><h1>🔍 AI Search Engine</h1></div>', unsafe_allow_html=True)
-page = st.sidebar.radio("📌 **Select Page**", ["🏠 Home", "🔍 Search Engine", "🔗 Custom URL Search", "📄 Chat with Documents"])
+# 📈 Prometheus endpoint, started once per server process
+if METRICS_ENABLED and METRICS_PORT:
+    start_metrics_server()
+
+pages = ["🏠 Home", "🔍 Search Engine", "🔗 Custom URL Search", "📄 Chat with Documents"]
+if ADMIN_PAGE_ENABLED:
+    pages.append("📈 Metrics")
+page = st.sidebar.radio("📌 **Select Page**", pages)
 
 # 🎯 Load Home Page
 if page == "🏠 Home":
@@ -58,6 +66,10 @@ elif page == "🔗 Custom URL Search":
 elif page == "📄 Chat with Documents":
     doc_chat.CustomDocChatbot()
     st.markdown('</div>', unsafe_allow_html=True)
+elif page == "📈 Metrics":
+    st.markdown('<div class="main-container">', unsafe_allow_html=True)
+    admin.show_admin()
+    st.markdown('</div>', unsafe_allow_html=True)
 
 # Footer
 st.markdown("""
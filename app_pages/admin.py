@@ -0,0 +1,65 @@
+import streamlit as st
+from datetime import datetime
+from scripts.answer_cache import get_answer_cache
+from scripts.cache import get_content_cache, get_search_cache
+from scripts.config import EMBEDDING_SERVICE_ENABLED, METRICS_HOST, METRICS_PORT
+from scripts.embedding_service import get_embedding_service
+from scripts.metrics import get_metrics
+
+def stage_rows(stats):
+    """
+    Format latency statistics as table rows in milliseconds.
+
+    Args:
+        stats (dict): Name -> count, mean, p50, p95, p99 and total seconds (from ``Metrics.summary``).
+
+    Returns:
+        list: One dict per name, slowest total first.
+    """
+    rows = []
+    for name, values in sorted(stats.items(), key=lambda item: -item[1]["total"]):
+        rows.append({"stage": name, "count": values["count"],
+                     **{key: round(values[key] * 1000, 1) for key in ("mean", "p50", "p95", "p99")},
+                     "total s": round(values["total"], 2)})
+    return rows
+
+def show_admin():
+    """Shows where request time goes: stage latencies, cache hit rates and recent request traces."""
+    st.markdown('<h1 class="main-title">📈 Metrics</h1>', unsafe_allow_html=True)
+    st.markdown(f"""
+        <div class="content">
+            Latencies in milliseconds for this server process since it started. Prometheus can scrape the same
+            data from <code>http://{METRICS_HOST}:{METRICS_PORT}/metrics</code>.
+        </div>
+    """, unsafe_allow_html=True)
+    if st.button("🔄 Refresh"):
+        st.rerun()
+
+    summary = get_metrics().summary()
+    st.markdown('<h3 class="section-title">⏱️ Stages</h3>', unsafe_allow_html=True)
+    st.dataframe(stage_rows(summary["stages"]), use_container_width=True)
+    st.markdown('<h3 class="section-title">📨 Requests</h3>', unsafe_allow_html=True)
+    st.dataframe(stage_rows(summary["requests"]), use_container_width=True)
+
+    st.markdown('<h3 class="section-title">⚡ Caches</h3>', unsafe_allow_html=True)
+    caches = {"search": get_search_cache().stats(), "content": get_content_cache().stats(),
+              "answer": get_answer_cache().stats()}
+    st.dataframe([{"cache": name, **stats} for name, stats in caches.items()], use_container_width=True)
+    if EMBEDDING_SERVICE_ENABLED:
+        st.json(get_embedding_service().stats(), expanded=False)
+
+    st.markdown('<h3 class="section-title">🔢 Counters</h3>', unsafe_allow_html=True)
+    st.dataframe([{"metric": name, "labels": ", ".join(f"{k}={v}" for k, v in labels.items()), "value": value}
+                  for name, labels, value in sorted(summary["counters"], key=lambda c: (c[0], sorted(c[1].items())))],
+                 use_container_width=True)
+
+    st.markdown('<h3 class="section-title">🧵 Recent Requests</h3>', unsafe_allow_html=True)
+    for trace in summary["traces"]:
+        started = datetime.fromtimestamp(trace["started_at"]).strftime("%H:%M:%S")
+        details = " · ".join(f"{k}: {v}" for k, v in trace["attributes"].items())
+        with st.expander(f"{started} · {trace['name']} · {trace['duration'] * 1000:.0f} ms · {details}"):
+            st.dataframe([{"stage": s["stage"], "start ms": round(s["offset"] * 1000, 1),
+                           "duration ms": round(s["duration"] * 1000, 1),
+                           "details": ", ".join(f"{k}={v}" for k, v in s.items()
+                                                if k not in ("stage", "offset", "duration"))}
+                          for s in sorted(trace["spans"], key=lambda s: s["offset"])], use_container_width=True)
@@ -1,8 +1,10 @@
 import streamlit as st
-import re, logging, warnings
-from scripts.scraper import extract_full_article
-from scripts.vector_store import create_vector_db
-from scripts.utils import query_llm
+import re, logging, uuid, warnings
+from scripts.collection_manager import COLLECTION_NAME_PATTERN, get_collection_manager
+from scripts.config import CONTEXT_CANDIDATES
+from scripts.metrics import trace
+from scripts.reranker import retrieve
+from scripts.utils import stream_llm, render_stream
 from app_pages.instruction import custom_instruct
 
 warnings.filterwarnings("ignore")
@@ -24,10 +26,57 @@ def split_urls(input_text):
     url_pattern = re.compile(r'https?://[^\s]+')
     return url_pattern.findall(input_text)
 
+def session_owner():
+    """
+    Return the ID that owns this browser session's private collections.
+
+    Returns:
+        str: Random ID kept in the session state.
+    """
+    return st.session_state.setdefault("collection_owner", uuid.uuid4().hex[:16])
+
+def select_collection(key, prefix):
+    """
+    Let the user pick one of their collections or a shared one, or type the name of a new one.
+    Each session starts in its own private collection, and new collections are private unless
+    the user chooses to share them; other sessions' private collections are never listed.
+
+    Args:
+        key (str): Session state key holding the chosen name.
+        prefix (str): Prefix of the session's default collection, named ``<prefix>-<session owner>``.
+
+    Returns:
+        tuple: (name, owner) - the chosen collection and the owner to add sources with
+            (None when a new collection is to be shared).
+    """
+    manager, owner = get_collection_manager(), session_owner()
+    default = f"{prefix}-{owner}"
+    current = st.session_state.get(key, default)
+    if current in manager and not manager.accessible(current, owner):
+        current = default  # Taken as a private collection by another session since it was picked
+    names = sorted(set(manager.names(owner)) | {default, current})
+    name = st.selectbox("🗂️ **Collection**", names, index=names.index(current), accept_new_options=True, key=f"{key}_select",
+                        format_func=lambda name: "🔒 This session (private)" if name == default else name,
+                        help="New collections are private to this session unless shared. Type a name to start a new one.")
+    if not COLLECTION_NAME_PATTERN.fullmatch(name or ""):
+        st.warning("⚠️ Collection names may only use letters, digits, '.', '_' and '-' (up to 64).")
+        return current, owner
+    if name in manager and not manager.accessible(name, owner):
+        st.warning(f"⚠️ The name '{name}' is taken by another session's private collection. Please pick another one.")
+        return current, owner
+    st.session_state[key] = name
+    if name not in manager and name != default and st.checkbox("🌐 Share this new collection with everyone",
+                                                                key=f"{key}_share"):
+        return name, None
+    return name, owner
+
 def custom_url_search():
     st.markdown('<div class="section-title">🔗 Custom URL Search</div>', unsafe_allow_html=True)
     custom_instruct()
 
+    manager = get_collection_manager()
+    collection, owner = select_collection("url_collection", "web-pages")
+
     # Text area to allow users to enter multiple URLs
     urls = st.text_area("📌 **Enter URLs (one per line)**", placeholder="https://example.com/article1\nhttps://example.com/article2")
 
@@ -43,54 +92,66 @@ def custom_url_search():
             st.warning("⚠️ No valid URLs found. Please enter valid URLs.")
             return
 
-        with st.spinner("⏳ **Extracting content... Please wait!**"):
-            # Extract texts and filter out None/empty results
-            extracted_texts = [extract_full_article(url.strip()) for url in urls_list]
-            valid_texts = [text for text in extracted_texts if text is not None and text.strip()]
-            
-            if not valid_texts:
-                logging.error("❌ No valid texts extracted from provided URLs")
-                st.error("⚠️ Could not extract meaningful content from the provided URLs. Please try different URLs.")
-                return
-
-            # Log extracted texts for debugging
-            for i, text in enumerate(valid_texts):
-                logging.info(f"Extracted text {i} (first 100 chars): {text[:100]}...")
-
-            # Create a FAISS vector database from extracted content
-            vector_db = create_vector_db(valid_texts)
-            if vector_db is None:
-                logging.error("❌ Failed to create vector database")
-                st.error("⚠️ Failed to create vector database. Please try again with different URLs.")
-                return
-
-            st.session_state["custom_vector_db"] = vector_db  # Store for later searches
-            st.success("✅ Content extracted and stored successfully!")
+        # URLs already in the collection are skipped; those another collection holds are linked, not fetched again
+        indexed_urls = set(manager.sources(collection).values())
+        new_urls = [url.strip() for url in urls_list if url.strip() not in indexed_urls]
+        if not new_urls:
+            st.info("✅ All of these URLs are already indexed.")
+        else:
+            with st.spinner("⏳ **Extracting content... Please wait!**"), \
+                    trace("url_ingest", collection=collection, urls=len(new_urls)):
+                try:
+                    status = manager.add_urls(collection, new_urls, owner=owner)
+                except Exception as e:
+                    logging.error(f"❌ Failed to index extracted content: {str(e)}")
+                    st.error("⚠️ Failed to create vector database. Please try again with different URLs.")
+                    return
+
+                extracted = [url for url, ok in status.items() if ok]
+                if not extracted:
+                    logging.error("❌ No valid texts extracted from provided URLs")
+                    st.error("⚠️ Could not extract meaningful content from the provided URLs. Please try different URLs.")
+                    return
+                st.success(f"✅ Extracted and stored content from {len(extracted)} new URL(s) in '{collection}'!")
+
+    # Indexed sources can be removed individually
+    sources = manager.sources(collection)
+    if sources:
+        with st.expander(f"📚 **Indexed sources in '{collection}' ({len(sources)})**"):
+            for key, source in sources.items():
+                if st.button(f"🗑️ {source}", key=f"remove_{key}", help="Remove from the collection"):
+                    manager.remove_source(collection, key)
+                    st.rerun()
 
     # Search query input
     query = st.text_input("🔍 **Search within extracted content:**", placeholder="Enter your query")
 
-    if query and "custom_vector_db" in st.session_state:
-        with st.spinner("⏳ Searching..."):
-            vector_db = st.session_state["custom_vector_db"]
+    if query and sources:
+        with st.spinner("⏳ Searching..."), trace("url_search", collection=collection, query=query):
+            vector_db = manager.get(collection)
             if vector_db is None:
                 logging.error("❌ Vector database is None")
                 st.error("⚠️ No vector database available. Please extract content first.")
                 return
 
-            retrieved_chunks = [doc.page_content for doc in vector_db.similarity_search(query, k=5)]
+            retrieved_chunks = retrieve(vector_db, query, k=CONTEXT_CANDIDATES)
             if not retrieved_chunks:
                 logging.warning("⚠️ No relevant chunks retrieved for query")
                 st.warning("⚠️ No relevant content found for your query.")
                 return
 
-            # Get LLM response
-            ai_response = query_llm(query, retrieved_chunks, model_name=st.session_state["llm_model"])
-            formatted_response = ai_response.content.replace("**", "<b>").replace("**", "</b>")
-
+            # Get LLM response, rendering tokens as they arrive
             st.markdown('<h3 class="section-title">📌 AI-Powered Answer:</h3>', unsafe_allow_html=True)
-            st.markdown(f"""
-                <div class="source-card">
-                    <p class="content">{formatted_response}</p>
-                </div>
-            """, unsafe_allow_html=True)
\ No newline at end of file
+            metrics = {}
+            render_stream(
+                stream_llm(query, retrieved_chunks, model_name=st.session_state["llm_model"], metrics=metrics),
+                st.empty(),
+                render=lambda text: f"""
+                    <div class="source-card">
+                        <p class="content">{text.replace("**", "<b>").replace("**", "</b>")}</p>
+                    </div>
+                """,
+            )
+            if metrics.get("time_to_first_token") is not None:
+                st.caption(f"⏱️ First token in {metrics['time_to_first_token']:.2f}s · answered in {metrics['total_time']:.2f}s "
+                           f"· {metrics['prompt_tokens']} prompt tokens")
\ No newline at end of file
@@ -1,9 +1,12 @@
 import streamlit as st
-import PyPDF2
-from scripts.vector_store import create_vector_db
-from scripts.utils import query_llm, enable_chat_history, display_msg
-from scripts.config import CHUNK_SIZE, CHUNK_OVERLAP
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from scripts.config import CONTEXT_CANDIDATES
+from scripts.context import pack_context
+from scripts.collection_manager import document_hash, get_collection_manager
+from scripts.loaders import SUPPORTED_EXTENSIONS
+from scripts.metrics import trace
+from scripts.reranker import retrieve
+from scripts.utils import stream_llm, enable_chat_history, display_msg
+from app_pages.custom_urls import select_collection
 import logging, warnings
 
 warnings.filterwarnings("ignore")
@@ -11,108 +14,123 @@ warnings.filterwarnings("ignore")
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def extract_text_from_pdf(uploaded_file):
+def page_citations(documents):
     """
-    Extract text from an uploaded PDF file.
-    
+    Format the files, and the pages or sections within them, retrieved chunks come from.
+
     Args:
-        uploaded_file: Streamlit uploaded file object (PDF).
-    
+        documents (list): Retrieved Document chunks.
+
     Returns:
-        str: Extracted text from the PDF, or None if extraction fails.
+        str: e.g. "paper.pdf p. 3, 7 · notes.md § Setup".
     """
-    try:
-        logging.info(f"📄 Extracting text from PDF: {uploaded_file.name}")
-        pdf_reader = PyPDF2.PdfReader(uploaded_file)
-        text = ""
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + "\n"
-        
-        if not text.strip():
-            logging.warning(f"⚠️ No meaningful content extracted from PDF: {uploaded_file.name}")
-            return None
-        
-        logging.info(f"✅ Successfully extracted text from PDF: {uploaded_file.name}")
-        return text
-    except Exception as e:
-        logging.error(f"❌ Error extracting text from PDF {uploaded_file.name}: {str(e)}")
-        return None
+    locations = {}
+    for doc in documents:
+        pages, sections = locations.setdefault(doc.metadata.get("source", "document"), (set(), []))
+        if doc.metadata.get("page") is not None:
+            pages.add(doc.metadata["page"])
+        elif doc.metadata.get("section") and doc.metadata["section"] not in sections:
+            sections.append(doc.metadata["section"])
+    citations = []
+    for source, (pages, sections) in locations.items():
+        parts = ([f"p. {', '.join(map(str, sorted(pages)))}"] if pages else []) + [f"§ {s}" for s in sections]
+        citations.append(f"{source} {', '.join(parts)}" if parts else source)
+    return " · ".join(citations)
 
 @enable_chat_history
 def CustomDocChatbot():
     """
-    A Streamlit-based chatbot that processes uploaded PDFs and allows querying with LLM.
+    A Streamlit-based chatbot that processes uploaded documents and allows querying with LLM.
     Maintains chat history and integrates with existing vector database and LLM utilities.
     """
-    st.markdown('<h1 class="main-title">📄 DocuMind AI: Smart PDF Question Answering System</h1>', unsafe_allow_html=True)
+    st.markdown('<h1 class="main-title">📄 DocuMind AI: Smart Document Question Answering System</h1>', unsafe_allow_html=True)
     st.markdown("""
         <div class="content">
-            Upload a PDF document in the sidebar and ask questions about its content. 
+            Upload one or more documents (PDF, Word, HTML, Markdown or text) in the sidebar and ask questions about their content. 
             The system will extract the text, create a vector database, and provide AI-powered answers.
         </div>
     """, unsafe_allow_html=True)
 
-    # Sidebar for PDF upload
+    # Uploads go into a saved collection, private to the session unless it picks a shared one; the session only remembers its uploads
+    manager = get_collection_manager()
+    file_hashes = st.session_state.setdefault("doc_file_hashes", {})  # uploader file_id -> content hash
+    handled = st.session_state.setdefault("doc_handled", set())  # (collection, hash) of uploads already added
+
+    # Sidebar for document upload
     with st.sidebar:
-        st.markdown('<h3 class="section-title">📤 Upload PDF</h3>', unsafe_allow_html=True)
-        uploaded_file = st.file_uploader("Choose a PDF file", type=["pdf"])
-        
-        if uploaded_file is not None:
-            with st.spinner("⏳ **Processing PDF... Please wait!**"):
-                # Extract text from the uploaded PDF
-                pdf_text = extract_text_from_pdf(uploaded_file)
-                if pdf_text is None:
-                    st.error(f"⚠️ Could not extract meaningful content from {uploaded_file.name}. Please try another file.")
-                    return
+        st.markdown('<h3 class="section-title">📤 Upload Documents</h3>', unsafe_allow_html=True)
+        collection, owner = select_collection("doc_collection", "documents")
+        uploaded_files = st.file_uploader("Choose files", type=SUPPORTED_EXTENSIONS, accept_multiple_files=True)
 
-                # Split text into chunks
-                text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-                documents = text_splitter.create_documents([pdf_text])
-                
-                # Create vector database
-                vector_db = create_vector_db([pdf_text])
-                if vector_db is None:
-                    st.error("⚠️ Failed to create vector database. Please try again.")
-                    return
-                
-                st.session_state["custom_vector_db"] = vector_db
-                st.success(f"✅ PDF '{uploaded_file.name}' processed and indexed successfully!")
+        # Each upload is added to a collection once, so removing it there does not bring it back
+        sources, new_files = manager.sources(collection), []
+        for uploaded_file in uploaded_files or []:
+            if uploaded_file.file_id not in file_hashes:
+                file_hashes[uploaded_file.file_id] = document_hash(uploaded_file.getvalue())
+            file_hash = file_hashes[uploaded_file.file_id]
+            if (collection, file_hash) in handled:
+                continue
+            handled.add((collection, file_hash))
+            if file_hash not in sources:
+                new_files.append((file_hash, uploaded_file.name, uploaded_file))
+
+        if new_files:
+            with st.spinner(f"⏳ **Processing {len(new_files)} file(s)... Please wait!**"), \
+                    trace("document_upload", collection=collection, files=len(new_files)):
+                # New uploads are streamed into the collection together, several files at a time
+                status = manager.add_files(collection, new_files, owner=owner)
+            for file_hash, name, _ in new_files:
+                if status[file_hash]:
+                    st.success(f"✅ '{name}' processed and indexed successfully!")
+                else:
+                    st.error(f"⚠️ Could not extract meaningful content from {name}. Please try another file.")
+            sources = manager.sources(collection)
+
+        if sources:
+            st.markdown('<h3 class="section-title">📚 Indexed Documents</h3>', unsafe_allow_html=True)
+            for file_hash, name in sources.items():
+                if st.button(f"🗑️ {name}", key=f"remove_{file_hash}", help="Remove from the collection"):
+                    manager.remove_source(collection, file_hash)
+                    st.rerun()
 
     # Chat input for querying
-    if "custom_vector_db" in st.session_state:
-        query = st.chat_input("🔍 Ask a question about the uploaded PDF:")
+    if sources:
+        query = st.chat_input(f"🔍 Ask a question about the documents in '{collection}':")
         if query:
-            with st.spinner("⏳ **Searching and generating answer...**"):
-                vector_db = st.session_state["custom_vector_db"]
-                if vector_db is None:
-                    logging.error("❌ Vector database is None")
-                    st.error("⚠️ No vector database available. Please upload a PDF first.")
-                    return
-
-                # Retrieve relevant chunks
-                retrieved_chunks = [doc.page_content for doc in vector_db.similarity_search(query, k=5)]
-                if not retrieved_chunks:
-                    logging.warning("⚠️ No relevant chunks retrieved for query")
-                    st.warning("⚠️ No relevant content found for your query.")
-                    return
+            with trace("document_chat", collection=collection, query=query, documents=len(sources)):
+                with st.spinner("⏳ **Searching relevant content...**"):
+                    vector_db = manager.get(collection)
+                    if vector_db is None:
+                        logging.error("❌ Vector database is None")
+                        st.error("⚠️ No vector database available. Please upload a document first.")
+                        return
 
-                # Get LLM response
-                ai_response = query_llm(query, retrieved_chunks, model_name=st.session_state.get("llm_model", "llama3-8b-8192"))
-                formatted_response = ai_response.content
-                # print(formatted_response)
+                    # Retrieve relevant chunks and keep those that fit the prompt's token budget
+                    model_name = st.session_state.get("llm_model", "llama3-8b-8192")
+                    context = pack_context(retrieve(vector_db, query, k=CONTEXT_CANDIDATES), model_name)
+                    retrieved = [doc for doc, _ in context["items"]]
+                    if not retrieved:
+                        logging.warning("⚠️ No relevant chunks retrieved for query")
+                        st.warning("⚠️ No relevant content found for your query.")
+                        return
 
-                # Display user question and AI response
+                # Display user question, then stream the AI response as it is generated
                 display_msg(query, "user")
-                display_msg(formatted_response, "assistant")
+                metrics = {}
+                with st.chat_message("assistant"):
+                    formatted_response = st.write_stream(stream_llm(query, context["items"], model_name=model_name, metrics=metrics))
+                    st.caption(f"📄 Sources: {page_citations(retrieved)}")
+                    if metrics.get("time_to_first_token") is not None:
+                        st.caption(f"⏱️ First token in {metrics['time_to_first_token']:.2f}s · answered in {metrics['total_time']:.2f}s "
+                                   f"· {metrics['prompt_tokens']} prompt tokens")
+                st.session_state.messages.append({"role": "assistant", "content": formatted_response})
                 
-                # Render formatted response in a styled card
-                # st.markdown(f"""
-                #     <div class="source-card">
-                #         <p class="content">{formatted_response}</p>
-                #     </div>
-                # """, unsafe_allow_html=True)
+            # Render formatted response in a styled card
+            # st.markdown(f"""
+            #     <div class="source-card">
+            #         <p class="content">{formatted_response}</p>
+            #     </div>
+            # """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
     CustomDocChatbot()
\ No newline at end of file
@@ -1,8 +1,11 @@
 import streamlit as st
-from scripts.google_search import google_custom_search
-from scripts.scraper import extract_full_article
-from scripts.vector_store import create_vector_db
-from scripts.utils import query_llm
+from scripts.crawler import get_web_index
+from scripts.pipeline import run_search_pipeline
+from scripts.reranker import retrieve
+from scripts.answer_cache import get_answer_cache
+from scripts.config import ANSWER_CACHE_ENABLED, CONTEXT_CANDIDATES
+from scripts.metrics import trace
+from scripts.utils import stream_llm, render_stream
 from app_pages.instruction import search_instruct
 import logging, warnings
 
@@ -11,72 +14,193 @@ warnings.filterwarnings("ignore")
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+def answer_card(text):
+    """
+    Wraps answer text in a styled card.
+
+    Args:
+        text (str): Answer text (or the part received so far).
+
+    Returns:
+        str: Card HTML.
+    """
+    return f"""
+            <div class="source-card">
+                <p class="content">{text.replace("**", "<b>").replace("**", "</b>")}</p>
+            </div>
+        """
+
+def render_answer_stream(token_stream):
+    """
+    Renders answer tokens into a styled card as they arrive.
+
+    Args:
+        token_stream (iterable): Answer text fragments.
+
+    Returns:
+        str: The complete answer.
+    """
+    st.markdown('<h3 class="section-title">📌 AI-Powered Answer:</h3>', unsafe_allow_html=True)
+    return render_stream(token_stream, st.empty(), render=answer_card)
+
+def render_answer(query, retrieved_chunks):
+    """
+    Streams the LLM answer into a styled card, followed by its timings.
+
+    Args:
+        query (str): User query.
+        retrieved_chunks (list): Retrieved chunk texts, best first, or (Document, score) pairs.
+
+    Returns:
+        str: The complete answer, or None if generation failed.
+    """
+    metrics = {}
+    answer = render_answer_stream(
+        stream_llm(query, retrieved_chunks, model_name=st.session_state["llm_model"], metrics=metrics))
+    if metrics.get("time_to_first_token") is not None:
+        st.caption(f"⏱️ First token in {metrics['time_to_first_token']:.2f}s · answered in {metrics['total_time']:.2f}s "
+                   f"· {metrics['prompt_tokens']} prompt tokens")
+    return None if "error" in metrics else answer
+
+def render_cached_answer(cached):
+    """
+    Shows an answer served from the semantic answer cache.
+
+    Args:
+        cached (CachedAnswer): The cache hit.
+    """
+    st.markdown('<h3 class="section-title">📌 AI-Powered Answer:</h3>', unsafe_allow_html=True)
+    st.markdown(answer_card(cached.answer), unsafe_allow_html=True)
+    st.caption(f"⚡ Cached answer for a similar question: “{cached.query}” "
+               f"(similarity {cached.similarity:.2f}, {cached.age / 60:.0f} min old)")
+    render_sources(cached.sources)
+
+def render_sources(sources):
+    """
+    Shows sources as cards.
+
+    Args:
+        sources (list): Dicts with title, link and snippet.
+    """
+    st.markdown('<h3 class="section-title">🔗 Sources:</h3>', unsafe_allow_html=True)
+    for result in sources:
+        st.markdown(f"""
+            <div class="source-card">
+                <b class="highlight">🔹 {result['title']}</b><br>
+                <a href="{result['link']}" target="_blank">{result['link']}</a><br>
+                <i class="content">{result['snippet']}</i>
+            </div>
+        """, unsafe_allow_html=True)
+
+def local_index_search(query):
+    """
+    Answers a query from the persistent web index built by ``scripts.crawler``.
+
+    Args:
+        query (str): User query.
+
+    Returns:
+        tuple: (answer, sources) to cache, or None if no answer was produced.
+    """
+    vector_db = get_web_index().vector_db
+    if vector_db is None:
+        st.warning("⚠️ The local index is empty. Build it with `python -m scripts.crawler --seed <url>`.")
+        return
+
+    # 🔎 Retrieve relevant chunks
+    results = retrieve(vector_db, query, k=CONTEXT_CANDIDATES)
+    if not results:
+        logging.warning("⚠️ No relevant chunks retrieved for query")
+        st.warning("⚠️ No relevant content found for your query.")
+        return
+
+    answer = render_answer(query, results)
+
+    # One card per page, in rank order
+    sources = {}
+    for doc, _ in results:
+        link = doc.metadata.get("source", "")
+        sources.setdefault(link, {"title": doc.metadata.get("title") or link, "link": link,
+                                  "snippet": doc.page_content[:200] + "..."})
+    render_sources(list(sources.values()))
+    return (answer, list(sources.values())) if answer else None
+
+def live_web_search(query):
+    """
+    Answers a query by searching Google, scraping the results and indexing them on the fly.
+
+    Runs ``scripts.pipeline``, which embeds each article as soon as it is scraped and starts
+    the LLM call once enough content has arrived.
+
+    Args:
+        query (str): User query.
+
+    Returns:
+        tuple: (answer, sources) to cache, or None if no answer was produced.
+    """
+    events = run_search_pipeline(query, st.session_state["llm_model"])
+    state = {}
+
+    # ⏳ Search, scrape, embed and retrieve until the first answer token arrives
+    first_token = None
+    for kind, payload in events:
+        if kind == "error":
+            logging.error(f"❌ {payload}")
+            st.error(payload)
+            return None
+        if kind == "token":
+            first_token = payload
+            break
+        state[kind] = payload
+    if first_token is None:
+        return None
+
+    def tokens():
+        yield first_token
+        for kind, payload in events:
+            if kind == "token":
+                yield payload
+            else:
+                state[kind] = payload
+
+    # 🤖 Render the answer as it streams in
+    answer = render_answer_stream(tokens())
+    timings = state.get("done", {})
+    if "first_token" in timings:
+        st.caption(f"⏱️ Search {timings['search']:.2f}s · first article {timings.get('first_article', 0):.2f}s · "
+                   f"answered from {timings.get('articles', 0)} articles · first token {timings['first_token']:.2f}s · "
+                   f"done in {timings['total']:.2f}s · {timings.get('prompt_tokens')} prompt tokens")
+
+    # 🔗 Show Sources in Beautiful Cards
+    render_sources(state["sources"])
+    return (answer, state["sources"]) if "error" not in timings else None
+
 def search_engine():
     st.markdown('<div class="section-title">🔍 Search Engine</div>', unsafe_allow_html=True)
     search_instruct()
 
+    # 📡 Answer from a live web search or from the crawled local index
+    mode = st.radio("📡 **Answer from:**", ["🌐 Live web", "📚 Local index"], horizontal=True, key="search_mode")
+
     # ⌨️ Real-Time Search Input (Press Enter to Search)
     query = st.text_input("🔎 **Ask Anything:**", key="search_input", placeholder="Enter your query")
 
     # ✅ Perform search automatically when user presses Enter
     if query:
-        with st.spinner("⏳ **Fetching results... Please wait!**"):
+        scope = "local" if mode == "📚 Local index" else "web"
+        model_name = st.session_state["llm_model"]
+        with st.spinner("⏳ **Fetching results... Please wait!**"), trace(f"{scope}_search", query=query, model=model_name):
             try:
-                # 🔍 Google Search API Call
-                search_results = google_custom_search(query)
-                if not search_results:
-                    logging.error("❌ No search results found")
-                    st.error("⚠️ No search results found for the query.")
-                    return
-
-                # 📄 Extract articles and filter valid texts
-                all_text = [extract_full_article(result["link"]) for result in search_results]
-                valid_texts = [text for text in all_text if text is not None and text.strip()]
-                if not valid_texts:
-                    logging.error("❌ No valid texts extracted from search results")
-                    st.error("⚠️ Could not extract meaningful content from search results. Try a different query.")
-                    return
-
-                # Log extracted texts for debugging
-                for i, text in enumerate(valid_texts):
-                    logging.info(f"Extracted text {i} (first 100 chars): {text[:100]}...")
-
-                # 🧠 Create FAISS Vector Database
-                vector_db = create_vector_db(valid_texts)
-                if vector_db is None:
-                    logging.error("❌ Failed to create vector database")
-                    st.error("⚠️ Failed to create vector database. Try a different query.")
-                    return
-
-                # 🔎 Retrieve relevant chunks
-                retrieved_chunks = [doc.page_content for doc in vector_db.similarity_search(query, k=5)]
-                if not retrieved_chunks:
-                    logging.warning("⚠️ No relevant chunks retrieved for query")
-                    st.warning("⚠️ No relevant content found for your query.")
+                # ⚡ Repeated and near-duplicate questions skip search, scraping and generation
+                cached = get_answer_cache().lookup(query, model_name, scope) if ANSWER_CACHE_ENABLED else None
+                if cached:
+                    render_cached_answer(cached)
                     return
 
-                # 🤖 Get LLM response
-                ai_response = query_llm(query, retrieved_chunks, model_name=st.session_state["llm_model"])
-                formatted_response = ai_response.content.replace("**", "<b>").replace("**", "</b>")
-
-                st.markdown('<h3 class="section-title">📌 AI-Powered Answer:</h3>', unsafe_allow_html=True)
-                st.markdown(f"""
-                    <div class="source-card">
-                        <p class="content">{formatted_response}</p>
-                    </div>
-                """, unsafe_allow_html=True)
-
-                # 🔗 Show Sources in Beautiful Cards
-                st.markdown('<h3 class="section-title">🔗 Sources:</h3>', unsafe_allow_html=True)
-                for result in search_results:
-                    st.markdown(f"""
-                        <div class="source-card">
-                            <b class="highlight">🔹 {result['title']}</b><br>
-                            <a href="{result['link']}" target="_blank">{result['link']}</a><br>
-                            <i class="content">{result['snippet']}</i>
-                        </div>
-                    """, unsafe_allow_html=True)
+                result = local_index_search(query) if scope == "local" else live_web_search(query)
+                if result and ANSWER_CACHE_ENABLED:
+                    get_answer_cache().put(query, model_name, *result, scope=scope)
 
             except Exception as e:
                 logging.error(f"❌ Search pipeline error: {str(e)}")
-                st.error(f"⚠️ An error occurred: {str(e)}")
\ No newline at end of file
+                st.error(f"⚠️ An error occurred: {str(e)}")
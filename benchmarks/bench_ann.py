@@ -0,0 +1,70 @@
+"""
+Recall@k vs. latency of the FAISS index types in scripts.vector_store, measured
+against the exact flat inner-product baseline on synthetic normalized embeddings.
+
+Usage:
+    python -m benchmarks.bench_ann --vectors 50000
+"""
+import argparse
+import time
+import faiss
+import numpy as np
+from scripts.vector_store import build_index, search_parameters
+
+def synthetic_embeddings(num_vectors, dimension, clusters=200, seed=0):
+    """
+    Generate clustered, L2-normalized vectors that resemble sentence embeddings.
+
+    Args:
+        num_vectors (int): Number of vectors.
+        dimension (int): Vector dimension.
+        clusters (int): Number of topic clusters.
+        seed (int): Random seed.
+
+    Returns:
+        np.ndarray: float32 array of shape (num_vectors, dimension).
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype("float32")
+    vectors = centers[rng.integers(0, clusters, num_vectors)] + 0.6 * rng.standard_normal((num_vectors, dimension)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def recall_at_k(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN index recall/latency benchmark")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default="flat,hnsw,hnsw_sq8,ivf_flat,ivf_sq8,ivf_pq,sq8")
+    args = parser.parse_args()
+
+    data = synthetic_embeddings(args.vectors + args.queries, args.dimension)
+    corpus, queries = data[:args.vectors], data[args.vectors:]
+    _, truth = build_index(corpus, "flat").search(queries, args.k)
+
+    print(f"vectors={args.vectors} dimension={args.dimension} queries={args.queries} k={args.k}")
+    print(f"{'index':<10} {'knob':<12} {'build s':>8} {'ms/query':>9} {'recall@k':>9}")
+    for index_type in args.types.split(","):
+        start = time.perf_counter()
+        index = build_index(corpus, index_type)
+        build_time = time.perf_counter() - start
+
+        knobs = [("-", {})]
+        if isinstance(search_parameters(index), faiss.SearchParametersIVF):
+            knobs = [(f"nprobe={n}", {"nprobe": n}) for n in (1, 4, 16, 64)]
+        elif isinstance(search_parameters(index), faiss.SearchParametersHNSW):
+            knobs = [(f"efSearch={ef}", {"ef_search": ef}) for ef in (16, 64, 256)]
+
+        for label, knob in knobs:
+            params = search_parameters(index, **knob)
+            start = time.perf_counter()
+            found = np.vstack([index.search(q[None, :], args.k, params=params)[1] for q in queries])
+            latency = (time.perf_counter() - start) / args.queries * 1000
+            print(f"{index_type:<10} {label:<12} {build_time:8.2f} {latency:9.3f} {recall_at_k(found, truth):9.3f}")
+
+if __name__ == "__main__":
+    main()
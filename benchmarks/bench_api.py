@@ -0,0 +1,147 @@
+"""
+Load test of the headless API server (scripts.api): closed-loop virtual users at increasing
+concurrency against collection retrieval, answers streamed from a collection and live web
+searches. The server runs in its own process with a stub embedding model; the search API,
+the websites and the LLM are local stand-ins. Reports throughput, latency and time-to-first-token
+percentiles, and how many requests the concurrency limits turned away with HTTP 503.
+
+Usage:
+    python -m benchmarks.bench_api
+    python -m benchmarks.bench_api --users 1,16,64 --scenarios answer --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from benchmarks.stubs import (StubEmbeddings, article_server, chat_completions_server, search_api_server,
+                              synthetic_docx, synthetic_pdf, use_stub_embeddings)
+
+COLLECTION = "bench"
+
+def serve(port, call_cost, text_cost):
+    # Runs in the server process
+    import uvicorn
+    use_stub_embeddings(StubEmbeddings(call_cost=call_cost, text_cost=text_cost))
+    from scripts.api import app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+def request_for(scenario, user, i):
+    # (path, JSON body) of a scenario's request; queries differ so no cache can answer them
+    query = f"How do semantic search engines index documents? (user {user}, request {i})"
+    if scenario == "retrieve":
+        return f"/collections/{COLLECTION}/query", {"query": query, "answer": False}
+    if scenario == "answer":
+        return f"/collections/{COLLECTION}/query", {"query": query, "stream": True}
+    return "/search", {"query": query, "scope": "web", "stream": True}
+
+async def virtual_user(client, scenario, user, deadline, samples):
+    # Sends one request after another until the deadline, backing off as told on HTTP 503
+    i = 0
+    while time.perf_counter() < deadline:
+        path, body = request_for(scenario, user, i)
+        i += 1
+        start, first_token, status = time.perf_counter(), None, None
+        try:
+            async with client.stream("POST", path, json=body) as response:
+                status = response.status_code
+                if status == 503:
+                    samples.append(("rejected", None, None))
+                    await response.aread()
+                    await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+                    continue
+                async for line in response.aiter_lines():
+                    if first_token is None and line and json.loads(line).get("event") == "token":
+                        first_token = time.perf_counter() - start
+        except Exception as e:
+            samples.append(("error", None, str(e)))
+            continue
+        samples.append(("ok" if status == 200 else "error", time.perf_counter() - start, first_token))
+
+async def run_level(base_url, scenario, users, duration):
+    import httpx
+    samples = []
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[virtual_user(client, scenario, user, start + duration, samples) for user in range(users)])
+        elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+def prepare(base_url, sites, directory):
+    # Index the stand-in articles and two documents into the benchmark collection
+    import httpx
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        urls = [sites.url(f"/article/page-{i}?delay=0.05") for i in range(20)]
+        response = client.post(f"/collections/{COLLECTION}/urls", json={"urls": urls})
+        response.raise_for_status()
+        files = [("files", ("report.pdf", synthetic_pdf(40), "application/pdf")),
+                 ("files", ("manual.docx", synthetic_docx(10), "application/octet-stream"))]
+        response = client.post(f"/collections/{COLLECTION}/documents", files=files)
+        response.raise_for_status()
+        return response.json()["chunks"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless API load test")
+    parser.add_argument("--users", default="1,8,32,64", help="Concurrent virtual users per level")
+    parser.add_argument("--scenarios", default="retrieve,answer,web_search")
+    parser.add_argument("--duration", type=float, default=5, help="Seconds per level")
+    parser.add_argument("--call-cost", type=float, default=0.002, help="Stub model CPU seconds per forward pass")
+    parser.add_argument("--text-cost", type=float, default=0.0002, help="Stub model CPU seconds per chunk")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.port, args.call_cost, args.text_cost)
+
+    with article_server() as sites, chat_completions_server(first_token_delay=0.1, token_delay=0.005) as llm, \
+            tempfile.TemporaryDirectory() as directory:
+        links = [sites.url(f"/article/site-{i}?delay={delay}") for i, delay in enumerate([0.1, 0.2, 0.3, 0.5])]
+        with search_api_server(delay=0.1, num_results=len(links), links=links) as search:
+            env = dict(os.environ, GOOGLE_API_BASE=search.url("/"), GROQ_API_BASE=llm.url(""),
+                       GROQ_API_KEY=os.environ.get("GROQ_API_KEY") or "stub", CACHE_DIR=directory,
+                       INDEX_DIR=os.path.join(directory, "web_index"),
+                       COLLECTIONS_DIR=os.path.join(directory, "collections"), CONTENT_CACHE_TTL="0", SEARCH_CACHE_TTL="0",
+                       ANSWER_CACHE_ENABLED="false", METRICS_PORT="0")
+            command = [sys.executable, "-m", "benchmarks.bench_api", "--serve", "--port", str(args.port),
+                       "--call-cost", str(args.call_cost), "--text-cost", str(args.text_cost)]
+            server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                import httpx
+                for _ in range(600):
+                    try:
+                        limits = httpx.get(f"{base_url}/health").json()["limiters"]
+                        break
+                    except httpx.TransportError:
+                        time.sleep(0.1)
+                else:
+                    sys.exit("❌ API server did not start")
+
+                chunks = prepare(base_url, sites, directory)
+                print(f"collection '{COLLECTION}': {chunks} chunks; limits: "
+                      + ", ".join(f"{name} {l['limit']} running + {l['max_queued']} queued" for name, l in limits.items()))
+                print(f"{'scenario':<11} {'users':>5} {'ok':>6} {'503':>5} {'errors':>6} {'req/s':>7} {'p50 ms':>8} "
+                      f"{'p95 ms':>8} {'p99 ms':>8} {'TTFT p50':>9}")
+                for scenario in args.scenarios.split(","):
+                    for users in [int(n) for n in args.users.split(",")]:
+                        samples, elapsed = asyncio.run(run_level(base_url, scenario, users, args.duration))
+                        latencies = np.array([s[1] for s in samples if s[0] == "ok"]) * 1000
+                        first_tokens = [s[2] * 1000 for s in samples if s[0] == "ok" and s[2] is not None]
+                        count = lambda kind: sum(1 for s in samples if s[0] == kind)
+                        p = lambda q: f"{np.percentile(latencies, q):8.0f}" if len(latencies) else f"{'-':>8}"
+                        ttft = f"{np.percentile(first_tokens, 50):9.0f}" if first_tokens else f"{'-':>9}"
+                        print(f"{scenario:<11} {users:>5} {count('ok'):>6} {count('rejected'):>5} {count('error'):>6} "
+                              f"{count('ok') / elapsed:7.1f} {p(50)} {p(95)} {p(99)} {ttft}")
+                print(f"server limiters after the run: {httpx.get(f'{base_url}/health').json()['limiters']}")
+            finally:
+                server.terminate()
+                server.wait()
+
+if __name__ == "__main__":
+    main()
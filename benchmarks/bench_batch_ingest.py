@@ -0,0 +1,88 @@
+"""
+Time to index a batch upload of mixed documents (PDF, DOCX, HTML, Markdown and text): one file
+after another with ``ingest_file``, as the pages used to, vs. ``ingest_files``, which ingests
+several files at a time into one store. Embeddings go through a microbatching EmbeddingService
+over a stub model, and each flow runs in a fresh process with its own embedding cache.
+
+Usage:
+    python -m benchmarks.bench_batch_ingest
+"""
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.stubs import (ARTICLE_PARAGRAPH, STATIC_SITE_TOPICS, StubEmbeddings, article_html, synthetic_docx,
+                              synthetic_pdf, use_stub_embeddings)
+
+def write_documents(directory, count):
+    # count files of each format, with different content per file
+    paths = []
+    for i in range(count):
+        topic = STATIC_SITE_TOPICS[i % len(STATIC_SITE_TOPICS)]
+        files = {
+            f"report-{i}.pdf": synthetic_pdf(60, seed=i),
+            f"manual-{i}.docx": synthetic_docx(20, seed=i),
+            f"article-{i}.html": article_html(f"{topic} {i}", paragraphs=60).encode("utf-8"),
+            f"notes-{i}.md": "".join(f"## {topic} {i}.{s}\n\n{ARTICLE_PARAGRAPH * 6}\n\n" for s in range(30)).encode("utf-8"),
+            f"log-{i}.txt": "".join(f"Entry {s}: {topic}. {ARTICLE_PARAGRAPH * 4}\n\n" for s in range(40)).encode("utf-8"),
+        }
+        for name, data in files.items():
+            with open(os.path.join(directory, name), "wb") as f:
+                f.write(data)
+            paths.append(os.path.join(directory, name))
+    return paths
+
+def measure(flow, paths, call_cost, text_cost):
+    # Runs in the child process
+    from scripts.embedding_service import EmbeddingService
+    from scripts.ingest import ingest_file, ingest_files
+    factory = functools.partial(StubEmbeddings, call_cost=call_cost, text_cost=text_cost)
+    service = EmbeddingService(model_name=StubEmbeddings.model_name, workers=1, threads=1, factory=factory)
+    use_stub_embeddings(service)
+    service.embed_query("start the workers")
+
+    start = time.perf_counter()
+    if flow == "sequential":
+        vector_db = None
+        for path in paths:
+            vector_db, _ = ingest_file(path, os.path.basename(path), vector_db)
+    else:
+        vector_db, _ = ingest_files([(path, os.path.basename(path), None) for path in paths])
+    elapsed = time.perf_counter() - start
+    stats = service.stats()
+    service.close()
+    print(json.dumps({"chunks": len(vector_db.documents), "seconds": elapsed, "batches": stats["batches"],
+                      "mean_batch_size": stats["mean_batch_size"]}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch document ingestion benchmark")
+    parser.add_argument("--files", type=int, default=4, help="Files of each format")
+    parser.add_argument("--call-cost", type=float, default=0.008, help="Stub model CPU seconds per forward pass")
+    parser.add_argument("--text-cost", type=float, default=0.0005, help="Stub model CPU seconds per chunk")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--paths", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return measure(args.child, args.paths, args.call_cost, args.text_cost)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_documents(directory, args.files)
+        print(f"{len(paths)} files ({args.files} per format), INGEST_MAX_FILES: "
+              f"{os.environ.get('INGEST_MAX_FILES', 'default')}, CPUs: {os.cpu_count()}")
+        print(f"{'flow':<11} {'chunks':>7} {'seconds':>8} {'embed batches':>14} {'mean batch':>11}")
+        for flow in ["sequential", "concurrent"]:
+            env = dict(os.environ, CACHE_DIR=os.path.join(directory, f"cache-{flow}"))
+            command = [sys.executable, "-m", "benchmarks.bench_batch_ingest", "--child", flow,
+                       "--call-cost", str(args.call_cost), "--text-cost", str(args.text_cost), "--paths", *paths]
+            output = subprocess.run(command, check=True, capture_output=True, text=True, env=env).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{flow:<11} {result['chunks']:>7} {result['seconds']:8.2f} {result['batches']:>14} "
+                  f"{result['mean_batch_size']:11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Memory and work per session as sessions grow: every session uploads the same team documents plus
+one document of its own and asks one question. Compares a per-session in-memory index (built
+with ``ingest_files``, as sessions did before collections) with persistent collections from
+``CollectionManager``, one private collection per session or one shared by all. Each run is a fresh process with a stub embedding model and reports
+ingest time, texts embedded, chunks held in memory and in the chunk store, disk use and RSS growth.
+
+Usage:
+    python -m benchmarks.bench_collections
+    python -m benchmarks.bench_collections --sessions 1,10,100 --shared-docs 8
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.stubs import StubEmbeddings, synthetic_docx, synthetic_pdf, use_stub_embeddings
+
+MODES = ("session", "private", "shared")
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def directory_mb(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names) / 2**20
+
+def measure(mode, sessions, shared_docs, directory):
+    # Runs in the child process
+    use_stub_embeddings(StubEmbeddings(call_cost=0.0, text_cost=0.0))
+    from scripts.collection_manager import document_hash, get_collection_manager
+    from scripts.ingest import ingest_files
+    from scripts.reranker import retrieve
+    from scripts.vector_store import embedding_model_name, get_embedding_cache
+
+    team = [(f"team-{i}.pdf", synthetic_pdf(10, seed=i)) for i in range(shared_docs)]
+    own = [(f"notes-{s}.docx", synthetic_docx(2, seed=1000 + s)) for s in range(sessions)]
+    manager, sessions_state = get_collection_manager(), []
+    get_embedding_cache(embedding_model_name())  # Opened before the baseline, like the model
+    start_rss, start = rss_mb(), time.perf_counter()
+
+    for s in range(sessions):
+        files = [(document_hash(data), name, io.BytesIO(data)) for name, data in team + [own[s]]]
+        if mode == "session":
+            vector_db, _ = ingest_files([(source, name, {"source_key": key}) for key, name, source in files])
+            sessions_state.append(vector_db)  # Kept alive, like a Streamlit session
+        else:
+            name = f"session-{s}" if mode == "private" else "team"
+            manager.add_files(name, files, owner=name if mode == "private" else None)
+            sessions_state.append(name)  # Sessions only keep the collection name
+            vector_db = manager.get(name)
+        retrieve(vector_db, "How do semantic search engines rank documents?", 5)
+
+    seconds = time.perf_counter() - start
+    if mode == "session":
+        in_memory = sum(len(vector_db.documents) for vector_db in sessions_state)
+        stored = None
+    else:
+        in_memory = sum(len(vector_db.documents) for vector_db, _ in manager._loaded.values())
+        stored = manager.stats()
+    print(json.dumps({
+        "mode": mode, "sessions": sessions, "seconds": seconds,
+        "embedded": get_embedding_cache(embedding_model_name()).stats()["misses"],
+        "chunks_in_memory": in_memory, "stored_chunks": stored["chunks"] if stored else None,
+        "chunk_references": stored["chunk_references"] if stored else None,
+        "loaded": stored["loaded"] if stored else sessions,
+        "disk_mb": directory_mb(os.path.join(directory, "collections")), "rss_growth_mb": rss_mb() - start_rss,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-session indexes vs. persistent collections")
+    parser.add_argument("--sessions", default="1,10,50", help="Session counts")
+    parser.add_argument("--shared-docs", type=int, default=4, help="Team documents every session uploads")
+    parser.add_argument("--modes", default=",".join(MODES), help="session, private and/or shared")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return measure(args.child[0], int(args.child[1]), args.shared_docs, os.environ["CACHE_DIR"])
+
+    print(f"{args.shared_docs} team PDFs + 1 own document per session; "
+          f"session = in-memory index per session, private/shared = one collection per session / for all")
+    print(f"{'mode':<8} {'sessions':>8} {'seconds':>8} {'embedded':>9} {'in RAM':>8} {'stored':>7} {'refs':>7} "
+          f"{'loaded':>6} {'disk MB':>8} {'RSS +MB':>8}")
+    for sessions in [int(n) for n in args.sessions.split(",")]:
+        for mode in args.modes.split(","):
+            with tempfile.TemporaryDirectory() as directory:
+                env = dict(os.environ, CACHE_DIR=directory, COLLECTIONS_DIR=os.path.join(directory, "collections"),
+                           METRICS_PORT="0", EMBEDDING_SERVICE_ENABLED="false")
+                command = [sys.executable, "-m", "benchmarks.bench_collections", "--child", mode, str(sessions),
+                           "--shared-docs", str(args.shared_docs)]
+                process = subprocess.run(command, capture_output=True, text=True, env=env)
+            if process.returncode != 0:
+                print(f"{mode:<8} {sessions:>8} ❌ {(process.stderr.strip().splitlines() or ['no output'])[-1]}")
+                continue
+            r = json.loads(process.stdout.strip().splitlines()[-1])
+            dash = lambda value: f"{value:>7}" if value is not None else f"{'-':>7}"
+            print(f"{mode:<8} {sessions:>8} {r['seconds']:8.2f} {r['embedded']:>9} {r['chunks_in_memory']:>8} "
+                  f"{dash(r['stored_chunks'])} {dash(r['chunk_references'])} {r['loaded']:>6} {r['disk_mb']:8.1f} "
+                  f"{r['rss_growth_mb']:8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Prompt size per request: the old prompt (indented template, top 5 chunks joined as is) vs. the
+token-budgeted context packing in scripts.context at several budgets. The corpus holds scraped
+articles of which some are syndicated under a second URL, so retrieval returns near-duplicate
+chunks, as it does for the live web search. Uses a stub embedding model.
+
+Usage:
+    python -m benchmarks.bench_context
+"""
+import argparse
+import textwrap
+import time
+import numpy as np
+from benchmarks.stubs import ARTICLE_PARAGRAPH, STATIC_SITE_TOPICS, use_stub_embeddings
+from scripts.config import CONTEXT_CANDIDATES
+
+def corpus(num_articles, syndicated):
+    # One article per topic; the first ``syndicated`` ones are published twice
+    texts, metadatas = [], []
+    for i in range(num_articles):
+        topic = STATIC_SITE_TOPICS[i % len(STATIC_SITE_TOPICS)]
+        body = " ".join(f"{topic} note {i}.{p}: {ARTICLE_PARAGRAPH}" for p in range(12))
+        texts.append(body)
+        metadatas.append({"source": f"https://news.example/{i}"})
+        if i < syndicated:
+            texts.append(f"Syndicated from news.example. {body}")
+            metadatas.append({"source": f"https://mirror.example/{i}"})
+    return texts, metadatas
+
+def main():
+    parser = argparse.ArgumentParser(description="Context packing benchmark")
+    parser.add_argument("--articles", type=int, default=40)
+    parser.add_argument("--syndicated", type=int, default=20, help="Articles also published under a second URL")
+    parser.add_argument("--budgets", default="500,1000,1500,3000", help="CONTEXT_TOKEN_BUDGET values")
+    parser.add_argument("--model", default="llama-3.3-70b-versatile")
+    args = parser.parse_args()
+
+    use_stub_embeddings()
+    from scripts.context import count_tokens, pack_context
+    from scripts.reranker import retrieve
+    from scripts.utils import PROMPT_TEMPLATE
+    from scripts.vector_store import create_vector_db
+
+    texts, metadatas = corpus(args.articles, args.syndicated)
+    vector_db = create_vector_db(texts, metadatas=metadatas)
+    queries = [f"What should I know about {topic}?" for topic in STATIC_SITE_TOPICS]
+    retrieved = {query: retrieve(vector_db, query, k=max(5, CONTEXT_CANDIDATES)) for query in queries}
+    old_template = textwrap.indent(PROMPT_TEMPLATE, " " * 8)  # As the template was written before
+
+    print(f"{len(vector_db.documents)} chunks, {len(queries)} queries, tokens counted for {args.model}")
+    print(f"{'context':<18} {'prompt tokens':>13} {'chunks':>7} {'duplicates':>11} {'over budget':>12} {'pack ms':>8}")
+    old = [count_tokens(old_template.format(query=query, context_text="\n".join(doc.page_content for doc, _ in results[:5])),
+                        args.model) for query, results in retrieved.items()]
+    # Near-duplicates the old prompt sent along, found with an unlimited budget
+    old_duplicates = [pack_context(results[:5], args.model, budget=10 ** 9)["duplicates"] for results in retrieved.values()]
+    print(f"{'top 5 (before)':<18} {np.mean(old):13.0f} {5:7.1f} {np.mean(old_duplicates):11.1f} {'-':>12} {'-':>8}")
+
+    for budget in [int(n) for n in args.budgets.split(",")]:
+        tokens, chunks, duplicates, over_budget, elapsed = [], [], [], [], []
+        for query, results in retrieved.items():
+            start = time.perf_counter()
+            context = pack_context(results, args.model, budget=budget)
+            elapsed.append((time.perf_counter() - start) * 1000)
+            prompt = PROMPT_TEMPLATE.format(query=query, context_text="\n\n".join(context["chunks"]))
+            tokens.append(count_tokens(prompt, args.model))
+            chunks.append(len(context["chunks"]))
+            duplicates.append(context["duplicates"])
+            over_budget.append(context["over_budget"])
+        print(f"{f'budget {budget}':<18} {np.mean(tokens):13.0f} {np.mean(chunks):7.1f} {np.mean(duplicates):11.1f} "
+              f"{np.mean(over_budget):12.1f} {np.mean(elapsed):8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Cold start, throughput (docs/sec), peak RSS and agreement with the PyTorch vectors for each
+embedding backend: torch, onnx (ONNX Runtime) and onnx_int8 (int8-quantized ONNX). Each backend
+runs in a fresh process so start-up and memory are measured in isolation.
+
+The model directory is exported with ``python -m scripts.embedding_service`` first if it does not
+exist (this needs the Hugging Face Hub once). The run fails if a backend's vectors fall below
+``--tolerance`` cosine similarity to the PyTorch vectors for any document.
+
+Usage:
+    python -m benchmarks.bench_embedding_backends --model-dir ./models/bge-small-en-v1.5
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from benchmarks.stubs import ARTICLE_PARAGRAPH, STATIC_SITE_TOPICS
+from scripts.config import EMBEDDING_MODEL, EMBEDDING_MODEL_DIR
+from scripts.embedding_service import EMBEDDING_BACKENDS, export_embedding_model, load_embedding_model
+
+def corpus(num_docs):
+    # Chunk-sized documents on varied topics
+    return [f"{STATIC_SITE_TOPICS[i % len(STATIC_SITE_TOPICS)]}: document {i}. {ARTICLE_PARAGRAPH * 3}"
+            for i in range(num_docs)]
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def measure(backend, model_dir, num_docs, threads, vectors_path):
+    # Runs in the child process: load, embed the corpus and report as JSON
+    start = time.perf_counter()
+    embeddings = load_embedding_model(EMBEDDING_MODEL, backend, model_dir, threads)
+    embeddings.embed_query("warm up")
+    cold_start = time.perf_counter() - start
+
+    texts = corpus(num_docs)
+    start = time.perf_counter()
+    vectors = np.array(embeddings.embed_documents(texts), dtype="float32")
+    elapsed = time.perf_counter() - start
+    np.save(vectors_path, vectors)
+    print(json.dumps({"backend": backend, "cold_start": cold_start, "docs_per_sec": num_docs / elapsed,
+                      "peak_rss_mb": peak_rss_mb()}))
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend benchmark")
+    parser.add_argument("--model-dir", default=EMBEDDING_MODEL_DIR or os.path.join("models", EMBEDDING_MODEL.split("/")[-1]))
+    parser.add_argument("--backends", default=",".join(EMBEDDING_BACKENDS))
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=None, help="ONNX Runtime threads (torch uses its default)")
+    parser.add_argument("--tolerance", type=float, default=0.98, help="Minimum cosine similarity to torch vectors")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--vectors", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return measure(args.child, args.model_dir, args.docs, args.threads, args.vectors)
+
+    if not os.path.isdir(args.model_dir):
+        export_embedding_model(args.model_dir)
+
+    backends = ["torch"] + [b for b in args.backends.split(",") if b != "torch"]
+    results, vectors = [], {}
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in backends:
+            path = os.path.join(directory, f"{backend}.npy")
+            command = [sys.executable, "-m", "benchmarks.bench_embedding_backends", "--child", backend,
+                       "--model-dir", args.model_dir, "--docs", str(args.docs), "--vectors", path]
+            if args.threads:
+                command += ["--threads", str(args.threads)]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+            vectors[backend] = np.load(path)
+
+    print(f"{args.docs} documents of ~{len(corpus(1)[0])} characters, model {EMBEDDING_MODEL} from {args.model_dir}")
+    print(f"{'backend':<10} {'cold start s':>12} {'docs/s':>8} {'peak RSS MB':>12} {'cos mean':>9} {'cos min':>8}")
+    failed = []
+    for result in results:
+        # Vectors are normalized, so the row-wise dot product is the cosine similarity
+        similarity = np.sum(vectors[result["backend"]] * vectors["torch"], axis=1)
+        if similarity.min() < args.tolerance:
+            failed.append(result["backend"])
+        print(f"{result['backend']:<10} {result['cold_start']:12.2f} {result['docs_per_sec']:8.1f} "
+              f"{result['peak_rss_mb']:12.0f} {similarity.mean():9.5f} {similarity.min():8.5f}")
+    if failed:
+        sys.exit(f"❌ Vectors from {', '.join(failed)} are below cosine {args.tolerance} of the torch backend")
+    print(f"✅ All backends within cosine {args.tolerance} of the torch backend")
+
+if __name__ == "__main__":
+    main()
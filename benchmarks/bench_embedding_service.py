@@ -0,0 +1,70 @@
+"""
+Query embedding throughput and latency as concurrent users grow: every session calling one
+shared in-process model directly vs. the microbatching EmbeddingService, with a stub model
+that has the cost shape of a CPU transformer (a fixed cost per forward pass plus a cost per text).
+
+Usage:
+    python -m benchmarks.bench_embedding_service
+"""
+import argparse
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from benchmarks.stubs import StubEmbeddings
+from scripts.embedding_service import EmbeddingService
+
+def run_users(embeddings, users, requests):
+    # Each user embeds queries back to back; returns (queries per second, latencies in ms)
+    def user(index):
+        latencies = []
+        for i in range(requests):
+            start = time.perf_counter()
+            embeddings.embed_query(f"user {index} question {i} about semantic search")
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(users) as pool:
+        latencies = [latency for result in pool.map(user, range(users)) for latency in result]
+    return users * requests / (time.perf_counter() - start), latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding service benchmark")
+    parser.add_argument("--users", default="1,2,4,8,16,32", help="Concurrent user counts")
+    parser.add_argument("--requests", type=int, default=40, help="Queries per user")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=1, help="Threads per worker")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--call-cost", type=float, default=0.008, help="Stub model CPU seconds per forward pass")
+    parser.add_argument("--text-cost", type=float, default=0.002, help="Stub model CPU seconds per text")
+    args = parser.parse_args()
+
+    factory = functools.partial(StubEmbeddings, call_cost=args.call_cost, text_cost=args.text_cost)
+    direct = factory()
+    service = EmbeddingService(model_name=StubEmbeddings.model_name, workers=args.workers, threads=args.threads,
+                               max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, factory=factory)
+    service.embed_query("start the workers")
+
+    print(f"stub model: {args.call_cost * 1000:.0f} ms per pass + {args.text_cost * 1000:.0f} ms per text; "
+          f"service: {args.workers} worker(s), max batch {args.max_batch}, max wait {args.max_wait_ms} ms")
+    print(f"{'users':>5} | {'direct q/s':>10} {'p50 ms':>7} {'p95 ms':>7} | "
+          f"{'service q/s':>11} {'p50 ms':>7} {'p95 ms':>7} {'batch':>6} {'max queue':>9}")
+    try:
+        for users in [int(n) for n in args.users.split(",")]:
+            direct_rate, direct_latencies = run_users(direct, users, args.requests)
+            before = service.stats()
+            service_rate, service_latencies = run_users(service, users, args.requests)
+            after = service.stats()
+            batch = (after["texts"] - before["texts"]) / max(after["batches"] - before["batches"], 1)
+            print(f"{users:>5} | {direct_rate:10.1f} {np.percentile(direct_latencies, 50):7.1f} "
+                  f"{np.percentile(direct_latencies, 95):7.1f} | {service_rate:11.1f} "
+                  f"{np.percentile(service_latencies, 50):7.1f} {np.percentile(service_latencies, 95):7.1f} "
+                  f"{batch:6.1f} {after['max_queue_depth']:9}")
+        print(f"service: {service.stats()}")
+    finally:
+        service.close()
+
+if __name__ == "__main__":
+    main()
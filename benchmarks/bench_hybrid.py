@@ -0,0 +1,159 @@
+"""
+Retrieval quality and latency of dense-only, BM25-only and hybrid search in
+scripts.vector_store, on a synthetic support knowledge base that mixes
+natural-language questions with exact-match lookups (error codes, versions).
+
+Usage:
+    python -m benchmarks.bench_hybrid --products 50 --scale 50000
+"""
+import argparse
+import random
+import time
+import numpy as np
+from scripts.vector_store import BM25Index, create_vector_db
+
+TOPICS = [
+    ("Restart the sync daemon after changing the proxy settings so the new configuration is picked up.",
+     "how do I apply a new proxy configuration"),
+    ("Exported reports are written as UTF-8 CSV files and can be opened in any spreadsheet tool.",
+     "what format are exported reports saved in"),
+    ("Login fails when the system clock drifts more than five minutes from the identity server.",
+     "why can't I sign in when my computer time is wrong"),
+    ("Large uploads are split into 8 MB parts and resumed automatically after a network drop.",
+     "what happens to a big upload if the connection is lost"),
+    ("Audit logs are retained for 90 days and then archived to cold storage.",
+     "how long are audit records kept"),
+    ("Enable two-factor authentication from the security tab of the account settings page.",
+     "where do I turn on 2FA"),
+    ("The mobile app caches the last 200 messages for offline reading.",
+     "can I read messages without internet on my phone"),
+    ("Webhook deliveries are retried with exponential backoff for up to 24 hours.",
+     "what if my webhook endpoint is down"),
+    ("Dark mode follows the operating system theme unless it is overridden in preferences.",
+     "how to switch the interface to a dark theme"),
+    ("API tokens expire after 30 days and must be rotated from the developer console.",
+     "how often do I need to renew access keys"),
+    ("Search results are ranked by relevance first and recency second.",
+     "how is the order of search hits decided"),
+    ("Billing invoices are emailed on the first business day of each month.",
+     "when do I receive my bill"),
+    ("Shared folders inherit the permissions of their parent workspace.",
+     "who can access a folder I share"),
+    ("The installer requires administrator rights and 2 GB of free disk space.",
+     "what do I need before installing"),
+    ("Deleted files stay in the trash for 30 days before permanent removal.",
+     "can I recover something I removed last week"),
+    ("Keyboard shortcuts can be remapped in the accessibility section.",
+     "change hotkeys"),
+    ("Notifications are batched into a daily digest when do-not-disturb is on.",
+     "why do I get alerts only once a day"),
+    ("Database backups run nightly and are encrypted at rest with AES-256.",
+     "are my backups secure"),
+    ("The rate limit is 600 requests per minute per organization.",
+     "how many API calls can we make"),
+    ("Single sign-on supports SAML 2.0 and OpenID Connect providers.",
+     "which SSO protocols are supported"),
+]
+
+PRODUCTS = ["Orion", "Vega", "Lyra", "Draco", "Hydra", "Cygnus", "Aquila", "Perseus", "Auriga", "Carina",
+            "Pavo", "Lupus", "Norma", "Ara", "Crux", "Dorado", "Fornax", "Grus", "Indus", "Mensa"]
+
+def knowledge_base(num_products, seed=0):
+    """
+    Generate one article per (product, topic) pair, each with a unique error code and version.
+
+    Args:
+        num_products (int): Number of products.
+        seed (int): Random seed.
+
+    Returns:
+        tuple: (texts, metadatas, queries), where each query is (kind, text, relevant source).
+    """
+    rng = random.Random(seed)
+    texts, metadatas, queries = [], [], []
+    for p in range(num_products):
+        product = PRODUCTS[p % len(PRODUCTS)] + ("" if p < len(PRODUCTS) else f" {p // len(PRODUCTS) + 1}")
+        for t, (sentence, question) in enumerate(TOPICS):
+            source = f"kb/{p}/{t}"
+            code = f"E{rng.randrange(1000, 99999)}-{len(texts)}"
+            version = f"v{p % 9 + 1}.{t}.{len(texts) % 97}"
+            texts.append(f"{product} help center. {sentence} If the problem persists, contact support "
+                         f"and mention error {code}. This article applies to {product} {version}.")
+            metadatas.append({"source": source})
+            queries.append(("semantic", f"{product}: {question}", source))
+            queries.append(("exact", code if rng.random() < 0.5 else f"error {code}", source))
+            queries.append(("exact", f"{product} {version}", source))
+    return texts, metadatas, queries
+
+def evaluate(vector_db, queries, k, mode, fusion=None):
+    """
+    Run every query through one search mode.
+
+    Returns:
+        dict: hit@k and MRR per query kind, and mean latency in milliseconds.
+    """
+    ranks = {}
+    start = time.perf_counter()
+    for kind, text, relevant in queries:
+        results = vector_db.batch_similarity_search([text], k, mode=mode, fusion=fusion)[0]
+        sources = [doc.metadata["source"] for doc, _ in results]
+        ranks.setdefault(kind, []).append(sources.index(relevant) + 1 if relevant in sources else None)
+    latency = (time.perf_counter() - start) / len(queries) * 1000
+
+    metrics = {"ms/query": latency}
+    for kind, kind_ranks in ranks.items():
+        metrics[f"{kind} hit@k"] = np.mean([rank is not None for rank in kind_ranks])
+        metrics[f"{kind} MRR"] = np.mean([1 / rank if rank else 0 for rank in kind_ranks])
+    return metrics
+
+def bm25_scale(num_chunks, k, seed=0):
+    """
+    Time BM25 ingest and top-k search on a large synthetic corpus without embeddings.
+
+    Returns:
+        tuple: (ingest seconds, ms per query).
+    """
+    rng = random.Random(seed)
+    vocabulary = [word for sentence, _ in TOPICS for word in sentence.lower().split()] + \
+                 [f"term{i}" for i in range(20000)]
+    texts = [" ".join(rng.choices(vocabulary, k=150)) + f" E{i}" for i in range(num_chunks)]
+    queries = [" ".join(rng.choices(vocabulary, k=4)) for _ in range(200)] + \
+              [f"E{rng.randrange(num_chunks)}" for _ in range(200)]
+
+    index = BM25Index()
+    start = time.perf_counter()
+    index.add(list(range(num_chunks)), texts)
+    index.search(queries[:1], k)  # Folds the new postings into the index
+    ingest = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in queries:
+        index.search([query], k)
+    return ingest, (time.perf_counter() - start) / len(queries) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense vs. BM25 vs. hybrid retrieval benchmark")
+    parser.add_argument("--products", type=int, default=20, help="Articles = products x 20 topics")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=50000, help="Chunks for the BM25-only latency run (0 to skip)")
+    args = parser.parse_args()
+
+    texts, metadatas, queries = knowledge_base(args.products)
+    start = time.perf_counter()
+    vector_db = create_vector_db(texts, metadatas, index_type="flat")
+    print(f"articles={len(texts)} queries={len(queries)} k={args.k} build={time.perf_counter() - start:.2f}s")
+    vector_db.similarity_search(queries[0][1], k=args.k, mode="dense")  # Warm up the embedding model
+
+    columns = ["semantic hit@k", "semantic MRR", "exact hit@k", "exact MRR", "ms/query"]
+    print(f"{'mode':<16}" + "".join(f"{column:>16}" for column in columns))
+    for label, mode, fusion in [("dense", "dense", None), ("bm25", "sparse", None),
+                                ("hybrid rrf", "hybrid", "rrf"), ("hybrid weighted", "hybrid", "weighted")]:
+        metrics = evaluate(vector_db, queries, args.k, mode, fusion)
+        print(f"{label:<16}" + "".join(f"{metrics[column]:>16.3f}" for column in columns))
+
+    if args.scale:
+        ingest, latency = bm25_scale(args.scale, args.k)
+        print(f"bm25 at {args.scale} chunks: ingest {ingest:.2f}s, top-{args.k} {latency:.3f} ms/query")
+
+if __name__ == "__main__":
+    main()
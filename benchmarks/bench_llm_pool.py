@@ -0,0 +1,58 @@
+"""
+Benchmark a fresh ChatGroq client per query vs. the shared LLM client pool,
+against a local stand-in chat-completions server.
+
+Usage:
+    python -m benchmarks.bench_llm_pool
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_groq import ChatGroq
+from scripts.llm_pool import LLMClientPool
+from benchmarks.stubs import chat_completions_server
+
+MODEL = "stub-model"
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM client pool benchmark")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per run")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Pool slots per model")
+    args = parser.parse_args()
+
+    with chat_completions_server(first_token_delay=0.02, token_delay=0.0) as server:
+        base_url = server.url("")
+
+        def fresh_client(_):
+            llm = ChatGroq(model_name=MODEL, groq_api_key="stub", groq_api_base=base_url, temperature=0)
+            return llm.invoke("hello").content
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.users) as executor:
+            list(executor.map(fresh_client, range(args.queries)))
+        fresh_time = time.perf_counter() - start
+        fresh_connections = len(server.httpd.connections)
+
+        server.httpd.connections.clear()
+        pool = LLMClientPool(api_key="stub", base_url=base_url, max_concurrency=args.max_concurrency)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.users) as executor:
+            list(executor.map(lambda _: pool.invoke(MODEL, "hello").content, range(args.queries)))
+        pooled_time = time.perf_counter() - start
+        pooled_connections = len(server.httpd.connections)
+
+        # Rate-limited requests are retried with backoff instead of failing
+        server.httpd.rate_limited = 3
+        start = time.perf_counter()
+        tokens = [chunk.content for chunk in pool.stream(MODEL, "hello")]
+        retry_time = time.perf_counter() - start
+        pool.close()
+
+    print(f"queries={args.queries} users={args.users} max_concurrency={args.max_concurrency}")
+    print(f"fresh client: {fresh_time:6.2f}s  connections={fresh_connections}")
+    print(f"pooled:       {pooled_time:6.2f}s  connections={pooled_connections}")
+    print(f"stream after 3x 429: {retry_time:6.2f}s  tokens={len(tokens)}")
+
+if __name__ == "__main__":
+    main()
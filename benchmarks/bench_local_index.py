@@ -0,0 +1,58 @@
+"""
+Crawl a local static-site stand-in into a temporary web index, then compare
+local-index retrieval latency with the live scrape-and-index path.
+
+Usage:
+    python -m benchmarks.bench_local_index
+"""
+import argparse
+import tempfile
+import time
+from scripts.crawler import Crawler, WebIndex
+from scripts.scraper import extract_articles
+from scripts.vector_store import create_vector_db
+from benchmarks.stubs import static_site_server
+
+QUERIES = ["how do faiss vector indexes work", "error code E1234", "python asyncio event loop", "http keep alive"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Local web index benchmark")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--delay", type=float, default=0.0, help="Politeness delay per host")
+    args = parser.parse_args()
+
+    with static_site_server(num_pages=args.pages) as server, tempfile.TemporaryDirectory() as directory:
+        web_index = WebIndex(directory)
+        start = time.perf_counter()
+        stats = Crawler(web_index, delay=args.delay, max_pages=args.pages * 2, max_depth=args.pages).crawl(
+            seeds=[server.url("/page/0")], sitemaps=[server.url("/sitemap.xml")])
+        crawl_time = time.perf_counter() - start
+        private_hits = sum(path.startswith("/private/") for path in server.httpd.requests)
+
+        # A fresh reader, as another Streamlit process would open it
+        reader = WebIndex(directory)
+        vector_db = reader.vector_db
+        vector_db.similarity_search(QUERIES[0], k=5)  # Warm up the embedding model
+        start = time.perf_counter()
+        for query in QUERIES:
+            vector_db.similarity_search(query, k=5)
+        local_ms = (time.perf_counter() - start) / len(QUERIES) * 1000
+
+        # Recrawling finds nothing new to fetch
+        recrawl = Crawler(web_index, delay=args.delay, max_pages=args.pages).crawl(seeds=[server.url("/page/0")])
+
+        urls = [server.url(f"/page/{i}") for i in range(3)]
+        start = time.perf_counter()
+        for query in QUERIES:
+            texts = [text for _, text in extract_articles(urls, use_cache=False) if text]
+            create_vector_db(texts).similarity_search(query, k=5)
+        live_ms = (time.perf_counter() - start) / len(QUERIES) * 1000
+
+    print(f"crawl: {crawl_time:.2f}s {stats} private_requests={private_hits}")
+    print(f"index: {reader.stats()}")
+    print(f"recrawl: {recrawl}")
+    print(f"local index query: {local_ms:8.2f} ms")
+    print(f"live scrape+index: {live_ms:8.2f} ms (3 pages per query)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Cost of the tracing and metrics layer in scripts.metrics: time per span with metrics enabled
+(inside and outside a request trace) and disabled, and time to render the Prometheus
+exposition for a registry with every stage populated.
+
+Usage:
+    python -m benchmarks.bench_metrics
+"""
+import argparse
+import time
+from scripts.metrics import Metrics
+
+STAGES = ["search", "scrape", "split", "embed", "index_build", "index_search", "rerank", "context", "llm",
+          "llm_first_token", "ingest"]
+
+def per_span_us(metrics, spans, traced):
+    start = time.perf_counter()
+    if traced:
+        for i in range(0, spans, 20):
+            with metrics.trace("request"):
+                for j in range(20):
+                    with metrics.span(STAGES[j % len(STAGES)], texts=j):
+                        pass
+    else:
+        for i in range(spans):
+            with metrics.span(STAGES[i % len(STAGES)]):
+                pass
+    return (time.perf_counter() - start) / spans * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics overhead benchmark")
+    parser.add_argument("--spans", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'configuration':<28} {'µs per span':>12}")
+    print(f"{'disabled':<28} {per_span_us(Metrics(enabled=False), args.spans, traced=False):12.2f}")
+    print(f"{'enabled, no trace':<28} {per_span_us(Metrics(), args.spans, traced=False):12.2f}")
+    metrics = Metrics()
+    print(f"{'enabled, 20 spans per trace':<28} {per_span_us(metrics, args.spans, traced=True):12.2f}")
+
+    start = time.perf_counter()
+    text = metrics.render_prometheus()
+    print(f"Prometheus exposition: {len(text.splitlines())} lines rendered in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Time and peak memory to index PDFs: the old doc chat flow (PyPDF2 page loop building one string,
+then split, embed and index it all at once) vs. the streaming ingestion in scripts.ingest (pages
+extracted in a process pool, split per page and embedded in batches as they arrive). Runs on
+the bundled paper and on synthetic PDFs of increasing size, each flow in a fresh process with
+its own embedding cache, and a stub embedding model.
+
+Usage:
+    python -m benchmarks.bench_pdf_ingest
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.stubs import StubEmbeddings, synthetic_pdf, use_stub_embeddings
+
+BUNDLED_PDF = os.path.join("tmp", "NIPS-2017-attention-is-all-you-need-Paper.pdf")
+
+def baseline(path):
+    import PyPDF2
+    from scripts.vector_store import create_vector_db
+    text = ""
+    for page in PyPDF2.PdfReader(path).pages:
+        page_text = page.extract_text()
+        if page_text:
+            text += page_text + "\n"
+    vector_db = create_vector_db([text], metadatas=[{"source": os.path.basename(path)}])
+    return len(vector_db.documents)
+
+def streaming(path):
+    from scripts.ingest import ingest_file
+    from scripts.loaders import get_pdf_pool
+    _, ids = ingest_file(path, os.path.basename(path))
+    get_pdf_pool().shutdown(wait=True)  # So the workers' peak memory is reported below
+    return len(ids)
+
+def measure(flow, path, text_cost):
+    # Runs in the child process
+    use_stub_embeddings(StubEmbeddings(call_cost=0.005, text_cost=text_cost))
+    start = time.perf_counter()
+    chunks = {"baseline": baseline, "streaming": streaming}[flow](path)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"chunks": chunks, "seconds": elapsed,
+                      "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                      "worker_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024}))
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF ingestion benchmark")
+    parser.add_argument("--pages", default="200,1000,3000", help="Synthetic PDF sizes")
+    parser.add_argument("--text-cost", type=float, default=0.0005, help="Stub model CPU seconds per chunk")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return measure(args.child[0], args.child[1], args.text_cost)
+
+    with tempfile.TemporaryDirectory() as directory:
+        pdfs = [BUNDLED_PDF] if os.path.exists(BUNDLED_PDF) else []
+        for pages in [int(n) for n in args.pages.split(",")]:
+            path = os.path.join(directory, f"synthetic-{pages}.pdf")
+            with open(path, "wb") as f:
+                f.write(synthetic_pdf(pages))
+            pdfs.append(path)
+
+        print(f"PDF workers: {os.environ.get('PDF_WORKERS', 'default')}, CPUs: {os.cpu_count()}")
+        print(f"{'document':<48} {'flow':<10} {'chunks':>7} {'seconds':>8} {'peak RSS MB':>12} {'worker MB':>10}")
+        for path in pdfs:
+            for flow in ["baseline", "streaming"]:
+                env = dict(os.environ, CACHE_DIR=os.path.join(directory, f"cache-{flow}-{os.path.basename(path)}"))
+                command = [sys.executable, "-m", "benchmarks.bench_pdf_ingest", "--child", flow, path,
+                           "--text-cost", str(args.text_cost)]
+                output = subprocess.run(command, check=True, capture_output=True, text=True, env=env).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                worker = f"{result['worker_rss_mb']:10.0f}" if flow == "streaming" else f"{'-':>10}"
+                print(f"{os.path.basename(path):<48} {flow:<10} {result['chunks']:>7} {result['seconds']:8.2f} "
+                      f"{result['rss_mb']:12.0f} {worker}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Time to first token and total latency of the live search path: the sequential
+search -> scrape all -> index -> retrieve -> generate flow vs. the overlapped
+asyncio pipeline in scripts.pipeline, against local stand-ins for the search API,
+the websites and the LLM.
+
+Usage:
+    python -m benchmarks.bench_pipeline
+"""
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.stubs import article_server, chat_completions_server, search_api_server
+
+def main():
+    parser = argparse.ArgumentParser(description="Live search pipeline benchmark")
+    parser.add_argument("--delays", default="0.2,0.4,0.8,1.5,3.0", help="Per-site response delays in seconds")
+    parser.add_argument("--search-delay", type=float, default=0.3)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    delays = [float(delay) for delay in args.delays.split(",")]
+
+    with article_server() as sites, chat_completions_server(first_token_delay=0.2, token_delay=0.01) as llm, \
+            tempfile.TemporaryDirectory() as directory:
+        links = [sites.url(f"/article/site-{i}?delay={delay}") for i, delay in enumerate(delays)]
+        with search_api_server(delay=args.search_delay, num_results=len(links), links=links) as search:
+            # Configuration is read at import time; a zero TTL keeps cached articles from hiding site latency
+            os.environ.update(GOOGLE_API_BASE=search.url("/"), GROQ_API_BASE=llm.url(""),
+                              GROQ_API_KEY=os.environ.get("GROQ_API_KEY") or "stub", CACHE_DIR=directory,
+                              CONTENT_CACHE_TTL="0")
+            from scripts.google_search import google_custom_search
+            from scripts.pipeline import run_search_pipeline
+            from scripts.reranker import retrieve
+            from scripts.scraper import extract_articles
+            from scripts.utils import stream_llm
+            from scripts.vector_store import create_vector_db
+
+            def sequential(query):
+                timings, start = {}, time.perf_counter()
+                results = google_custom_search(query)
+                timings["search"] = time.perf_counter() - start
+                texts = [text for _, text in extract_articles([r["link"] for r in results]) if text]
+                chunks = [doc.page_content for doc, _ in retrieve(create_vector_db(texts), query, k=5)]
+                timings["retrieved"] = time.perf_counter() - start
+                for _ in stream_llm(query, chunks, "stub-model"):
+                    timings.setdefault("first_token", time.perf_counter() - start)
+                timings["total"] = time.perf_counter() - start
+                return timings
+
+            def pipelined(query):
+                for kind, payload in run_search_pipeline(query, "stub-model"):
+                    if kind == "done":
+                        return payload
+
+            sequential("warm up the embedding model")
+            print(f"sites: {len(links)} with delays {delays}s, search API {args.search_delay}s")
+            print(f"{'flow':<12} {'search s':>9} {'retrieve s':>11} {'1st token s':>12} {'total s':>8}")
+            for run in range(args.runs):
+                for label, flow in [("sequential", sequential), ("pipeline", pipelined)]:
+                    query = f"{label} query {run}"
+                    timings = flow(query)
+                    print(f"{label:<12} {timings['search']:9.2f} {timings['retrieved']:11.2f} "
+                          f"{timings['first_token']:12.2f} {timings['total']:8.2f}")
+            print(f"pipeline stages (last run): {timings}")
+
+if __name__ == "__main__":
+    main()
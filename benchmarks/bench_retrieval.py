@@ -0,0 +1,270 @@
+"""
+Offline regression suite for the retrieval stack: replays a fixed corpus through
+``create_vector_db`` (split, embed, index) and ``similarity_search`` at scale points from one
+document to 100k chunks, and reports ingest throughput, query latency percentiles, peak RSS and
+recall. Each scale point runs in a fresh process with an empty embedding cache.
+
+The corpus is generated from a fixed seed (each scale is a prefix of the next), or loaded from a
+directory of documents in any supported format. Queries are word windows cut from random chunks:
+``hit@k`` is the share of queries whose source chunk is in the top k, and ``recall@k`` the overlap
+of the top k dense results with exact (flat) search over the same vectors, which shows what the
+approximate index chosen for the corpus size gives up.
+
+Embedders are ``stub`` (the deterministic ``StubEmbeddings``, so runs are comparable across
+machines and versions) and ``real`` (the configured model, run in-process; it must already be in
+the local Hugging Face cache or ``EMBEDDING_MODEL_DIR``). Results are written to JSON; pass an
+earlier file as ``--baseline`` to fail on regressions.
+
+Usage:
+    python -m benchmarks.bench_retrieval
+    python -m benchmarks.bench_retrieval --scales 1,1000 --embedders stub,real
+    python -m benchmarks.bench_retrieval --baseline .cache/benchmarks/bench_retrieval-<commit>.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from benchmarks.stubs import ARTICLE_PARAGRAPH, STATIC_SITE_TOPICS, StubEmbeddings, use_stub_embeddings
+from scripts.config import CHUNK_SIZE, CHUNK_OVERLAP, SEARCH_MODE, VECTOR_INDEX_TYPE
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "so", "vi", "den", "gar", "pol", "tri", "ux", "bel", "cor", "fen"]
+
+# Metrics compared with --baseline, and whether higher is better
+REGRESSION_METRICS = {"ingest_chunks_per_s": True, "embed_chunks_per_s": True, "queries_per_s": True,
+                      "query_p95_ms": False, "peak_rss_mb": False, "recall_at_k": True, "hit_at_k": True}
+
+def vocabulary(size=5000, seed=0):
+    # Topic words plus pseudo-words, drawn with a Zipf-like distribution so chunks share common words
+    rng = random.Random(seed)
+    words = " ".join(STATIC_SITE_TOPICS).split() + ARTICLE_PARAGRAPH.replace(",", "").replace(".", "").lower().split()
+    while len(words) < size:
+        words.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return words, [1 / rank for rank in range(1, len(words) + 1)]
+
+def synthetic_documents(seed=0):
+    # Endless stream of documents; document i only depends on (seed, i)
+    words, weights = vocabulary(seed=seed)
+    i = 0
+    while True:
+        rng = random.Random(seed * 1_000_003 + i)
+        paragraphs = []
+        for _ in range(rng.randint(2, 30)):
+            sentences = [" ".join(rng.choices(words, weights, k=rng.randint(6, 20))).capitalize() + "."
+                         for _ in range(rng.randint(3, 8))]
+            paragraphs.append(" ".join(sentences))
+        yield f"Document {i}: {STATIC_SITE_TOPICS[i % len(STATIC_SITE_TOPICS)]}\n\n" + "\n\n".join(paragraphs)
+        i += 1
+
+def directory_documents(directory):
+    # Documents of every supported format in a directory, in a fixed order
+    from scripts.loaders import SUPPORTED_EXTENSIONS, load_sections
+    for name in sorted(os.listdir(directory)):
+        if os.path.splitext(name)[1].lower().lstrip(".") in SUPPORTED_EXTENSIONS:
+            yield "\n\n".join(text for _, text in load_sections(os.path.join(directory, name)))
+
+def corpus(scale, directory=None, seed=0):
+    """
+    Take documents until they hold about ``scale`` chunks of text; the last one is cut to fit.
+
+    Args:
+        scale (int): Target number of chunks (1 gives a single one-chunk document).
+        directory (str): Directory of documents to load instead of generating them.
+        seed (int): Seed of the generated corpus.
+
+    Returns:
+        list: Document texts.
+    """
+    budget = scale * (CHUNK_SIZE - CHUNK_OVERLAP)
+    texts = []
+    for text in directory_documents(directory) if directory else synthetic_documents(seed):
+        texts.append(text[:budget])
+        budget -= len(texts[-1])
+        if budget <= 0:
+            break
+    return texts
+
+def make_queries(documents, num_queries, words_per_query=12, seed=0):
+    # (query, relevant chunk ids): a word window of a random chunk, also relevant in the
+    # neighbouring chunks when it falls in their overlap
+    rng = random.Random(seed)
+    ids = sorted(documents)
+    queries = []
+    for _ in range(num_queries):
+        position = rng.randrange(len(ids))
+        words = documents[ids[position]].page_content.split()
+        start = rng.randrange(max(1, len(words) - words_per_query + 1))
+        query = " ".join(words[start:start + words_per_query])
+        neighbours = ids[max(0, position - 1):position + 2]
+        queries.append((query, {i for i in neighbours if query in " ".join(documents[i].page_content.split())}))
+    return queries
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def measure(embedder, scale, directory, num_queries, k, mode, call_cost, text_cost):
+    # Runs in the child process
+    if embedder == "stub":
+        use_stub_embeddings(StubEmbeddings(call_cost=call_cost, text_cost=text_cost))
+    from scripts.metrics import get_metrics
+    from scripts.vector_store import build_index, choose_index_type, configure_vector_embeddings, create_vector_db, \
+        embed_documents, embedding_model_name
+
+    texts = corpus(scale, directory)
+    start_rss = rss_mb()
+    start = time.perf_counter()
+    vector_db = create_vector_db(texts, metadatas=[{"source": f"doc-{i}"} for i in range(len(texts))])
+    ingest_seconds = time.perf_counter() - start
+    if vector_db is None:
+        sys.exit("❌ create_vector_db failed")
+    stages = {name: values["total"] for name, values in get_metrics().summary()["stages"].items()}
+    chunks = len(vector_db.documents)
+    chunk_ids = {id(doc): i for i, doc in vector_db.documents.items()}
+    index_type = VECTOR_INDEX_TYPE if VECTOR_INDEX_TYPE != "auto" else choose_index_type(chunks)
+
+    queries = make_queries(vector_db.documents, num_queries)
+    vector_db.similarity_search_with_score(queries[0][0], k, mode=mode)  # Warm up
+    latencies, hits = [], []
+    for query, relevant in queries:
+        start = time.perf_counter()
+        results = vector_db.similarity_search_with_score(query, k, mode=mode)
+        latencies.append(time.perf_counter() - start)
+        hits.append(any(chunk_ids[id(doc)] in relevant for doc, _ in results))
+
+    # Dense top k (one batch) vs. exact search over the same vectors
+    start = time.perf_counter()
+    found = vector_db.batch_similarity_search([query for query, _ in queries], k, mode="dense")
+    batch_seconds = time.perf_counter() - start
+    vectors = embed_documents([vector_db.documents[i] for i in sorted(vector_db.documents)])
+    query_vectors = np.array(configure_vector_embeddings().embed_documents([query for query, _ in queries]), dtype="float32")
+    _, exact = build_index(vectors, "flat", ids=sorted(vector_db.documents)).search(query_vectors, min(k, chunks))
+    recall = np.mean([len({chunk_ids[id(doc)] for doc, _ in results} & set(truth.tolist())) / len(truth)
+                      for results, truth in zip(found, exact)])
+
+    latencies_ms = np.array(latencies) * 1000
+    print(json.dumps({
+        "embedder": embedder, "model": embedding_model_name(), "scale": scale, "documents": len(texts),
+        "characters": sum(len(text) for text in texts), "chunks": chunks, "index_type": index_type,
+        "ingest_seconds": ingest_seconds, "split_seconds": stages.get("split"), "embed_seconds": stages.get("embed"),
+        "index_build_seconds": stages.get("index_build"), "ingest_chunks_per_s": chunks / ingest_seconds,
+        "embed_chunks_per_s": chunks / stages["embed"] if stages.get("embed") else None,
+        "queries": len(queries), "search_mode": mode, "k": k,
+        "query_mean_ms": latencies_ms.mean(), "query_p50_ms": np.percentile(latencies_ms, 50),
+        "query_p95_ms": np.percentile(latencies_ms, 95), "query_p99_ms": np.percentile(latencies_ms, 99),
+        "queries_per_s": len(queries) / sum(latencies), "batch_queries_per_s": len(queries) / batch_seconds,
+        "hit_at_k": float(np.mean(hits)), "recall_at_k": float(recall),
+        "start_rss_mb": start_rss, "peak_rss_mb": rss_mb(),
+    }))
+
+def version():
+    # Commit the results were measured on, with "-dirty" for uncommitted changes
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], check=True, capture_output=True,
+                              text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def regressions(results, baseline, tolerance):
+    """
+    Compare results with an earlier run.
+
+    Args:
+        results (list): Result dicts of this run.
+        baseline (list): Result dicts of the earlier run.
+        tolerance (float): Relative change allowed before a metric counts as a regression
+            (recall and hit rate are compared in absolute terms).
+
+    Returns:
+        list: Descriptions of the regressions found.
+    """
+    previous = {(r["embedder"], r["scale"]): r for r in baseline}
+    found = []
+    for result in results:
+        before = previous.get((result["embedder"], result["scale"]))
+        if before is None:
+            continue
+        for metric, higher_is_better in REGRESSION_METRICS.items():
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None or old == 0:
+                continue
+            if metric in ("recall_at_k", "hit_at_k"):
+                worse = old - new > tolerance / 10
+            else:
+                change = (new - old) / old
+                worse = change < -tolerance if higher_is_better else change > tolerance
+            if worse:
+                found.append(f"{result['embedder']} @ {result['scale']} chunks: {metric} {old:.4g} -> {new:.4g}")
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark suite")
+    parser.add_argument("--scales", default="1,100,1000,10000,100000", help="Target chunk counts")
+    parser.add_argument("--embedders", default="stub", help="stub, real or both")
+    parser.add_argument("--corpus", help="Directory of documents to use instead of the generated corpus")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--mode", default=SEARCH_MODE, help="Search mode: dense, sparse or hybrid")
+    parser.add_argument("--call-cost", type=float, default=0.0, help="Stub model CPU seconds per forward pass")
+    parser.add_argument("--text-cost", type=float, default=0.0, help="Stub model CPU seconds per chunk")
+    parser.add_argument("--output", help="JSON results file (defaults to .cache/benchmarks/bench_retrieval-<commit>.json)")
+    parser.add_argument("--baseline", help="Earlier JSON results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative change that counts as a regression")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return measure(args.child[0], int(args.child[1]), args.corpus, args.queries, args.k, args.mode,
+                       args.call_cost, args.text_cost)
+
+    run = {"version": version(), "python": platform.python_version(), "platform": platform.platform(),
+           "cpus": os.cpu_count(), "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP,
+           "vector_index_type": VECTOR_INDEX_TYPE, "corpus": args.corpus or "synthetic", "results": []}
+    print(f"version {run['version']}, {run['cpus']} CPUs, corpus: {run['corpus']}, {args.queries} queries, "
+          f"k={args.k}, {args.mode} search")
+    print(f"{'embedder':<8} {'scale':>7} {'chunks':>7} {'index':<6} {'ingest s':>9} {'chunks/s':>9} {'p50 ms':>7} "
+          f"{'p95 ms':>7} {'p99 ms':>7} {'q/s':>7} {'hit@k':>6} {'recall@k':>8} {'RSS MB':>7}")
+    for embedder in args.embedders.split(","):
+        for scale in [int(n) for n in args.scales.split(",")]:
+            with tempfile.TemporaryDirectory() as directory:
+                env = dict(os.environ, CACHE_DIR=directory, METRICS_ENABLED="true", METRICS_PORT="0",
+                           EMBEDDING_SERVICE_ENABLED="false")  # Model in this process, so its memory is counted
+                command = [sys.executable, "-m", "benchmarks.bench_retrieval", "--child", embedder, str(scale),
+                           "--queries", str(args.queries), "--k", str(args.k), "--mode", args.mode,
+                           "--call-cost", str(args.call_cost), "--text-cost", str(args.text_cost)]
+                if args.corpus:
+                    command += ["--corpus", args.corpus]
+                process = subprocess.run(command, capture_output=True, text=True, env=env)
+            if process.returncode != 0:
+                error = (process.stderr.strip().splitlines() or ["no output"])[-1]
+                print(f"{embedder:<8} {scale:>7} ❌ {error}")
+                run["results"].append({"embedder": embedder, "scale": scale, "error": error})
+                continue
+            result = json.loads(process.stdout.strip().splitlines()[-1])
+            run["results"].append(result)
+            print(f"{embedder:<8} {scale:>7} {result['chunks']:>7} {result['index_type']:<6} "
+                  f"{result['ingest_seconds']:9.2f} {result['ingest_chunks_per_s']:9.0f} {result['query_p50_ms']:7.2f} "
+                  f"{result['query_p95_ms']:7.2f} {result['query_p99_ms']:7.2f} {result['queries_per_s']:7.0f} "
+                  f"{result['hit_at_k']:6.3f} {result['recall_at_k']:8.3f} {result['peak_rss_mb']:7.0f}")
+
+    output = args.output or os.path.join(".cache", "benchmarks", f"bench_retrieval-{run['version']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        found = regressions([r for r in run["results"] if "error" not in r], baseline["results"], args.tolerance)
+        if found:
+            sys.exit(f"❌ Regressions against {baseline['version']}:\n" + "\n".join(found))
+        print(f"✅ No regressions against {baseline['version']}")
+
+if __name__ == "__main__":
+    main()
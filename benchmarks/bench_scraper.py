@@ -0,0 +1,56 @@
+"""
+Benchmark sequential vs. concurrent article extraction against a local stand-in site.
+
+Usage:
+    python -m benchmarks.bench_scraper
+"""
+import argparse
+import time
+from scripts.scraper import extract_full_article, extract_articles
+from benchmarks.stubs import article_server
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraper latency benchmark")
+    parser.add_argument("--pages", type=int, default=10, help="Number of pages per run")
+    parser.add_argument("--delay", type=float, default=0.5, help="Server delay per page in seconds")
+    parser.add_argument("--slow-delay", type=float, default=30.0, help="Delay of one hanging page")
+    parser.add_argument("--workers", type=int, default=8, help="Max in-flight requests")
+    args = parser.parse_args()
+
+    with article_server() as server:
+        urls = [server.url(f"/article/page-{i}?delay={args.delay}") for i in range(args.pages)]
+
+        start = time.perf_counter()
+        sequential = [extract_full_article(url, use_cache=False) for url in urls]
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent = dict(extract_articles(urls, max_workers=args.workers, use_cache=False))
+        concurrent_time = time.perf_counter() - start
+
+        # Populate the content cache, then measure a fully cached batch
+        dict(extract_articles(urls, max_workers=args.workers))
+        start = time.perf_counter()
+        cached = dict(extract_articles(urls, max_workers=args.workers))
+        cached_time = time.perf_counter() - start
+
+        # One hanging site must not hold up the rest of the batch
+        hanging = urls + [server.url(f"/article/hanging?delay={args.slow_delay}")]
+        start = time.perf_counter()
+        first_result_at = None
+        with_hanging = {}
+        for url, text in extract_articles(hanging, max_workers=args.workers, url_timeout=3, total_timeout=5,
+                                          use_cache=False):
+            first_result_at = first_result_at or time.perf_counter() - start
+            with_hanging[url] = text
+        hanging_time = time.perf_counter() - start
+
+    print(f"pages={args.pages} delay={args.delay}s workers={args.workers}")
+    print(f"sequential:   {sequential_time:7.2f}s  ok={sum(t is not None for t in sequential)}")
+    print(f"concurrent:   {concurrent_time:7.2f}s  ok={sum(t is not None for t in concurrent.values())}")
+    print(f"cached:       {cached_time:7.2f}s  ok={sum(t is not None for t in cached.values())}")
+    print(f"with hanging: {hanging_time:7.2f}s  ok={sum(t is not None for t in with_hanging.values())}"
+          f"  first result after {first_result_at:.2f}s")
+
+if __name__ == "__main__":
+    main()
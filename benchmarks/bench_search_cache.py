@@ -0,0 +1,66 @@
+"""
+Upstream calls and latency of google_custom_search with the shared search cache,
+against a local Custom Search stand-in: cold vs. warm queries, a burst of identical
+concurrent queries in one process and across worker processes, and empty/failed results.
+
+Usage:
+    python -m benchmarks.bench_search_cache
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.stubs import search_api_server
+
+def main():
+    parser = argparse.ArgumentParser(description="Search result cache benchmark")
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--delay", type=float, default=0.3, help="Upstream latency in seconds")
+    args = parser.parse_args()
+
+    with search_api_server(delay=args.delay) as server, tempfile.TemporaryDirectory() as directory:
+        # Configuration is read at import time
+        os.environ["GOOGLE_API_BASE"] = server.url("/")
+        os.environ["CACHE_DIR"] = directory
+        from scripts.cache import get_search_cache
+        from scripts.google_search import google_custom_search
+
+        def timed(queries):
+            start = time.perf_counter()
+            for query in queries:
+                google_custom_search(query)
+            return (time.perf_counter() - start) / len(queries) * 1000
+
+        queries = [f"semantic search topic {i}" for i in range(args.queries)]
+        cold = timed(queries)
+        warm = timed([query.upper() + "  " for query in queries])  # Normalized to the same keys
+        print(f"cold: {cold:8.1f} ms/query   warm: {warm:8.3f} ms/query   upstream calls: {len(server.httpd.requests)}")
+
+        before = len(server.httpd.requests)
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            start = time.perf_counter()
+            list(pool.map(google_custom_search, ["thundering herd"] * args.concurrency))
+        print(f"{args.concurrency} concurrent identical queries: {time.perf_counter() - start:.2f}s, "
+              f"upstream calls: {len(server.httpd.requests) - before}")
+
+        before = len(server.httpd.requests)
+        context = multiprocessing.get_context("fork")
+        with context.Pool(args.processes) as pool:
+            start = time.perf_counter()
+            pool.map(google_custom_search, ["shared across workers"] * args.processes * 4)
+        print(f"{args.processes} worker processes x 4 identical queries: {time.perf_counter() - start:.2f}s, "
+              f"upstream calls: {len(server.httpd.requests) - before}")
+
+        before = len(server.httpd.requests)
+        for query in ["nothing here", "nothing here", "fail once", "fail once"]:
+            google_custom_search(query)
+        print(f"empty result twice + failure twice: upstream calls: {len(server.httpd.requests) - before} "
+              f"(empty result cached, failure not cached)")
+        print(f"cache: {get_search_cache().stats()}")
+
+if __name__ == "__main__":
+    main()
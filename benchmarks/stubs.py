@@ -0,0 +1,434 @@
+"""
+Local stand-in servers and models used by the benchmarks so they never touch the real network.
+"""
+import hashlib
+import io
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+import numpy as np
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+ARTICLE_PARAGRAPH = (
+    "Semantic search engines retrieve passages by meaning rather than exact keywords. "
+    "Documents are split into chunks, embedded into dense vectors and indexed so that the "
+    "nearest neighbours of a query vector can be found quickly, even across large corpora. "
+)
+
+def article_html(title, paragraphs=8):
+    """
+    Build a small, newspaper-friendly HTML article.
+
+    Args:
+        title (str): Article title.
+        paragraphs (int): Number of body paragraphs.
+
+    Returns:
+        str: The HTML document.
+    """
+    body = "\n".join(f"<p>{ARTICLE_PARAGRAPH * 2} ({title}, paragraph {i})</p>" for i in range(paragraphs))
+    return f"<html><head><title>{title}</title></head><body><article><h1>{title}</h1>{body}</article></body></html>"
+
+class _ArticleHandler(BaseHTTPRequestHandler):
+    """Serves ``/article/<name>?delay=<seconds>`` with an artificial delay before responding."""
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        delay = float(parse_qs(parsed.query).get("delay", ["0"])[0])
+        time.sleep(delay)
+
+        body = article_html(parsed.path.rsplit("/", 1)[-1] or "index").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+class _StaticSiteHandler(BaseHTTPRequestHandler):
+    """
+    Serves ``server.pages`` (path -> HTML), plus ``/robots.txt`` and ``/sitemap.xml``.
+    Each page links to the next ``server.fanout`` pages so a crawler can discover them.
+    """
+
+    def do_GET(self):
+        server = self.server
+        path = urlparse(self.path).path
+        with server.lock:
+            server.requests.append(path)
+
+        if path == "/robots.txt":
+            return self._send(200, "text/plain", server.robots_txt)
+        if path == "/sitemap.xml":
+            urls = "".join(f"<url><loc>{server.base_url}{p}</loc></url>" for p in list(server.pages)[:server.sitemap_size])
+            return self._send(200, "application/xml",
+                              f'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>')
+        if path not in server.pages:
+            return self._send(404, "text/plain", "not found")
+        return self._send(200, "text/html; charset=utf-8", server.pages[path])
+
+    def _send(self, status, content_type, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class _ChatCompletionsHandler(BaseHTTPRequestHandler):
+    """
+    Minimal OpenAI/Groq-compatible ``/openai/v1/chat/completions`` endpoint.
+
+    Replies with ``server.reply`` split into word tokens, emitted every ``server.token_delay``
+    seconds when streaming. The first ``server.rate_limited`` requests get a 429 response.
+    """
+    protocol_version = "HTTP/1.1"  # Keep-alive, so connection reuse can be observed
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server.lock:
+            server.requests += 1
+            server.connections.add(self.client_address)
+            limited = server.rate_limited > 0
+            server.rate_limited -= int(limited)
+
+        if limited:
+            return self._send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                                   {"Retry-After": "0.05"})
+
+        model = payload.get("model", "stub-model")
+        tokens = [word + " " for word in server.reply.split()]
+        time.sleep(server.first_token_delay)
+        if not payload.get("stream"):
+            time.sleep(server.token_delay * len(tokens))
+            return self._send_json(200, {
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": len(tokens), "total_tokens": 10 + len(tokens)},
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, token in enumerate(tokens + [None]):
+            delta = {"content": token} if token is not None else {}
+            chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta,
+                                                  "finish_reason": None if token is not None else "stop"}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            if token is not None and i:
+                time.sleep(server.token_delay)
+        self._write_chunk("data: [DONE]\n\n")
+        self._write_chunk("")
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class _SearchApiHandler(BaseHTTPRequestHandler):
+    """
+    Minimal Google Custom Search ``/customsearch/v1`` endpoint.
+
+    Answers after ``server.delay`` seconds with ``server.num_results`` items, linking to
+    ``server.links`` when given. Queries containing "nothing" get no items and queries
+    containing "fail" get a 500 error.
+    """
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query).get("q", [""])[0]
+        with server.lock:
+            server.requests.append(query)
+        time.sleep(server.delay)
+
+        if "fail" in query:
+            return self._send_json(500, {"error": {"code": 500, "message": "Backend Error"}})
+        links = server.links or [f"https://example.com/{i}?q={query}" for i in range(server.num_results)]
+        items = [] if "nothing" in query else [
+            {"title": f"{query} result {i}", "link": link, "snippet": f"About {query}."}
+            for i, link in enumerate(links[:server.num_results])
+        ]
+        self._send_json(200, {"items": items} if items else {})
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubServer:
+    """
+    Runs a ``ThreadingHTTPServer`` on a free localhost port in a background thread.
+    Keyword arguments become attributes of the server, readable by the handler.
+
+    Usage:
+        with StubServer(_ArticleHandler) as server:
+            server.url("/article/a?delay=0.5")
+    """
+
+    def __init__(self, handler, **settings):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        for name, value in settings.items():
+            setattr(self.httpd, name, value)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, path):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def article_server():
+    """Return a ``StubServer`` that serves articles with controlled delays."""
+    return StubServer(_ArticleHandler)
+
+def chat_completions_server(reply="Semantic search finds passages by meaning.", first_token_delay=0.05,
+                            token_delay=0.01, rate_limited=0):
+    """
+    Return a ``StubServer`` that imitates the Groq chat-completions API.
+
+    Args:
+        reply (str): Text every completion returns.
+        first_token_delay (float): Seconds before the first token.
+        token_delay (float): Seconds between streamed tokens.
+        rate_limited (int): Number of initial requests answered with HTTP 429.
+
+    Returns:
+        StubServer: Server exposing ``requests`` and ``connections`` counters on ``httpd``.
+    """
+    return StubServer(_ChatCompletionsHandler, reply=reply, first_token_delay=first_token_delay,
+                      token_delay=token_delay, rate_limited=rate_limited, requests=0, connections=set())
+
+def search_api_server(delay=0.3, num_results=3, links=None):
+    """
+    Return a ``StubServer`` that imitates the Google Custom Search API.
+
+    Args:
+        delay (float): Seconds before each response.
+        num_results (int): Items per successful response.
+        links (list): Result URLs to return, e.g. pages of an ``article_server``.
+
+    Returns:
+        StubServer: Server whose ``httpd.requests`` lists every query received.
+    """
+    return StubServer(_SearchApiHandler, delay=delay, num_results=num_results, links=links, requests=[])
+
+STATIC_SITE_TOPICS = [
+    "faiss vector indexes", "bm25 keyword ranking", "transformer attention", "python asyncio",
+    "streamlit caching", "http keep alive", "product quantization", "error code E1234 troubleshooting",
+]
+
+def static_site_server(num_pages=40, fanout=3, sitemap_size=5, robots_txt="User-agent: *\nDisallow: /private/\n"):
+    """
+    Return a ``StubServer`` hosting a small static site for crawler runs.
+
+    Pages live at ``/page/<i>``; each has a topic-specific article body and links to the
+    next ``fanout`` pages. ``/private/secret`` is disallowed by robots.txt, and every fifth
+    page duplicates the content of page 0 under another URL.
+
+    Args:
+        num_pages (int): Number of article pages.
+        fanout (int): Links from each page to following pages.
+        sitemap_size (int): Number of pages listed in ``/sitemap.xml``.
+        robots_txt (str): Contents of ``/robots.txt``.
+
+    Returns:
+        StubServer: Server whose ``httpd.requests`` lists every requested path.
+    """
+    pages = {}
+    for i in range(num_pages):
+        source = 0 if i and i % 5 == 0 else i
+        topic = STATIC_SITE_TOPICS[source % len(STATIC_SITE_TOPICS)]
+        links = "".join(f'<a href="/page/{j}">page {j}</a> ' for j in range(i + 1, min(i + 1 + fanout, num_pages)))
+        body = "".join(f"<p>Page {source} explains {topic}. {ARTICLE_PARAGRAPH} Detail {k} about {topic}.</p>" for k in range(6))
+        pages[f"/page/{i}"] = (f"<html><head><title>{topic.title()} {source}</title></head><body><article>"
+                               f"<h1>{topic.title()} {source}</h1>{body}</article>"
+                               f'<nav>{links}<a href="/private/secret">secret</a></nav></body></html>')
+    server = StubServer(_StaticSiteHandler, pages=pages, fanout=fanout, sitemap_size=sitemap_size,
+                        robots_txt=robots_txt, requests=[])
+    server.httpd.base_url = server.url("")
+    return server
+
+class StubEmbeddings:
+    """
+    Deterministic stand-in for the embedding model.
+
+    Vectors are normalized hashed bags of words, so texts sharing words are similar. Each call
+    burns CPU shaped like a transformer forward pass: a fixed cost per call (tokenizer and
+    framework overhead) plus a cost per text, measured in thread CPU time so that concurrent
+    callers in one process contend for the interpreter the way they would for the real model.
+    """
+    model_name = "stub-embeddings"
+
+    def __init__(self, dimension=384, call_cost=0.008, text_cost=0.002):
+        """
+        Args:
+            dimension (int): Vector dimension.
+            call_cost (float): CPU seconds per call.
+            text_cost (float): CPU seconds per text.
+        """
+        self.dimension = dimension
+        self.call_cost = call_cost
+        self.text_cost = text_cost
+
+    def _burn(self, seconds):
+        end = time.thread_time() + seconds
+        while time.thread_time() < end:
+            pass
+
+    def embed_documents(self, texts):
+        self._burn(self.call_cost + self.text_cost * len(texts))
+        vectors = np.zeros((len(texts), self.dimension), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                vectors[row, int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16) % self.dimension] += 1.0
+        vectors[:, 0] += 1e-6  # Keeps empty texts at a valid unit vector
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def use_stub_embeddings(embeddings=None):
+    """
+    Make the app embed with a ``StubEmbeddings`` instead of the real model, for benchmarks that
+    measure everything around the embedding step.
+
+    Args:
+        embeddings: Embeddings object to use (defaults to a ``StubEmbeddings``).
+
+    Returns:
+        The embeddings object now in use.
+    """
+    import scripts.answer_cache
+    import scripts.vector_store
+    embeddings = embeddings or StubEmbeddings()
+    scripts.vector_store.configure_vector_embeddings = lambda: embeddings
+    scripts.answer_cache.configure_vector_embeddings = lambda: embeddings
+    return embeddings
+
+class StubChatModel(GenericFakeChatModel):
+    """
+    Chat model that streams the same reply word by word (words and the spaces between them are
+    separate chunks) after ``first_token_delay`` seconds, with ``token_delay`` seconds between
+    chunks. Pass it as ``llm`` to ``stream_llm`` to exercise streaming without the Groq API.
+    """
+    first_token_delay: float = 0.0
+    token_delay: float = 0.0
+
+    def __init__(self, reply="Semantic search finds passages by meaning.", **kwargs):
+        super().__init__(messages=itertools.repeat(AIMessage(content=reply)), **kwargs)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.first_token_delay)
+        for i, chunk in enumerate(super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)):
+            if i:
+                time.sleep(self.token_delay)
+            yield chunk
+
+def synthetic_pdf(num_pages, lines_per_page=45, words_per_line=12, seed=0):
+    """
+    Build a text PDF with the given number of pages, using only the standard Helvetica font.
+
+    Args:
+        num_pages (int): Page count.
+        lines_per_page (int): Lines of text per page.
+        words_per_line (int): Words per line, drawn from the static site topics.
+        seed (int): Random seed, so the same arguments give the same document.
+
+    Returns:
+        bytes: The PDF file.
+    """
+    rng = random.Random(seed)
+    vocabulary = " ".join(STATIC_SITE_TOPICS).split() + ARTICLE_PARAGRAPH.replace(",", "").replace(".", "").split()
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(num_pages):
+        lines = [f"Page {page + 1}."] + [" ".join(rng.choice(vocabulary) for _ in range(words_per_line))
+                                          for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 14 TL 50 790 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode("latin-1"))
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> "
+                       f"/Contents {len(objects)} 0 R >>".encode("latin-1"))
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {num_pages} >>".encode("latin-1")
+
+    pdf, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(pdf)
+
+def synthetic_docx(num_sections, paragraphs_per_section=6, seed=0):
+    """
+    Build a minimal Word document with a heading per section and random topic paragraphs.
+
+    Args:
+        num_sections (int): Number of ``Heading1`` sections.
+        paragraphs_per_section (int): Body paragraphs under each heading.
+        seed (int): Random seed, so the same arguments give the same document.
+
+    Returns:
+        bytes: The .docx file.
+    """
+    rng = random.Random(seed)
+    vocabulary = " ".join(STATIC_SITE_TOPICS).split()
+    body = []
+    for section in range(num_sections):
+        body.append(f'<w:p><w:pPr><w:pStyle w:val="Heading1"/></w:pPr><w:r><w:t>Section {section + 1}</w:t></w:r></w:p>')
+        for _ in range(paragraphs_per_section):
+            words = " ".join(rng.choice(vocabulary) for _ in range(40))
+            body.append(f"<w:p><w:r><w:t>{words}. {ARTICLE_PARAGRAPH}</w:t></w:r></w:p>")
+    document = ('<?xml version="1.0" encoding="UTF-8"?><w:document '
+                'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+                + "".join(body) + "</w:body></w:document>")
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("word/document.xml", document)
+    return buffer.getvalue()
@@ -0,0 +1,240 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import faiss
+import numpy as np
+from scripts.cache import SQLiteStore
+from scripts.config import (CACHE_DIR, EMBEDDING_MODEL, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL,
+                            ANSWER_CACHE_MAX_ENTRIES)
+from scripts.embedding_service import embedding_model_id
+from scripts.metrics import increment
+from scripts.utils import configure_vector_embeddings
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+class CachedAnswer:
+    def __init__(self, query, answer, sources, created_at, similarity):
+        """
+        An answer served from the cache.
+
+        Args:
+            query (str): The past query the answer was generated for.
+            answer (str): The LLM answer.
+            sources (list): Source dicts (title, link, snippet) shown with the answer.
+            created_at (float): Unix time the answer was generated.
+            similarity (float): Cosine similarity between the past and the incoming query.
+        """
+        self.query = query
+        self.answer = answer
+        self.sources = sources
+        self.created_at = created_at
+        self.similarity = similarity
+
+    @property
+    def age(self):
+        """float: Seconds since the answer was generated."""
+        return time.time() - self.created_at
+
+class AnswerCache(SQLiteStore):
+    """
+    Semantic cache of LLM answers, shared by all processes on disk.
+
+    Past queries are stored with their embedding, answer and sources in SQLite. Each process
+    keeps a small in-memory FAISS index of the query embeddings per (scope, LLM, embedding
+    model) and catches up on rows other processes added before every lookup. A query whose
+    nearest past query is at least ``threshold`` similar gets the stored answer back.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS answers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            scope TEXT NOT NULL,
+            model TEXT NOT NULL,
+            embedding_model TEXT NOT NULL,
+            query TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            sources TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            created_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS answers_key ON answers (scope, model, embedding_model, id);
+        CREATE INDEX IF NOT EXISTS answers_created_at ON answers (created_at);
+        CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    """
+
+    def __init__(self, path, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES, embedding_model=EMBEDDING_MODEL):
+        """
+        Initialize the cache.
+
+        Args:
+            path (str): SQLite database file.
+            threshold (float): Minimum cosine similarity for a past query to count as a match.
+            ttl (int): Seconds an answer is served before it must be regenerated.
+            max_entries (int): Upper bound on stored answers; the oldest are dropped first.
+            embedding_model (str): Model the query embeddings come from.
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.embedding_model = embedding_model
+        self._indexes = {}  # (scope, model) -> [faiss index, last row id loaded]
+        self._vectors = OrderedDict()  # Recent query -> embedding, so lookup and put embed once
+        self._lock = threading.Lock()
+        super().__init__(path)
+
+    def embed_query(self, query):
+        """
+        Embed a query with the configured embedding model.
+
+        Args:
+            query (str): Query text.
+
+        Returns:
+            np.ndarray: L2-normalized float32 vector.
+        """
+        with self._lock:
+            if query in self._vectors:
+                self._vectors.move_to_end(query)
+                return self._vectors[query]
+        vector = np.array([configure_vector_embeddings().embed_query(query)], dtype="float32")
+        faiss.normalize_L2(vector)
+        with self._lock:
+            self._vectors[query] = vector[0]
+            while len(self._vectors) > 256:
+                self._vectors.popitem(last=False)
+        return vector[0]
+
+    def _index(self, scope, model, dimension):
+        # Load rows added (by any process) since this process last looked
+        with self._lock:
+            entry = self._indexes.get((scope, model))
+            if entry is None or entry[0].d != dimension:
+                entry = self._indexes[(scope, model)] = [faiss.IndexIDMap2(faiss.IndexFlatIP(dimension)), 0]
+            index, last_id = entry
+            rows = self.conn.execute(
+                "SELECT id, vector FROM answers WHERE scope = ? AND model = ? AND embedding_model = ? AND id > ? "
+                "ORDER BY id", (scope, model, self.embedding_model, last_id)).fetchall()
+            rows = [(row_id, vector) for row_id, vector in rows if len(vector) == dimension * 4]
+            if rows:
+                vectors = np.stack([np.frombuffer(vector, dtype="float32") for _, vector in rows])
+                index.add_with_ids(vectors, np.array([row_id for row_id, _ in rows], dtype="int64"))
+                entry[1] = rows[-1][0]
+            return index
+
+    def lookup(self, query, model, scope="web"):
+        """
+        Find a stored answer for the same or a near-duplicate query.
+
+        Args:
+            query (str): Incoming query.
+            model (str): LLM the answer must come from.
+            scope (str): Where the answer's context came from (e.g. ``web`` or ``local``).
+
+        Returns:
+            CachedAnswer: The closest fresh match, or None.
+        """
+        try:
+            vector = self.embed_query(query)
+            index = self._index(scope, model, len(vector))
+            if index.ntotal == 0:
+                self.count("misses")
+                return None
+
+            similarities, ids = index.search(vector[None, :], min(5, index.ntotal))
+            for similarity, row_id in zip(similarities[0], ids[0]):
+                if row_id == -1 or similarity < self.threshold:
+                    break
+                row = self.conn.execute("SELECT query, answer, sources, created_at FROM answers WHERE id = ?",
+                                        (int(row_id),)).fetchone()
+                if row is None:  # Evicted by some process
+                    with self._lock:
+                        index.remove_ids(np.array([row_id], dtype="int64"))
+                    continue
+                if time.time() - row[3] >= self.ttl:
+                    continue
+
+                self.conn.execute("UPDATE answers SET hits = hits + 1 WHERE id = ?", (int(row_id),))
+                self.count("hits")
+                logging.info(f"⚡ Answer cache hit ({similarity:.3f}) for query: {query}")
+                return CachedAnswer(row[0], row[1], json.loads(row[2]), row[3], float(similarity))
+
+            self.count("misses")
+            return None
+        except Exception as e:
+            logging.error(f"❌ Error looking up answer cache: {str(e)}")
+            return None
+
+    def put(self, query, model, answer, sources, scope="web"):
+        """
+        Store an answer, dropping expired and excess entries.
+
+        Args:
+            query (str): Query the answer was generated for.
+            model (str): LLM that generated it.
+            answer (str): The answer text.
+            sources (list): Source dicts (title, link, snippet) to show with the answer.
+            scope (str): Where the answer's context came from (e.g. ``web`` or ``local``).
+        """
+        try:
+            vector = self.embed_query(query)
+            now = time.time()
+            with self.transaction() as conn:
+                conn.execute(
+                    "INSERT INTO answers (scope, model, embedding_model, query, answer, sources, vector, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (scope, model, self.embedding_model, query, answer, json.dumps(sources, ensure_ascii=False),
+                     vector.astype("float32").tobytes(), now),
+                )
+                self._evict(conn, now)
+        except Exception as e:
+            logging.error(f"❌ Error storing answer in cache: {str(e)}")
+
+    def _evict(self, conn, now):
+        expired = conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,)).rowcount
+        excess = conn.execute(
+            "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)).rowcount
+        if expired or excess:
+            logging.info(f"🧹 Dropped {expired} expired and {excess} excess cached answers")
+
+    def count(self, name, value=1):
+        """Increment a shared counter."""
+        increment("cache_events_total", value, cache="answer", event=name)
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, value),
+        )
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: Hits, misses, hit rate and stored answer count.
+        """
+        stats = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+        entries = self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        return {
+            "hits": stats.get("hits", 0),
+            "misses": stats.get("misses", 0),
+            "hit_rate": stats.get("hits", 0) / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+@functools.lru_cache(maxsize=1)
+def get_answer_cache():
+    """
+    Return the process-wide semantic answer cache.
+
+    Returns:
+        AnswerCache: Cache stored under ``CACHE_DIR``.
+    """
+    return AnswerCache(os.path.join(CACHE_DIR, "answers.sqlite"), embedding_model=embedding_model_id())
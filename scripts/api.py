@@ -0,0 +1,493 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from scripts.answer_cache import get_answer_cache
+from scripts.config import (API_HOST, API_PORT, API_DEFAULT_MODEL, API_MAX_CONCURRENT_SEARCHES,
+                            API_MAX_CONCURRENT_INGESTS, API_MAX_QUEUED, API_QUEUE_TIMEOUT, API_WORKER_THREADS,
+                            API_MAX_UPLOAD_MB, ANSWER_CACHE_ENABLED, CONTEXT_CANDIDATES)
+from scripts.context import pack_context
+from scripts.collection_manager import get_collection_manager
+from scripts.crawler import get_web_index
+from scripts.llm_pool import get_llm_pool
+from scripts.loaders import SUPPORTED_EXTENSIONS
+from scripts.metrics import get_metrics, increment, trace
+from scripts.pipeline import search_pipeline
+from scripts.reranker import retrieve
+from scripts.utils import stream_llm
+from scripts.vector_store import embedding_model_name
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+class ConcurrencyLimiter:
+    """
+    Lets at most ``limit`` requests run at once and ``max_queued`` wait for a slot. Requests
+    beyond that, or that wait longer than ``timeout`` seconds, are turned away with HTTP 503
+    and a ``Retry-After`` header instead of piling up behind the ones already running.
+    """
+
+    def __init__(self, name, limit, max_queued=API_MAX_QUEUED, timeout=API_QUEUE_TIMEOUT):
+        self.name = name
+        self.limit = limit
+        self.max_queued = max_queued
+        self.timeout = timeout
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self):
+        """
+        Wait for a slot.
+
+        Raises:
+            HTTPException: 503 if the queue is full or no slot frees up in time.
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queued:
+            self._reject("too many requests waiting")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except TimeoutError:
+            self._reject(f"no slot free within {self.timeout:g}s")
+        finally:
+            self.waiting -= 1
+        self.running += 1
+
+    def release(self):
+        """Free a slot taken with ``acquire``."""
+        self.running -= 1
+        self._semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+    def stats(self):
+        """dict: Running, waiting and rejected requests, and the limits."""
+        return {"running": self.running, "waiting": self.waiting, "rejected": self.rejected, "limit": self.limit,
+                "max_queued": self.max_queued}
+
+    def _reject(self, reason):
+        self.rejected += 1
+        increment("api_rejected_total", limiter=self.name)
+        logging.warning(f"⚠️ Rejected {self.name} request: {reason}")
+        raise HTTPException(503, f"Server busy ({reason}), retry later", headers={"Retry-After": "1"})
+
+async def iterate_in_thread(iterable):
+    """
+    Consume a blocking iterator (e.g. ``stream_llm``) in a worker thread, without blocking the event loop.
+
+    Args:
+        iterable (iterable): Iterator to consume; it is closed early if the caller stops reading.
+
+    Yields:
+        Its items, as they are produced.
+    """
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    stop = threading.Event()
+    finished = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                loop.call_soon_threadsafe(items.put_nowait, item)
+                if stop.is_set():
+                    break
+        except Exception as e:
+            loop.call_soon_threadsafe(items.put_nowait, e)
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, finished)
+            except RuntimeError:
+                pass  # The event loop has shut down
+
+    producer = asyncio.ensure_future(asyncio.to_thread(produce))
+    try:
+        while (item := await items.get()) is not finished:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        if producer.done():
+            producer.result()
+
+async def answer_events(query, retrieved, model_name):
+    """
+    Stream an LLM answer from retrieved chunks as ``token`` events, then ``done`` with its timings.
+
+    Args:
+        query (str): User query.
+        retrieved (list): Chunk texts or (Document, score) pairs, best first.
+        model_name (str): LLM to answer with.
+
+    Yields:
+        tuple: ``(kind, payload)`` events.
+    """
+    metrics = {}
+    async for token in iterate_in_thread(stream_llm(query, retrieved, model_name, metrics=metrics)):
+        yield "token", token
+    yield "done", {key: metrics.get(key) for key in ("prompt_tokens", "time_to_first_token", "total_time", "error")
+                   if metrics.get(key) is not None}
+
+async def web_search_events(query, model_name):
+    """Answer from a live web search: the events of ``scripts.pipeline.search_pipeline``."""
+    loop = asyncio.get_running_loop()
+    events = asyncio.Queue()
+    # Events come from the event loop and from the pipeline's worker threads
+    emit = lambda kind, payload: loop.call_soon_threadsafe(events.put_nowait, (kind, payload))
+    task = asyncio.ensure_future(search_pipeline(query, model_name, emit))
+    try:
+        while True:
+            kind, payload = await events.get()
+            yield kind, payload
+            if kind == "done":
+                return
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def local_search_events(query, model_name):
+    """Answer from the crawled local web index, with one source per page."""
+    vector_db = get_web_index().vector_db
+    if vector_db is None:
+        yield "error", "⚠️ The local index is empty. Build it with `python -m scripts.crawler --seed <url>`."
+        return
+    results = await asyncio.to_thread(retrieve, vector_db, query, CONTEXT_CANDIDATES)
+    if not results:
+        yield "error", "⚠️ No relevant content found for your query."
+        return
+
+    sources = {}
+    for doc, _ in results:
+        link = doc.metadata.get("source", "")
+        sources.setdefault(link, {"title": doc.metadata.get("title") or link, "link": link,
+                                  "snippet": doc.page_content[:200] + "..."})
+    yield "sources", list(sources.values())
+    async for event in answer_events(query, results, model_name):
+        yield event
+
+async def search_events(query, model_name, scope):
+    """
+    Answer a search from the answer cache, or from the live web or local index and cache the answer.
+
+    Args:
+        query (str): User query.
+        model_name (str): LLM to answer with.
+        scope (str): ``web`` or ``local``.
+
+    Yields:
+        tuple: ``(kind, payload)`` events: ``sources``, ``chunks``, ``token``, ``error`` and ``done``.
+    """
+    if ANSWER_CACHE_ENABLED:
+        cached = await asyncio.to_thread(get_answer_cache().lookup, query, model_name, scope)
+        if cached:
+            yield "sources", cached.sources
+            yield "token", cached.answer
+            yield "done", {"cached": True, "cached_query": cached.query, "similarity": float(cached.similarity)}
+            return
+
+    tokens, sources, failed = [], None, False
+    events = web_search_events(query, model_name) if scope == "web" else local_search_events(query, model_name)
+    async for kind, payload in events:
+        if kind == "token":
+            tokens.append(payload)
+        elif kind == "sources":
+            sources = payload
+        elif kind == "error" or (kind == "done" and "error" in payload):
+            failed = True
+        yield kind, payload
+    if ANSWER_CACHE_ENABLED and tokens and sources and not failed:
+        await asyncio.to_thread(get_answer_cache().put, query, model_name, "".join(tokens), sources, scope)
+
+def chunk_json(doc, score):
+    """dict: A retrieved chunk as returned to API clients."""
+    metadata = {key: value for key, value in doc.metadata.items() if key not in ("source_key", "chunk_hash")}
+    # Scores are None when reranking fell back to retrieval order
+    return {"text": doc.page_content, "score": float(score) if score is not None else None, "metadata": metadata}
+
+async def collection_events(name, query, model_name, k, answer):
+    """
+    Search a collection and optionally answer from the chunks that fit the prompt's token budget.
+
+    Yields:
+        tuple: ``(kind, payload)`` events: ``chunks`` (text, score and metadata), ``token``, ``error`` and ``done``.
+    """
+    start = time.perf_counter()
+    vector_db = await asyncio.to_thread(get_collection_manager().get, name)
+    if vector_db is None:
+        yield "error", f"⚠️ Collection '{name}' is empty."
+        return
+    results = await asyncio.to_thread(retrieve, vector_db, query, k)
+    if not results:
+        yield "error", "⚠️ No relevant content found for your query."
+        return
+    items = pack_context(results, model_name)["items"] if answer else results
+    yield "chunks", [chunk_json(doc, score) for doc, score in items]
+    if answer:
+        async for event in answer_events(query, items, model_name):
+            yield event
+    else:
+        yield "done", {"retrieve_time": time.perf_counter() - start}
+
+class _SlotStreamingResponse(StreamingResponse):
+    # Holds a limiter slot until the stream ends, even if the client disconnects before it starts
+    def __init__(self, content, limiter, **kwargs):
+        super().__init__(content, **kwargs)
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
+            self.limiter.release()
+
+async def _ndjson(events, name, attributes):
+    with trace(name, **attributes):
+        try:
+            async for kind, payload in events:
+                yield json.dumps({"event": kind, "data": payload}, ensure_ascii=False, default=str) + "\n"
+        finally:
+            await events.aclose()
+
+async def answer_response(request, events, stream, limiter_name, trace_name, **attributes):
+    """
+    Run an answer once a slot is free: streamed as NDJSON events, or collected into one JSON object.
+
+    Args:
+        request (Request): The request.
+        events (async iterator): ``(kind, payload)`` events of the answer.
+        stream (bool): Stream ``{"event": kind, "data": payload}`` lines as they happen.
+        limiter_name (str): Concurrency limiter the request counts against.
+        trace_name (str): Name of the request trace.
+        **attributes: Details stored with the trace.
+
+    Returns:
+        Response: The NDJSON stream, or JSON with ``answer``, ``sources``, ``chunks``, ``error``
+            and ``timings`` (answer and sources are null if the pipeline failed before them).
+    """
+    limiter = request.app.state.limiters[limiter_name]
+    await limiter.acquire()
+    if stream:
+        return _SlotStreamingResponse(_ndjson(events, trace_name, attributes), limiter,
+                                      media_type="application/x-ndjson")
+    try:
+        result, tokens = {"answer": None, "sources": None, "chunks": None, "error": None, "timings": {}}, []
+        with trace(trace_name, **attributes):
+            async for kind, payload in events:
+                if kind == "token":
+                    tokens.append(payload)
+                elif kind == "done":
+                    result["timings"] = payload
+                else:
+                    result[kind] = payload
+        result["answer"] = "".join(tokens) if tokens else None
+        return JSONResponse(result)
+    finally:
+        limiter.release()
+
+async def read_json(request, required=()):
+    """
+    Parse a JSON object request body.
+
+    Raises:
+        HTTPException: 400 if the body is not a JSON object or lacks a non-empty required field.
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Request body must be JSON")
+    if not isinstance(body, dict):
+        raise HTTPException(400, "Request body must be a JSON object")
+    for field in required:
+        if not body.get(field):
+            raise HTTPException(400, f"'{field}' is required")
+    return body
+
+def collection_name(request):
+    """Return the name of the existing shared collection in the path, or raise HTTP 404."""
+    name = request.path_params["name"]
+    # Collections private to a Streamlit session are not visible to API clients
+    if not get_collection_manager().accessible(name):
+        raise HTTPException(404, f"Collection '{name}' not found")
+    return name
+
+async def health(request):
+    return JSONResponse({"status": "ok", "collections": get_collection_manager().stats(),
+                         "limiters": {name: limiter.stats() for name, limiter in request.app.state.limiters.items()}})
+
+async def metrics(request):
+    return PlainTextResponse(get_metrics().render_prometheus(), media_type="text/plain; version=0.0.4")
+
+async def search(request):
+    """POST /search ``{"query", "model"?, "scope"?: "web" | "local", "stream"?}``: answer from the web or local index."""
+    body = await read_json(request, required=["query"])
+    scope = body.get("scope", "web")
+    if scope not in ("web", "local"):
+        raise HTTPException(400, "'scope' must be 'web' or 'local'")
+    model_name = body.get("model") or API_DEFAULT_MODEL
+    query = str(body["query"]).strip()
+    return await answer_response(request, search_events(query, model_name, scope), body.get("stream", False),
+                                 "search", f"api_{scope}_search", query=query, model=model_name)
+
+async def list_collections(request):
+    manager = get_collection_manager()
+    return JSONResponse({"collections": [manager.describe(name) for name in manager.names()]})
+
+async def describe_collection(request):
+    return JSONResponse(get_collection_manager().describe(collection_name(request)))
+
+async def delete_collection(request):
+    name = collection_name(request)
+    await asyncio.to_thread(get_collection_manager().delete, name)
+    return JSONResponse({"deleted": name})
+
+async def remove_source(request):
+    """DELETE /collections/{name}/sources/{key}: take a source (key from the collection's description) out of a collection."""
+    name, key = collection_name(request), request.path_params["key"]
+    if not await asyncio.to_thread(get_collection_manager().remove_source, name, key):
+        raise HTTPException(404, f"Source '{key}' not found in collection '{name}'")
+    return JSONResponse(get_collection_manager().describe(name))
+
+async def add_to_collection(name, add, items):
+    """Run a collection write in a worker thread; invalid names are HTTP 400, names of private collections 403."""
+    try:
+        return await asyncio.to_thread(add, name, items)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except PermissionError as e:
+        raise HTTPException(403, str(e))
+
+async def ingest_urls(request):
+    """POST /collections/{name}/urls ``{"urls": [...]}``: scrape and index web pages, creating the collection."""
+    body = await read_json(request, required=["urls"])
+    urls = body["urls"]
+    if not isinstance(urls, list) or not all(isinstance(url, str) and url.startswith(("http://", "https://"))
+                                             for url in urls):
+        raise HTTPException(400, "'urls' must be a list of http(s) URLs")
+    name = request.path_params["name"]
+    async with request.app.state.limiters["ingest"]:
+        with trace("api_url_ingest", collection=name, urls=len(urls)):
+            status = await add_to_collection(name, get_collection_manager().add_urls, urls)
+    return JSONResponse({"collection": name, "indexed": [url for url, ok in status.items() if ok],
+                         "failed": [url for url, ok in status.items() if not ok],
+                         "chunks": get_collection_manager().describe(name)["chunks"]})
+
+async def upload_documents(request):
+    """POST /collections/{name}/documents (multipart ``files``): index documents, creating the collection."""
+    if int(request.headers.get("content-length") or 0) > API_MAX_UPLOAD_MB * 1024 * 1024:
+        raise HTTPException(413, f"Uploads are limited to {API_MAX_UPLOAD_MB:g} MB")
+    name = request.path_params["name"]
+    async with request.form() as form:
+        uploads = [upload for upload in form.getlist("files") if hasattr(upload, "filename")]
+        if not uploads:
+            raise HTTPException(400, "Attach documents as 'files'")
+        unsupported = [upload.filename for upload in uploads
+                       if os.path.splitext(upload.filename or "")[1].lower().lstrip(".") not in SUPPORTED_EXTENSIONS]
+        if unsupported:
+            raise HTTPException(400, f"Unsupported file type: {', '.join(unsupported)} "
+                                     f"(expected {', '.join(SUPPORTED_EXTENSIONS)})")
+
+        files = []
+        for upload in uploads:
+            # Hashed in blocks; the upload stays spooled to disk for ingestion
+            digest = hashlib.sha256()
+            while block := await upload.read(1024 * 1024):
+                digest.update(block)
+            await upload.seek(0)
+            files.append((digest.hexdigest(), upload.filename, upload.file))
+
+        async with request.app.state.limiters["ingest"]:
+            with trace("api_document_upload", collection=name, files=len(files)):
+                status = await add_to_collection(name, get_collection_manager().add_files, files)
+    return JSONResponse({"collection": name, "documents": [{"name": file_name, "indexed": status[file_hash]}
+                                                           for file_hash, file_name, _ in files],
+                         "chunks": get_collection_manager().describe(name)["chunks"]})
+
+async def query_collection(request):
+    """POST /collections/{name}/query ``{"query", "k"?, "answer"?, "model"?, "stream"?}``: search a collection."""
+    body = await read_json(request, required=["query"])
+    name = collection_name(request)
+    model_name = body.get("model") or API_DEFAULT_MODEL
+    query, answer = str(body["query"]).strip(), body.get("answer", True)
+    try:
+        k = int(body.get("k", CONTEXT_CANDIDATES))
+    except (TypeError, ValueError):
+        raise HTTPException(400, "'k' must be an integer")
+    return await answer_response(request, collection_events(name, query, model_name, k, answer),
+                                 body.get("stream", False), "search", "api_collection_query",
+                                 collection=name, query=query)
+
+async def http_error(request, exc):
+    return JSONResponse({"error": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Blocking pipeline steps run in one shared pool sized for the concurrency limits
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(API_WORKER_THREADS, thread_name_prefix="api-worker"))
+    app.state.limiters = {"search": ConcurrencyLimiter("search", API_MAX_CONCURRENT_SEARCHES),
+                          "ingest": ConcurrencyLimiter("ingest", API_MAX_CONCURRENT_INGESTS)}
+    try:
+        # Load the shared embedding model before the first request needs it
+        logging.info(f"🧠 Embedding model: {await asyncio.to_thread(embedding_model_name)}")
+    except Exception as e:
+        logging.warning(f"⚠️ Embedding model not loaded at startup: {str(e)}")
+    yield
+    get_llm_pool().close()
+
+def create_app():
+    """
+    Build the API application.
+
+    Every request shares the process's embedding model, LLM client pool and caches; collections are
+    persisted by ``scripts.collection_manager`` and shared with the Streamlit app.
+
+    Returns:
+        Starlette: ASGI application.
+    """
+    routes = [
+        Route("/health", health),
+        Route("/metrics", metrics),
+        Route("/search", search, methods=["POST"]),
+        Route("/collections", list_collections),
+        Route("/collections/{name}", describe_collection),
+        Route("/collections/{name}", delete_collection, methods=["DELETE"]),
+        Route("/collections/{name}/urls", ingest_urls, methods=["POST"]),
+        Route("/collections/{name}/documents", upload_documents, methods=["POST"]),
+        Route("/collections/{name}/query", query_collection, methods=["POST"]),
+        Route("/collections/{name}/sources/{key}", remove_source, methods=["DELETE"]),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan, exception_handlers={HTTPException: http_error})
+
+app = create_app()
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Headless HTTP API for search, ingestion and chat")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+import os
+import sqlite3
+import threading
+import time
+import functools
+import json
+import logging
+from contextlib import contextmanager
+from scripts.config import (CACHE_DIR, CONTENT_CACHE_TTL, CONTENT_CACHE_MAX_BYTES, SEARCH_CACHE_TTL,
+                            SEARCH_CACHE_NEGATIVE_TTL)
+from scripts.metrics import increment
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+def connect_sqlite(path):
+    """
+    Open a SQLite database that several processes can safely share.
+
+    Args:
+        path (str): Path of the database file (parent directories are created).
+
+    Returns:
+        sqlite3.Connection: Autocommit connection in WAL mode.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the single writer
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+class SQLiteStore:
+    """
+    Base class for disk-backed stores shared between threads and Streamlit worker processes.
+    Each thread gets its own connection; writes go through ``transaction()``.
+    """
+    SCHEMA = ""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.conn.executescript(self.SCHEMA)
+
+    @property
+    def conn(self):
+        if getattr(self._local, "conn", None) is None:
+            self._local.conn = connect_sqlite(self.path)
+        return self._local.conn
+
+    @contextmanager
+    def transaction(self):
+        """Run a write transaction, taking the database write lock up front."""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+class CacheEntry:
+    def __init__(self, text, etag, last_modified, fetched_at, ttl):
+        """
+        A cached article.
+
+        Args:
+            text (str): Extracted article text.
+            etag (str): ETag returned by the server, if any.
+            last_modified (str): Last-Modified header returned by the server, if any.
+            fetched_at (float): Unix time the text was fetched or last revalidated.
+            ttl (int): Seconds the entry stays fresh.
+        """
+        self.text = text
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+        self.fresh = time.time() - fetched_at < ttl
+
+    @property
+    def can_revalidate(self):
+        return bool(self.etag or self.last_modified)
+
+class ContentCache(SQLiteStore):
+    """
+    Disk-backed URL -> extracted text cache with TTL, size-bounded LRU eviction and
+    ETag/Last-Modified revalidation. Hit/miss counters are shared by all processes.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            text TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL NOT NULL,
+            accessed_at REAL NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at);
+        CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    """
+
+    def __init__(self, path, ttl=CONTENT_CACHE_TTL, max_bytes=CONTENT_CACHE_MAX_BYTES):
+        """
+        Initialize the cache.
+
+        Args:
+            path (str): SQLite database file.
+            ttl (int): Seconds before an entry must be revalidated or refetched.
+            max_bytes (int): Upper bound on the total size of cached text.
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        super().__init__(path)
+
+    def get(self, url):
+        """
+        Look up a URL and mark it as recently used.
+
+        Args:
+            url (str): The article URL.
+
+        Returns:
+            CacheEntry: The cached entry (possibly stale), or None if not cached.
+        """
+        row = self.conn.execute(
+            "SELECT text, etag, last_modified, fetched_at FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            self.count("misses")
+            return None
+
+        self.conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        entry = CacheEntry(*row, ttl=self.ttl)
+        self.count("hits" if entry.fresh else "stale")
+        return entry
+
+    def put(self, url, text, etag=None, last_modified=None):
+        """
+        Store extracted text for a URL, evicting least recently used entries if needed.
+
+        Args:
+            url (str): The article URL.
+            text (str): Extracted article text.
+            etag (str): ETag response header, if any.
+            last_modified (str): Last-Modified response header, if any.
+        """
+        now = time.time()
+        size = len(text.encode("utf-8"))
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url, text, etag, last_modified, fetched_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, text, etag, last_modified, now, now, size),
+            )
+            self._evict(conn)
+
+    def touch(self, url):
+        """Mark a stale entry as fresh again after a ``304 Not Modified`` response."""
+        now = time.time()
+        self.conn.execute("UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+        self.count("revalidated")
+
+    def count(self, name, value=1):
+        """Increment a shared counter."""
+        increment("cache_events_total", value, cache="content", event=name)
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, value),
+        )
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: Counters (hits, misses, stale, revalidated), entry count, bytes used and hit rate.
+        """
+        stats = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+        entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        lookups = stats.get("hits", 0) + stats.get("misses", 0) + stats.get("stale", 0)
+        return {
+            "hits": stats.get("hits", 0),
+            "misses": stats.get("misses", 0),
+            "stale": stats.get("stale", 0),
+            "revalidated": stats.get("revalidated", 0),
+            "entries": entries,
+            "bytes": size,
+            "hit_rate": stats.get("hits", 0) / lookups if lookups else 0.0,
+        }
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for url, size in conn.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= size
+            evicted += 1
+        logging.info(f"🧹 Evicted {evicted} cached articles to stay under {self.max_bytes} bytes")
+
+@functools.lru_cache(maxsize=1)
+def get_content_cache():
+    """
+    Return the process-wide scraped content cache.
+
+    Returns:
+        ContentCache: Cache stored under ``CACHE_DIR``.
+    """
+    return ContentCache(os.path.join(CACHE_DIR, "content.sqlite"))
+
+class SearchCache(SQLiteStore):
+    """
+    Disk-backed search query -> results cache shared by all processes.
+
+    Results expire after ``ttl`` seconds, empty results after the shorter ``negative_ttl``.
+    Leases let one process fetch a query while others wait for its result.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS searches (
+            key TEXT PRIMARY KEY,
+            results TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS searches_expires_at ON searches (expires_at);
+        CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires_at REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    """
+
+    def __init__(self, path, ttl=SEARCH_CACHE_TTL, negative_ttl=SEARCH_CACHE_NEGATIVE_TTL):
+        """
+        Initialize the cache.
+
+        Args:
+            path (str): SQLite database file.
+            ttl (int): Seconds non-empty results are served.
+            negative_ttl (int): Seconds empty results are served.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        super().__init__(path)
+
+    def get(self, key, count=True):
+        """
+        Look up fresh results.
+
+        Args:
+            key (str): Cache key of the search.
+            count (bool): Record the lookup in the hit/miss counters.
+
+        Returns:
+            list: The cached results, or None if missing or expired.
+        """
+        row = self.conn.execute("SELECT results FROM searches WHERE key = ? AND expires_at > ?",
+                                (key, time.time())).fetchone()
+        if count:
+            self.count("hits" if row else "misses")
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, results):
+        """
+        Store results, dropping expired entries.
+
+        Args:
+            key (str): Cache key of the search.
+            results (list): Search results; an empty list is kept for ``negative_ttl`` only.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO searches (key, results, expires_at) VALUES (?, ?, ?)",
+                         (key, json.dumps(results, ensure_ascii=False), now + (self.ttl if results else self.negative_ttl)))
+            conn.execute("DELETE FROM searches WHERE expires_at <= ?", (now,))
+
+    def acquire(self, key, timeout):
+        """
+        Take the lease to fetch a key, unless another process holds an unexpired one.
+
+        Args:
+            key (str): Cache key of the search.
+            timeout (float): Seconds until the lease lapses if it is never released.
+
+        Returns:
+            bool: True if this caller should fetch.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+            return conn.execute("INSERT OR IGNORE INTO leases (key, expires_at) VALUES (?, ?)",
+                                (key, now + timeout)).rowcount == 1
+
+    def release(self, key):
+        """Release a lease taken with ``acquire``."""
+        self.conn.execute("DELETE FROM leases WHERE key = ?", (key,))
+
+    def count(self, name, value=1):
+        """Increment a shared counter."""
+        increment("cache_events_total", value, cache="search", event=name)
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, value),
+        )
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: Hits, misses, upstream calls, coalesced waits, live entries and hit rate.
+        """
+        stats = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+        entries = self.conn.execute("SELECT COUNT(*) FROM searches WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+        lookups = stats.get("hits", 0) + stats.get("misses", 0)
+        return {
+            "hits": stats.get("hits", 0),
+            "misses": stats.get("misses", 0),
+            "upstream": stats.get("upstream", 0),
+            "coalesced": stats.get("coalesced", 0),
+            "entries": entries,
+            "hit_rate": stats.get("hits", 0) / lookups if lookups else 0.0,
+        }
+
+@functools.lru_cache(maxsize=1)
+def get_search_cache():
+    """
+    Return the process-wide search result cache.
+
+    Returns:
+        SearchCache: Cache stored under ``CACHE_DIR``.
+    """
+    return SearchCache(os.path.join(CACHE_DIR, "searches.sqlite"))
@@ -0,0 +1,591 @@
+import fcntl
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from langchain.schema import Document
+from scripts.cache import SQLiteStore
+from scripts.config import COLLECTIONS_DIR, COLLECTIONS_MAX_LOADED
+from scripts.ingest import IndexWriter, index_chunks, ingest_files
+from scripts.metrics import increment, span
+from scripts.scraper import extract_articles
+from scripts.vector_store import STORE_FORMAT_VERSION, VectorStore, chunk_hash, embedding_model_name, split_texts
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+COLLECTION_NAME_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+# Chunk metadata set per collection; the chunk store keeps the rest (page, section, ...)
+COLLECTION_METADATA = ("source", "source_key", "chunk_hash")
+
+def document_hash(data):
+    """
+    Hash raw file contents so the same upload is recognised across reruns, sessions and collections.
+
+    Args:
+        data (bytes): File contents.
+
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+class CollectionLock:
+    """
+    Re-entrant lock on one collection, held across the threads of a process (``RLock``) and
+    across processes (``flock`` on a lock file), so only one writer changes a collection and
+    nobody loads its store while it is being saved.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, "a")
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+class CollectionWriter(IndexWriter):
+    """
+    Index writer for one collection. Chunks whose text the collection already holds (by
+    ``chunk_hash``) are not indexed twice, and every chunk is kept by its ``source_key`` so
+    new sources can be written to the chunk store.
+    """
+
+    def __init__(self, vector_db, hashes):
+        super().__init__(vector_db)
+        self.hashes = hashes
+        self.chunks = {}  # source key -> Document chunks, in order
+
+    def add(self, documents):
+        new = []
+        with self._lock:
+            for doc in documents:
+                doc.metadata["chunk_hash"] = digest = chunk_hash(doc.page_content)
+                self.chunks.setdefault(doc.metadata["source_key"], []).append(doc)
+                if digest not in self.hashes:
+                    self.hashes.add(digest)
+                    new.append(doc)
+        return super().add(new) if new else []
+
+class CollectionManager(SQLiteStore):
+    """
+    Named, persistent collections of web pages and documents, kept by every session, API
+    client and worker process.
+
+    A collection is either private to an owner (e.g. a Streamlit session ID), which is the
+    only one that lists, reads or writes it, or shared (no owner) and visible to everyone.
+
+    A source (a URL, or a file keyed by its content hash) is split and embedded once: its
+    chunks live in a SQLite chunk store that holds each distinct text once, and a collection
+    adding a source that is already stored links to those chunks instead of indexing it again.
+    Each collection's vector store is saved under ``<directory>/stores/<name>`` and loaded
+    memory-mapped, so all readers share its pages; beyond ``max_loaded`` collections, the
+    least recently used are dropped from memory. Writes and loads of a collection hold its
+    ``CollectionLock``, so worker processes never interleave them.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS collections (name TEXT PRIMARY KEY, owner TEXT, created_at REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS sources (
+            key TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            chunks INTEGER NOT NULL,
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS chunks (hash TEXT PRIMARY KEY, text TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS source_chunks (
+            key TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            metadata TEXT NOT NULL,
+            PRIMARY KEY (key, position)
+        );
+        CREATE INDEX IF NOT EXISTS source_chunks_hash ON source_chunks (hash);
+        CREATE TABLE IF NOT EXISTS members (
+            collection TEXT NOT NULL,
+            key TEXT NOT NULL,
+            name TEXT NOT NULL,
+            added_at REAL NOT NULL,
+            PRIMARY KEY (collection, key)
+        );
+        CREATE INDEX IF NOT EXISTS members_key ON members (key);
+    """
+
+    def __init__(self, directory=COLLECTIONS_DIR, max_loaded=COLLECTIONS_MAX_LOADED):
+        """
+        Initialize the manager.
+
+        Args:
+            directory (str): Directory holding ``collections.sqlite`` and the saved stores.
+            max_loaded (int): Collections kept in memory at once.
+        """
+        self.directory = directory
+        self.max_loaded = max(1, max_loaded)
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self._loaded = OrderedDict()  # name -> (VectorStore, manifest mtime), least recently used first
+        self._lock = threading.Lock()
+        self._collection_locks = {}
+        super().__init__(os.path.join(directory, "collections.sqlite"))
+
+    def store_path(self, name):
+        """str: Directory a collection's vector store is saved to."""
+        return os.path.join(self.directory, "stores", name)
+
+    def create(self, name, owner=None):
+        """
+        Create a collection unless it exists.
+
+        Args:
+            name (str): Up to 64 letters, digits, ``.``, ``_`` or ``-``.
+            owner (str): Owner a new collection is private to; None creates a shared collection.
+
+        Raises:
+            ValueError: If the name is not valid.
+            PermissionError: If the name belongs to a collection private to another owner.
+        """
+        if not isinstance(name, str) or not COLLECTION_NAME_PATTERN.fullmatch(name):
+            raise ValueError(f"Invalid collection name '{name}': use up to 64 letters, digits, '.', '_' or '-'")
+        with self.transaction() as conn:
+            row = conn.execute("SELECT owner FROM collections WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                conn.execute("INSERT INTO collections (name, owner, created_at) VALUES (?, ?, ?)",
+                             (name, owner, time.time()))
+            elif row[0] is not None and row[0] != owner:
+                raise PermissionError(f"Collection '{name}' belongs to another session")
+
+    def __contains__(self, name):
+        return self.conn.execute("SELECT 1 FROM collections WHERE name = ?", (name,)).fetchone() is not None
+
+    def accessible(self, name, owner=None):
+        """
+        Tell whether a collection exists and is shared or private to ``owner``.
+
+        Args:
+            name (str): Collection name.
+            owner (str): Owner asking, or None for shared collections only.
+
+        Returns:
+            bool: True if the owner may list, read and write the collection.
+        """
+        row = self.conn.execute("SELECT owner FROM collections WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] in (None, owner)
+
+    def names(self, owner=None):
+        """
+        List the collections an owner can see.
+
+        Args:
+            owner (str): Owner whose private collections are listed too; None lists shared collections only.
+
+        Returns:
+            list: Names of the shared collections and the owner's private ones, sorted.
+        """
+        rows = self.conn.execute("SELECT name FROM collections WHERE owner IS NULL OR owner = ? ORDER BY name", (owner,))
+        return [name for name, in rows]
+
+    def sources(self, name):
+        """dict: Source key -> display name of every source in a collection, oldest first."""
+        rows = self.conn.execute("SELECT key, name FROM members WHERE collection = ? ORDER BY added_at, rowid", (name,))
+        return dict(rows.fetchall())
+
+    def describe(self, name):
+        """
+        Describe a collection without loading it.
+
+        Args:
+            name (str): Collection name.
+
+        Returns:
+            dict: ``name``, whether it is ``shared``, ``sources`` (key, name and kind), distinct
+                ``chunks`` and whether it is ``loaded`` in memory, or None if there is no such collection.
+        """
+        row = self.conn.execute("SELECT owner FROM collections WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        sources = self.conn.execute("""
+            SELECT m.key, m.name, s.kind FROM members m JOIN sources s ON s.key = m.key
+            WHERE m.collection = ? ORDER BY m.added_at, m.rowid
+        """, (name,)).fetchall()
+        chunks = self.conn.execute("""
+            SELECT COUNT(DISTINCT sc.hash) FROM members m JOIN source_chunks sc ON sc.key = m.key
+            WHERE m.collection = ?
+        """, (name,)).fetchone()[0]
+        with self._lock:
+            loaded = name in self._loaded
+        return {"name": name, "shared": row[0] is None, "sources": [{"key": key, "name": source, "kind": kind} for key, source, kind in sources],
+                "chunks": chunks, "loaded": loaded}
+
+    def get(self, name):
+        """
+        Return a collection's vector store, loading it memory-mapped on first use and again
+        whenever another process has saved a newer one.
+
+        Args:
+            name (str): Collection name.
+
+        Returns:
+            VectorStore: The store shared by all callers, or None if the collection is missing or empty.
+        """
+        entry = self._cached(name)
+        if entry is not None:
+            return entry
+        with self._collection_lock(name):
+            return self._open(name)
+
+    def add_files(self, name, files, owner=None):
+        """
+        Add documents to a collection, creating it if needed. Files already in the chunk store
+        (added to any collection) are linked without being read or embedded again; the others
+        are streamed in with ``ingest_files``.
+
+        Args:
+            name (str): Collection name.
+            files (list): (file_hash, file name, source) tuples; the hash comes from ``document_hash``
+                and the source is a path or binary file-like object.
+            owner (str): Owner adding the files; a new collection is private to it (shared if None).
+
+        Returns:
+            dict: File hash -> True if the document is in the collection, False if it produced no chunks or failed.
+
+        Raises:
+            ValueError: If the collection name is not valid.
+            PermissionError: If the collection is private to another owner.
+        """
+        def ingest(writer, new):
+            batch = [(source, file_name, {"source_key": key}) for key, (file_name, source) in new.items()]
+            _, results = ingest_files(batch, writer=writer)
+            for key, ids in zip(new, results):
+                if ids is None:
+                    writer.chunks.pop(key, None)
+
+        return self._add(name, files, "file", ingest, owner)
+
+    def add_urls(self, name, urls, owner=None):
+        """
+        Add web pages to a collection, creating it if needed. Pages already in the chunk store
+        are linked without being scraped again; the others are scraped with ``extract_articles``.
+
+        Args:
+            name (str): Collection name.
+            urls (list): Page URLs.
+            owner (str): Owner adding the pages; a new collection is private to it (shared if None).
+
+        Returns:
+            dict: URL -> True if the page is in the collection, False if it could not be extracted.
+
+        Raises:
+            ValueError: If the collection name is not valid.
+            PermissionError: If the collection is private to another owner.
+        """
+        def ingest(writer, new):
+            keys = {url: key for key, (url, _) in new.items()}
+            for url, text in extract_articles(list(keys)):
+                if not text or not text.strip():
+                    continue
+                try:
+                    index_chunks(split_texts([text], [{"source": url, "source_key": keys[url]}]), writer)
+                except Exception as e:
+                    logging.error(f"❌ Error indexing {url}: {str(e)}")
+                    writer.chunks.pop(keys[url], None)
+
+        urls = list(dict.fromkeys(url.strip() for url in urls if url and url.strip()))
+        entries = [(document_hash(url.encode("utf-8")), url, url) for url in urls]
+        status = self._add(name, entries, "url", ingest, owner)
+        return {url: status[key] for key, url, _ in entries}
+
+    def remove_source(self, name, key):
+        """
+        Take a source out of a collection. Chunks it shares with the collection's other sources
+        stay indexed; the chunk store forgets the source once no collection holds it.
+
+        Args:
+            name (str): Collection name.
+            key (str): Source key, as in ``sources``.
+
+        Returns:
+            bool: False if the collection does not hold the source.
+        """
+        with self._collection_lock(name):
+            if key not in self.sources(name):
+                return False
+            vector_db = self._open(name)
+            with self.transaction() as conn:
+                conn.execute("DELETE FROM members WHERE collection = ? AND key = ?", (name, key))
+                self._prune(conn)
+            if vector_db is None or not self.sources(name):
+                self._drop_store(name)
+                return True
+
+            removed = {doc_id: doc.metadata.get("chunk_hash") for doc_id, doc in list(vector_db.documents.items())
+                       if doc.metadata.get("source_key") == key}
+            vector_db.delete(list(removed))
+            hashes = set(removed.values())
+            vector_db.add_documents([doc for doc in self._collection_documents(name)
+                                     if doc.metadata["chunk_hash"] in hashes])
+            self._save(name, vector_db)
+        logging.info(f"🗑️ Removed source {key[:12]} from collection '{name}'")
+        return True
+
+    def delete(self, name):
+        """
+        Delete a collection and its saved store.
+
+        Args:
+            name (str): Collection name.
+
+        Returns:
+            bool: False if there was no such collection.
+        """
+        with self._collection_lock(name):
+            with self.transaction() as conn:
+                deleted = conn.execute("DELETE FROM collections WHERE name = ?", (name,)).rowcount
+                conn.execute("DELETE FROM members WHERE collection = ?", (name,))
+                self._prune(conn)
+            self._drop_store(name)
+        if deleted:
+            logging.info(f"🗑️ Deleted collection '{name}'")
+        return bool(deleted)
+
+    def stats(self):
+        """
+        Return chunk store and memory statistics.
+
+        Returns:
+            dict: Collection, source and distinct chunk counts, ``chunk_references`` (chunks summed
+                over every collection's sources, i.e. what separate indexes would hold), the number
+                of collections ``loaded`` in memory and the hit, load and eviction counts of this process.
+        """
+        conn = self.conn
+        count = lambda query: conn.execute(query).fetchone()[0]
+        with self._lock:
+            loaded = len(self._loaded)  # A count, so private collection names are not exposed
+        return {
+            "collections": count("SELECT COUNT(*) FROM collections"),
+            "sources": count("SELECT COUNT(*) FROM sources"),
+            "chunks": count("SELECT COUNT(*) FROM chunks"),
+            "chunk_references": count("SELECT COUNT(*) FROM members m JOIN source_chunks sc ON sc.key = m.key"),
+            "loaded": loaded,
+            "hits": self.hits,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+    def _add(self, name, entries, kind, ingest, owner):
+        # Links stored sources, ingests new ones through ingest(writer, {key: (name, source)}), then saves the store
+        self.create(name, owner)
+        with self._collection_lock(name):
+            members = self.sources(name)
+            vector_db = self._open(name)
+            hashes = {doc.metadata.get("chunk_hash") for doc in vector_db.documents.values()} if vector_db else set()
+            writer = CollectionWriter(vector_db, hashes)
+
+            linked, new = {}, {}
+            for key, source_name, source in entries:
+                if key in members or key in linked or key in new:
+                    continue
+                if self._stored(key):
+                    linked[key] = source_name
+                else:
+                    new[key] = (source_name, source)
+
+            for key, source_name in list(linked.items()):
+                try:
+                    index_chunks(self._source_documents(key, source_name), writer)
+                except Exception as e:
+                    logging.error(f"❌ Error linking {source_name} into collection '{name}': {str(e)}")
+                    del linked[key]
+            if new:
+                with span("collection_ingest", collection=name, sources=len(new)):
+                    ingest(writer, new)
+            ingested = {key: writer.chunks[key] for key in new if writer.chunks.get(key)}
+
+            if linked or ingested:
+                with self.transaction() as conn:
+                    for key, documents in ingested.items():
+                        self._store_source(conn, key, kind, documents)
+                    now = time.time()
+                    conn.executemany("INSERT OR IGNORE INTO members (collection, key, name, added_at) VALUES (?, ?, ?, ?)",
+                                     [(name, key, source_name, now) for key, source_name in
+                                      [*linked.items(), *((key, new[key][0]) for key in ingested)]])
+                if writer.vector_db is not None:
+                    self._save(name, writer.vector_db)
+                increment("cache_events_total", len(linked), cache="collection_sources", event="hits")
+                increment("cache_events_total", len(new), cache="collection_sources", event="misses")
+                logging.info(f"📚 Collection '{name}': {len(ingested)} sources ingested, {len(linked)} linked "
+                             f"from the chunk store, {len(members)} already present")
+
+        return {key: key in members or key in linked or key in ingested for key, _, _ in entries}
+
+    def _stored(self, key):
+        return self.conn.execute("SELECT 1 FROM sources WHERE key = ?", (key,)).fetchone() is not None
+
+    def _store_source(self, conn, key, kind, documents):
+        conn.execute("INSERT OR REPLACE INTO sources (key, kind, chunks, created_at) VALUES (?, ?, ?, ?)",
+                     (key, kind, len(documents), time.time()))
+        conn.executemany("INSERT OR IGNORE INTO chunks (hash, text) VALUES (?, ?)",
+                         [(doc.metadata["chunk_hash"], doc.page_content) for doc in documents])
+        conn.execute("DELETE FROM source_chunks WHERE key = ?", (key,))
+        conn.executemany("INSERT INTO source_chunks (key, position, hash, metadata) VALUES (?, ?, ?, ?)",
+                         [(key, position, doc.metadata["chunk_hash"],
+                           json.dumps({k: v for k, v in doc.metadata.items() if k not in COLLECTION_METADATA},
+                                      ensure_ascii=False))
+                          for position, doc in enumerate(documents)])
+
+    def _prune(self, conn):
+        # Sources no collection holds any more, and chunks no source holds, are dropped
+        conn.execute("DELETE FROM sources WHERE key NOT IN (SELECT key FROM members)")
+        conn.execute("DELETE FROM source_chunks WHERE key NOT IN (SELECT key FROM sources)")
+        conn.execute("DELETE FROM chunks WHERE hash NOT IN (SELECT hash FROM source_chunks)")
+
+    def _source_documents(self, key, source_name):
+        rows = self.conn.execute("""
+            SELECT sc.hash, sc.metadata, c.text FROM source_chunks sc JOIN chunks c ON c.hash = sc.hash
+            WHERE sc.key = ? ORDER BY sc.position
+        """, (key,)).fetchall()
+        return [_document(text, metadata, source_name, key, digest) for digest, metadata, text in rows]
+
+    def _collection_documents(self, name):
+        # One chunk per distinct text, attributed to the oldest source holding it
+        rows = self.conn.execute("""
+            SELECT m.key, m.name, sc.hash, sc.metadata, c.text FROM members m
+            JOIN source_chunks sc ON sc.key = m.key JOIN chunks c ON c.hash = sc.hash
+            WHERE m.collection = ? ORDER BY m.added_at, m.rowid, sc.position
+        """, (name,))
+        documents, seen = [], set()
+        for key, source_name, digest, metadata, text in rows:
+            if digest not in seen:
+                seen.add(digest)
+                documents.append(_document(text, metadata, source_name, key, digest))
+        return documents
+
+    def _collection_lock(self, name):
+        with self._lock:
+            if name not in self._collection_locks:
+                self._collection_locks[name] = CollectionLock(os.path.join(self.directory, "locks", f"{name}.lock"))
+            return self._collection_locks[name]
+
+    def _saved_mtime(self, name):
+        manifest = os.path.join(self.store_path(name), "manifest.json")
+        return os.path.getmtime(manifest) if os.path.exists(manifest) else None
+
+    def _saved_manifest(self, name):
+        try:
+            with open(os.path.join(self.store_path(name), "manifest.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _cached(self, name):
+        mtime = self._saved_mtime(name)
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is None or entry[1] != mtime:
+                return None
+            self._loaded.move_to_end(name)
+            self.hits += 1
+        increment("cache_events_total", cache="collections", event="hits")
+        return entry[0]
+
+    def _open(self, name):
+        # Caller holds the collection lock
+        vector_db = self._cached(name)
+        if vector_db is not None:
+            return vector_db
+        if name not in self:
+            self._forget(name)
+            return None
+
+        mtime, manifest = self._saved_mtime(name), self._saved_manifest(name)
+        if manifest is not None and manifest.get("version") == STORE_FORMAT_VERSION \
+                and manifest.get("embedding_model") == embedding_model_name():
+            vector_db = VectorStore.load(self.store_path(name), mmap=True)
+            if vector_db is None:
+                # A compatible store that fails to load is damaged; rebuilding would hide that and overwrite it
+                raise RuntimeError(f"Saved store of collection '{name}' could not be loaded from {self.store_path(name)}")
+        else:
+            # Never saved, or saved with another embedding model or store format: rebuilt from the chunk store
+            documents = self._collection_documents(name)
+            if not documents:
+                self._forget(name)
+                return None
+            with span("collection_rebuild", collection=name, chunks=len(documents)):
+                writer = IndexWriter()
+                index_chunks(documents, writer)
+            return self._save(name, writer.vector_db)
+
+        self.loads += 1
+        increment("cache_events_total", cache="collections", event="misses")
+        self._remember(name, vector_db, mtime)
+        return vector_db
+
+    def _save(self, name, vector_db):
+        # Saved, then reloaded memory-mapped so the pages a write copied into RAM are shared again
+        vector_db.save(self.store_path(name))
+        mtime = self._saved_mtime(name)
+        vector_db = VectorStore.load(self.store_path(name), mmap=True) or vector_db
+        self._remember(name, vector_db, mtime)
+        return vector_db
+
+    def _remember(self, name, vector_db, mtime):
+        with self._lock:
+            self._loaded[name] = (vector_db, mtime)
+            self._loaded.move_to_end(name)
+            evicted = []
+            while len(self._loaded) > self.max_loaded:
+                evicted.append(self._loaded.popitem(last=False)[0])
+            self.evictions += len(evicted)
+        for cold in evicted:
+            increment("cache_events_total", cache="collections", event="evictions")
+            logging.info(f"♻️ Evicted collection '{cold}' from memory")
+
+    def _forget(self, name):
+        with self._lock:
+            self._loaded.pop(name, None)
+
+    def _drop_store(self, name):
+        self._forget(name)
+        shutil.rmtree(self.store_path(name), ignore_errors=True)
+
+def _document(text, metadata, source_name, key, digest):
+    return Document(page_content=text, metadata={**json.loads(metadata), "source": source_name, "source_key": key,
+                                                 "chunk_hash": digest})
+
+@functools.lru_cache(maxsize=1)
+def get_collection_manager():
+    """
+    Return the process-wide collection manager.
+
+    Returns:
+        CollectionManager: Manager for the collections under ``COLLECTIONS_DIR``.
+    """
+    return CollectionManager()
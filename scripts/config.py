@@ -13,8 +13,11 @@ try:
     GOOGLE_SEARCH_KEY = os.getenv("GOOGLE_SEARCH_API_KEY")
     SEARCH_ENGINE_ID = os.getenv("SEARCH_ENGINE_ID")
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    GROQ_API_BASE = os.getenv("GROQ_API_BASE")  # Optional override, e.g. a local stand-in server
+    GOOGLE_API_BASE = os.getenv("GOOGLE_API_BASE")  # Optional Custom Search endpoint override
     CSS_FILE_PATH = os.getenv("CSS_FILE_PATH", "./static/styles.css")
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+    CACHE_DIR = os.getenv("CACHE_DIR", "./.cache")  # Disk caches shared by all worker processes
 except:
     logging.error("❌ API KEYS not found or not set.")
 
@@ -24,6 +27,113 @@ try:
     CHUNK_OVERLAP = 100
     TOP_K_RESULTS = 3
     MAX_LENGTH = 5000
+
+    # Vector index
+    VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "auto")  # auto, flat, hnsw, ivf_flat, ivf_pq, sq8, hnsw_sq8, ivf_sq8
+    SEARCH_NPROBE = int(os.getenv("SEARCH_NPROBE", 16))  # IVF lists visited per query
+    SEARCH_EF = int(os.getenv("SEARCH_EF", 64))  # HNSW candidate list size per query
+    COMPACT_THRESHOLD = float(os.getenv("COMPACT_THRESHOLD", 0.2))  # Deleted fraction that triggers compaction
+
+    # Hybrid retrieval
+    SEARCH_MODE = os.getenv("SEARCH_MODE", "dense")  # dense, sparse (BM25 only) or hybrid (opt-in: dense + BM25 fused)
+    HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")  # rrf (reciprocal rank fusion) or weighted (normalized scores)
+    HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", 0.5))  # Weight of the dense ranking, the rest goes to BM25
+    HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 50))  # Results taken from each retriever before fusion
+    RRF_K = int(os.getenv("RRF_K", 60))  # Rank offset in reciprocal rank fusion
+    BM25_K1 = float(os.getenv("BM25_K1", 1.2))  # Term frequency saturation
+    BM25_B = float(os.getenv("BM25_B", 0.75))  # Document length normalization
+
+    # Cross-encoder reranking
+    RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+    RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 20))  # Chunks over-fetched for reranking
+    RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", 3))  # Chunks kept for the LLM after reranking
+    RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", 8))  # Query-chunk pairs scored per forward pass
+    RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", 256))  # Tokens per pair; longer chunks are truncated
+    RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", 300))  # Scoring time allowed per query
+    RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", 10000))  # (query, chunk) scores kept in memory
+
+    # Concurrent scraping
+    SCRAPER_MAX_WORKERS = int(os.getenv("SCRAPER_MAX_WORKERS", 8))  # Max in-flight article downloads
+    SCRAPER_URL_TIMEOUT = float(os.getenv("SCRAPER_URL_TIMEOUT", 7))  # Seconds allowed per URL
+    SCRAPER_TOTAL_TIMEOUT = float(os.getenv("SCRAPER_TOTAL_TIMEOUT", 15))  # Seconds allowed per batch
+    SCRAPER_MAX_THREADS = int(os.getenv("SCRAPER_MAX_THREADS", 32))  # Live download threads per process, timed-out ones included
+
+    # Live search pipeline
+    PIPELINE_MIN_ARTICLES = int(os.getenv("PIPELINE_MIN_ARTICLES", 2))  # Embedded articles that trigger retrieval
+    PIPELINE_RETRIEVAL_DEADLINE = float(os.getenv("PIPELINE_RETRIEVAL_DEADLINE", 4))  # Seconds before retrieving with what has arrived
+
+    # Embedding backend and service
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # torch, onnx or onnx_int8 (ONNX Runtime, int8-quantized)
+    EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR")  # Local model directory, written by `python -m scripts.embedding_service`
+    EMBEDDING_SERVICE_ENABLED = os.getenv("EMBEDDING_SERVICE_ENABLED", "false").lower() in ("1", "true", "yes")  # Shared microbatching worker processes, for many concurrent users
+    EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", 1))  # Model processes; each runs one batch at a time
+    EMBEDDING_WORKER_THREADS = int(os.getenv("EMBEDDING_WORKER_THREADS", 0))  # Torch threads per worker, 0 splits the CPUs evenly
+    EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", 64))  # Texts per forward pass
+    EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", 5))  # Wait for more requests before a partial batch
+
+    # Document ingestion
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", min(4, os.cpu_count() or 1)))  # Processes extracting PDF pages
+    PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 16))  # Pages each worker task extracts
+    PDF_INLINE_PAGES = int(os.getenv("PDF_INLINE_PAGES", 32))  # PDFs up to this many pages are extracted in-process
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 128))  # Chunks embedded and indexed together
+    INGEST_MAX_FILES = int(os.getenv("INGEST_MAX_FILES", 4))  # Uploaded files ingested concurrently
+
+    # Prompt context packing
+    CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", 8))  # Chunks retrieved before packing
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))  # Max tokens of retrieved context per prompt
+    CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", 0.8))  # Shared 5-gram fraction that marks a near-duplicate chunk
+
+    # LLM client pool
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))  # In-flight requests per model
+    LLM_IDLE_TIMEOUT = float(os.getenv("LLM_IDLE_TIMEOUT", 300))  # Seconds before an unused client is closed
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))  # Retries on rate-limit responses
+    LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", 1.0))  # Initial backoff in seconds, doubled per retry
+
+    # Background crawler and persistent web index
+    INDEX_DIR = os.getenv("INDEX_DIR", "./.cache/web_index")  # Crawl state and saved vector store
+    CRAWL_DELAY = float(os.getenv("CRAWL_DELAY", 1.0))  # Minimum seconds between requests to one host
+    CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", 500))  # Pages fetched per crawl run
+    CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", 2))  # Link hops followed from the seeds
+    CRAWL_REFRESH = int(os.getenv("CRAWL_REFRESH", 24 * 60 * 60))  # Seconds before a crawled page is refetched
+
+    # Named collections
+    COLLECTIONS_DIR = os.getenv("COLLECTIONS_DIR", "./.cache/collections")  # Chunk store and saved collection indexes
+    COLLECTIONS_MAX_LOADED = int(os.getenv("COLLECTIONS_MAX_LOADED", 8))  # Collections kept in memory, least recently used dropped
+
+    # Semantic answer cache
+    ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))  # Query similarity that reuses an answer
+    ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", 24 * 60 * 60))  # Seconds an answer is served from cache
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 10000))  # Oldest answers dropped beyond this
+
+    # Google search result cache
+    SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", 6 * 60 * 60))  # Seconds results are reused
+    SEARCH_CACHE_NEGATIVE_TTL = int(os.getenv("SEARCH_CACHE_NEGATIVE_TTL", 5 * 60))  # Seconds an empty result is reused
+    SEARCH_LEASE_TIMEOUT = float(os.getenv("SEARCH_LEASE_TIMEOUT", 15))  # Max wait on another worker's identical search
+
+    # Metrics and tracing
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")  # Interface of the Prometheus endpoint
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 9464))  # Port of the Prometheus /metrics endpoint, 0 disables it
+    METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", 1000))  # Recent samples per stage used for p50/p95/p99
+    METRICS_MAX_TRACES = int(os.getenv("METRICS_MAX_TRACES", 100))  # Recent request traces kept for the admin page
+    ADMIN_PAGE_ENABLED = os.getenv("ADMIN_PAGE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+    # Headless API server
+    API_HOST = os.getenv("API_HOST", "127.0.0.1")  # Interface the API server listens on
+    API_PORT = int(os.getenv("API_PORT", 8000))  # Port of the API server
+    API_DEFAULT_MODEL = os.getenv("API_DEFAULT_MODEL", "llama-3.3-70b-versatile")  # LLM used when a request names none
+    API_MAX_CONCURRENT_SEARCHES = int(os.getenv("API_MAX_CONCURRENT_SEARCHES", 8))  # Searches and queries running at once
+    API_MAX_CONCURRENT_INGESTS = int(os.getenv("API_MAX_CONCURRENT_INGESTS", 2))  # URL and document ingestions running at once
+    API_MAX_QUEUED = int(os.getenv("API_MAX_QUEUED", 32))  # Requests waiting for a slot before new ones get HTTP 503
+    API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", 10))  # Seconds a request waits for a slot before HTTP 503
+    API_WORKER_THREADS = int(os.getenv("API_WORKER_THREADS", 64))  # Threads running the blocking pipeline steps
+    API_MAX_UPLOAD_MB = float(os.getenv("API_MAX_UPLOAD_MB", 50))  # Largest document upload request
+
+    # Scraped content cache
+    CONTENT_CACHE_TTL = int(os.getenv("CONTENT_CACHE_TTL", 6 * 60 * 60))  # Seconds before an entry is revalidated
+    CONTENT_CACHE_MAX_BYTES = int(os.getenv("CONTENT_CACHE_MAX_BYTES", 200 * 1024 * 1024))  # LRU size bound
 except Exception as e:
     logging.error(f"❌ Error loading Constants: {str(e)}")
 
@@ -0,0 +1,123 @@
+import functools
+import logging
+import math
+import re
+from scripts.config import CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# tiktoken encoding per model name prefix; other models are counted with cl100k_base, which is
+# close to the Llama 3 / Qwen / Gemma tokenizers for English text
+MODEL_ENCODINGS = {"openai/gpt-oss": "o200k_base"}
+DEFAULT_ENCODING = "cl100k_base"
+
+# Word n-gram size used to detect near-duplicate chunks
+SHINGLE_SIZE = 5
+
+class Tokenizer:
+    """
+    Counts and truncates tokens for one model, with tiktoken if it is installed and
+    a four-characters-per-token estimate otherwise.
+    """
+
+    def __init__(self, encoding=None):
+        self.encoding = encoding
+
+    def count(self, text):
+        """Return the number of tokens in ``text``."""
+        if self.encoding is None:
+            return math.ceil(len(text) / 4)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text, max_tokens):
+        """Return the longest prefix of ``text`` with at most ``max_tokens`` tokens."""
+        if self.encoding is None:
+            return text[:max_tokens * 4]
+        return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+
+@functools.lru_cache(maxsize=None)
+def _tokenizer(encoding):
+    try:
+        import tiktoken
+        return Tokenizer(tiktoken.get_encoding(encoding))
+    except Exception as e:
+        logging.warning(f"⚠️ tiktoken encoding {encoding} unavailable ({str(e)}), estimating prompt tokens from length")
+        return Tokenizer()
+
+def get_tokenizer(model_name=None):
+    """
+    Return the tokenizer used to budget prompts for a model.
+
+    Args:
+        model_name (str): LLM model name (e.g. ``llama-3.3-70b-versatile``).
+
+    Returns:
+        Tokenizer: Shared tokenizer for the model's encoding.
+    """
+    encoding = next((name for prefix, name in MODEL_ENCODINGS.items() if (model_name or "").startswith(prefix)),
+                    DEFAULT_ENCODING)
+    return _tokenizer(encoding)
+
+def count_tokens(text, model_name=None):
+    """
+    Count the tokens of a text for a model.
+
+    Args:
+        text (str): Text to count.
+        model_name (str): LLM model name.
+
+    Returns:
+        int: Token count.
+    """
+    return get_tokenizer(model_name).count(text)
+
+def _shingles(text):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def pack_context(retrieved, model_name=None, budget=CONTEXT_TOKEN_BUDGET, dedup_threshold=CONTEXT_DEDUP_THRESHOLD,
+                 separator="\n\n"):
+    """
+    Select the retrieved chunks that go into the prompt.
+
+    Chunks are taken in the order given, which is the retriever's ranking (scores may be None
+    when reranking fell back, so they are not re-sorted). A chunk is skipped if at least ``dedup_threshold`` of
+    its word 5-grams already appear in the chunks taken (e.g. overlapping windows of the same
+    page), or if it does not fit in what is left of the token budget. If even the best chunk
+    is over budget, it is truncated so the context is never empty.
+
+    Args:
+        retrieved (list): Chunk texts, best first, or (Document, score) pairs as returned by ``retrieve``.
+        model_name (str): LLM model whose tokenizer counts the budget.
+        budget (int): Maximum tokens of context.
+        dedup_threshold (float): Fraction of shared 5-grams above which a chunk is a near-duplicate.
+        separator (str): Text placed between chunks.
+
+    Returns:
+        dict: ``items`` (the selected entries of ``retrieved``, best first), ``chunks`` (their
+            texts), ``tokens`` (context tokens), ``duplicates`` and ``over_budget`` (chunks dropped).
+    """
+    tokenizer = get_tokenizer(model_name)
+    separator_tokens = tokenizer.count(separator)
+
+    items, chunks, seen, tokens, duplicates, over_budget = [], [], set(), 0, 0, 0
+    for item in retrieved:
+        text = item if isinstance(item, str) else item[0].page_content
+        shingles = _shingles(text)
+        if seen and len(shingles & seen) >= dedup_threshold * len(shingles):
+            duplicates += 1
+            continue
+        cost = tokenizer.count(text) + (separator_tokens if chunks else 0)
+        if tokens + cost > budget:
+            if chunks:
+                over_budget += 1
+                continue
+            text, cost = tokenizer.truncate(text, budget), budget
+        items.append(item)
+        chunks.append(text)
+        seen |= shingles
+        tokens += cost
+    return {"items": items, "chunks": chunks, "tokens": tokens, "duplicates": duplicates, "over_budget": over_budget}
@@ -0,0 +1,458 @@
+import argparse
+import functools
+import json
+import logging
+import os
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from html.parser import HTMLParser
+from urllib import robotparser
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+import requests
+import validators
+from scripts.cache import SQLiteStore
+from scripts.config import (INDEX_DIR, CRAWL_DELAY, CRAWL_MAX_PAGES, CRAWL_MAX_DEPTH, CRAWL_REFRESH,
+                            SCRAPER_URL_TIMEOUT, MAX_LENGTH)
+from scripts.scraper import parse_article, BROWSER_USER_AGENT
+from scripts.vector_store import VectorStore, create_vector_db, chunk_hash
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+def normalize_url(url):
+    """
+    Canonicalize a URL for deduplication.
+
+    Lowercases the scheme and host, drops default ports, fragments and tracking parameters,
+    and sorts the query string.
+
+    Args:
+        url (str): Absolute URL.
+
+    Returns:
+        str: Normalized URL.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if parts.port and not (parts.scheme == "http" and parts.port == 80 or parts.scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")))
+    return urlunsplit((parts.scheme.lower(), host, parts.path or "/", query, ""))
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+def extract_links(base_url, html):
+    """
+    Extract absolute, normalized http(s) links from a page.
+
+    Args:
+        base_url (str): URL the HTML was fetched from.
+        html (str): Page HTML.
+
+    Returns:
+        list: Normalized link URLs.
+    """
+    parser = _LinkParser()
+    parser.feed(html)
+    links = (urljoin(base_url, href) for href in parser.links)
+    return [normalize_url(link) for link in links if urlsplit(link).scheme in ("http", "https")]
+
+def parse_sitemap(xml_text):
+    """
+    Parse a sitemap or sitemap index.
+
+    Args:
+        xml_text (str): Sitemap XML.
+
+    Returns:
+        tuple: (page URLs, nested sitemap URLs).
+    """
+    root = ET.fromstring(xml_text)
+    locs = [el.text.strip() for el in root.iter() if el.tag.endswith("loc") and el.text]
+    if root.tag.endswith("sitemapindex"):
+        return [], locs
+    return locs, []
+
+class WebIndex(SQLiteStore):
+    """
+    Persistent, incrementally updated vector index of crawled pages.
+
+    Crawl state (URL, content hash, chunk IDs) lives in SQLite; the vectors live in a
+    ``VectorStore`` saved under ``<directory>/store``. Page rows changed since the last
+    ``save`` are buffered and committed together with the store, so the rows on disk always
+    refer to chunk IDs in the saved store. The links found on each fetched page are kept too,
+    so a crawl can expand past pages that are still fresh. Readers pick up a newly saved store
+    on their next access without restarting.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            title TEXT,
+            content_hash TEXT,
+            chunk_ids TEXT NOT NULL DEFAULT '[]',
+            fetched_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS pages_content_hash ON pages (content_hash);
+        CREATE TABLE IF NOT EXISTS outlinks (
+            url TEXT PRIMARY KEY,
+            links TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, directory=INDEX_DIR):
+        """
+        Initialize the web index.
+
+        Args:
+            directory (str): Directory holding ``crawl.sqlite`` and the saved store.
+        """
+        self.store_path = os.path.join(directory, "store")
+        self._vector_db = None
+        self._loaded_mtime = None
+        self._pending = {}  # url -> (title, content_hash, chunk IDs, fetched_at), or None if removed; committed by save()
+        super().__init__(os.path.join(directory, "crawl.sqlite"))
+
+    @property
+    def vector_db(self):
+        """VectorStore: The saved store, reloaded (memory-mapped) whenever a newer one is saved."""
+        manifest = os.path.join(self.store_path, "manifest.json")
+        mtime = os.path.getmtime(manifest) if os.path.exists(manifest) else None
+        if mtime is not None and mtime != self._loaded_mtime:
+            vector_db = VectorStore.load(self.store_path, mmap=True)
+            if vector_db is not None:
+                self._vector_db, self._loaded_mtime = vector_db, mtime
+        return self._vector_db
+
+    def needs_fetch(self, url, refresh=CRAWL_REFRESH):
+        """Return True if the URL was never crawled or its copy is older than ``refresh`` seconds."""
+        page = self._page(url)
+        return page is None or time.time() - page[3] >= refresh
+
+    def set_links(self, url, links):
+        """Record the links found on a fetched page, for crawls that skip it while it is fresh."""
+        self.conn.execute("INSERT OR REPLACE INTO outlinks (url, links) VALUES (?, ?)", (url, json.dumps(links)))
+
+    def links(self, url):
+        """Return the links recorded for a page by ``set_links`` (empty if it was never fetched)."""
+        row = self.conn.execute("SELECT links FROM outlinks WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row is not None else []
+
+    def upsert_page(self, url, title, text):
+        """
+        Add or update one page's chunks.
+
+        Unchanged pages only get their fetch time bumped; pages whose content already exists
+        under another URL are recorded without indexing it twice. When a page that holds
+        chunks changes, a duplicate of its old content takes the chunks over.
+
+        Args:
+            url (str): Normalized page URL.
+            title (str): Page title, stored with each chunk.
+            text (str): Extracted page text.
+
+        Returns:
+            str: "added", "updated", "unchanged" or "duplicate".
+        """
+        content_hash = chunk_hash(text)
+        page = self._page(url)
+        if page is not None and page[1] == content_hash:
+            if url in self._pending:
+                self._pending[url] = (*page[:3], time.time())
+            else:
+                self.conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            return "unchanged"
+
+        duplicate = self._holder(content_hash, url)
+        new_ids = []
+        if duplicate is None:
+            metadata = {"source": url, "title": title}
+            vector_db = self.vector_db
+            if vector_db is None:
+                self._vector_db = create_vector_db([text], metadatas=[metadata])
+                new_ids = list(self._vector_db.documents) if self._vector_db is not None else []
+            else:
+                new_ids = vector_db.add_texts([text], metadatas=[metadata])
+        if page is not None:
+            self._release(url, page)
+
+        self._pending[url] = (title, content_hash, new_ids, time.time())
+        if duplicate is not None:
+            return "duplicate"
+        return "updated" if page is not None else "added"
+
+    def remove_page(self, url):
+        """
+        Drop a page (e.g. one that is gone from its site) and its chunks; a duplicate of its
+        content takes the chunks over instead.
+
+        Args:
+            url (str): Normalized page URL.
+
+        Returns:
+            bool: False if the page was not indexed.
+        """
+        page = self._page(url)
+        if page is None:
+            return False
+        self._release(url, page)
+        self._pending[url] = None
+        self.conn.execute("DELETE FROM outlinks WHERE url = ?", (url,))
+        return True
+
+    def save(self):
+        """Persist the vector store so readers pick it up, then commit the buffered page rows."""
+        if self._vector_db is not None:
+            self._vector_db.save(self.store_path)
+            self._loaded_mtime = os.path.getmtime(os.path.join(self.store_path, "manifest.json"))
+        if self._pending:
+            with self.transaction() as conn:
+                for url, page in self._pending.items():
+                    if page is None:
+                        conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                    else:
+                        title, content_hash, chunk_ids, fetched_at = page
+                        conn.execute(
+                            "INSERT OR REPLACE INTO pages (url, title, content_hash, chunk_ids, fetched_at) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (url, title, content_hash, json.dumps(chunk_ids), fetched_at),
+                        )
+            self._pending.clear()
+
+    def _page(self, url):
+        # The buffered row if the page changed since the last save, else the committed one
+        if url in self._pending:
+            return self._pending[url]
+        row = self.conn.execute("SELECT title, content_hash, chunk_ids, fetched_at FROM pages WHERE url = ?",
+                                (url,)).fetchone()
+        return (row[0], row[1], json.loads(row[2]), row[3]) if row is not None else None
+
+    def _holder(self, content_hash, exclude):
+        # Another page with this content, buffered rows first
+        for url, page in self._pending.items():
+            if page is not None and page[1] == content_hash and url != exclude:
+                return url
+        rows = self.conn.execute("SELECT url FROM pages WHERE content_hash = ? AND url != ?", (content_hash, exclude))
+        return next((url for url, in rows if url not in self._pending), None)
+
+    def _release(self, url, page):
+        # The chunks of a page whose content changed or that is removed go to a duplicate of
+        # that content, re-attributed to it, or are deleted if there is none
+        _, content_hash, chunk_ids, _ = page
+        vector_db = self.vector_db
+        if not chunk_ids or vector_db is None:
+            return
+        heir = self._holder(content_hash, url)
+        if heir is None:
+            vector_db.delete(chunk_ids)
+            return
+        heir_title, _, _, heir_fetched_at = self._page(heir)
+        for doc_id in chunk_ids:
+            vector_db.documents[doc_id].metadata.update(source=heir, title=heir_title)
+        self._pending[heir] = (heir_title, content_hash, chunk_ids, heir_fetched_at)
+        logging.info(f"🔁 {heir} now holds the chunks of {url}")
+
+    def stats(self):
+        """
+        Return index statistics.
+
+        Returns:
+            dict: Crawled page count and live chunk count.
+        """
+        pages = self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        vector_db = self.vector_db
+        return {"pages": pages, "chunks": len(vector_db.documents) if vector_db is not None else 0}
+
+class Crawler:
+    """
+    Polite breadth-first crawler feeding a ``WebIndex``.
+
+    Follows links within the seed hosts up to ``max_depth`` hops, honours robots.txt
+    (including Crawl-delay) and waits at least ``delay`` seconds between requests to the
+    same host.
+    """
+
+    def __init__(self, web_index, delay=CRAWL_DELAY, max_pages=CRAWL_MAX_PAGES, max_depth=CRAWL_MAX_DEPTH,
+                 refresh=CRAWL_REFRESH, timeout=SCRAPER_URL_TIMEOUT, user_agent=BROWSER_USER_AGENT, save_every=25):
+        """
+        Initialize the crawler.
+
+        Args:
+            web_index (WebIndex): Index receiving crawled pages.
+            delay (float): Minimum seconds between requests to one host.
+            max_pages (int): Maximum pages fetched in one run.
+            max_depth (int): Link hops followed from seeds (sitemap URLs count as seeds).
+            refresh (int): Seconds before an already crawled page is fetched again.
+            timeout (float): Network timeout per request.
+            user_agent (str): User-Agent header and robots.txt agent.
+            save_every (int): Save the store after this many indexed pages.
+        """
+        self.web_index = web_index
+        self.delay = delay
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.refresh = refresh
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.save_every = save_every
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = user_agent
+        self._robots = {}
+        self._last_request = {}
+
+    def crawl(self, seeds=(), sitemaps=()):
+        """
+        Crawl from seed URLs and sitemaps, indexing every page with meaningful text.
+
+        Args:
+            seeds (list): Start URLs.
+            sitemaps (list): Sitemap or sitemap index URLs.
+
+        Returns:
+            dict: Counts of fetched pages and of each ``upsert_page`` outcome.
+        """
+        seeds = [normalize_url(url) for url in list(seeds) + self._sitemap_urls(sitemaps) if validators.url(url)]
+        allowed_hosts = {urlsplit(url).netloc for url in seeds}
+        frontier = deque((url, 0) for url in dict.fromkeys(seeds))
+        seen = set(url for url, _ in frontier)
+        stats = {"fetched": 0, "added": 0, "updated": 0, "unchanged": 0, "duplicate": 0, "removed": 0, "skipped": 0,
+                 "failed": 0}
+        pending_save = 0
+
+        def expand(depth, links):
+            if depth < self.max_depth:
+                for link in links:
+                    if link not in seen and urlsplit(link).netloc in allowed_hosts:
+                        seen.add(link)
+                        frontier.append((link, depth + 1))
+
+        while frontier and stats["fetched"] < self.max_pages:
+            url, depth = frontier.popleft()
+            if not self._allowed(url):
+                stats["skipped"] += 1
+                continue
+            if not self.web_index.needs_fetch(url, self.refresh):
+                # Still fresh: follow the links it had when last fetched, so the crawl goes on past it
+                expand(depth, self.web_index.links(url))
+                stats["skipped"] += 1
+                continue
+
+            response = self._fetch(url)
+            stats["fetched"] += 1
+            if response is None or response.status_code != 200:
+                # Pages that are gone from their site are dropped from the index
+                if response is not None and response.status_code in (404, 410) and self.web_index.remove_page(url):
+                    stats["removed"] += 1
+                    pending_save += 1
+                else:
+                    stats["failed"] += 1
+                continue
+            html = response.text
+            links = extract_links(url, html)
+            self.web_index.set_links(url, links)
+            expand(depth, links)
+
+            article = parse_article(url, html)
+            if article is None:
+                stats["skipped"] += 1
+                continue
+            outcome = self.web_index.upsert_page(url, article.title, article.text[:MAX_LENGTH])
+            stats[outcome] += 1
+            pending_save += outcome in ("added", "updated", "duplicate")  # Outcomes that buffer page rows
+            if pending_save >= self.save_every:
+                self.web_index.save()
+                pending_save = 0
+
+        if pending_save:
+            self.web_index.save()
+        logging.info(f"🕷️ Crawl finished: {stats}")
+        return stats
+
+    def _sitemap_urls(self, sitemaps):
+        pages, queue = [], deque(sitemaps)
+        while queue:
+            xml_text = self._get(queue.popleft())
+            if xml_text is None:
+                continue
+            try:
+                page_urls, nested = parse_sitemap(xml_text)
+            except ET.ParseError as e:
+                logging.error(f"❌ Invalid sitemap: {str(e)}")
+                continue
+            pages.extend(page_urls)
+            queue.extend(nested)
+        return pages
+
+    def _allowed(self, url):
+        parts = urlsplit(url)
+        host = parts.netloc
+        if host not in self._robots:
+            parser = robotparser.RobotFileParser()
+            robots_txt = self._get(f"{parts.scheme}://{host}/robots.txt", quiet=True)
+            parser.parse((robots_txt or "").splitlines())
+            self._robots[host] = parser
+        return self._robots[host].can_fetch(self.user_agent, url)
+
+    def _wait_for_host(self, host):
+        robots = self._robots.get(host)
+        delay = max(self.delay, (robots.crawl_delay(self.user_agent) or 0) if robots else 0)
+        wait = self._last_request.get(host, 0) + delay - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_request[host] = time.monotonic()
+
+    def _fetch(self, url, quiet=False):
+        self._wait_for_host(urlsplit(url).netloc)
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code != 200 and not quiet:
+                logging.warning(f"⚠️ {response.status_code} from {url}")
+            return response
+        except Exception as e:
+            if not quiet:
+                logging.error(f"❌ Error fetching {url}: {str(e)}")
+            return None
+
+    def _get(self, url, quiet=False):
+        response = self._fetch(url, quiet)
+        return response.text if response is not None and response.status_code == 200 else None
+
+@functools.lru_cache(maxsize=1)
+def get_web_index():
+    """
+    Return the process-wide persistent web index.
+
+    Returns:
+        WebIndex: Index stored under ``INDEX_DIR``.
+    """
+    return WebIndex()
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl seed URLs/sitemaps into the local web index")
+    parser.add_argument("--seed", action="append", default=[], help="Start URL (repeatable)")
+    parser.add_argument("--seeds-file", help="File with one start URL per line")
+    parser.add_argument("--sitemap", action="append", default=[], help="Sitemap URL (repeatable)")
+    parser.add_argument("--max-pages", type=int, default=CRAWL_MAX_PAGES)
+    parser.add_argument("--max-depth", type=int, default=CRAWL_MAX_DEPTH)
+    parser.add_argument("--delay", type=float, default=CRAWL_DELAY)
+    args = parser.parse_args()
+
+    seeds = list(args.seed)
+    if args.seeds_file:
+        with open(args.seeds_file, encoding="utf-8") as f:
+            seeds.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+
+    crawler = Crawler(get_web_index(), delay=args.delay, max_pages=args.max_pages, max_depth=args.max_depth)
+    print(json.dumps(crawler.crawl(seeds, args.sitemap), indent=2))
+
+if __name__ == "__main__":
+    main()
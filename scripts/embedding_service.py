@@ -0,0 +1,402 @@
+import argparse
+import atexit
+import functools
+import glob
+import logging
+import multiprocessing
+import os
+import platform
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from scripts.config import (EMBEDDING_MODEL, EMBEDDING_BACKEND, EMBEDDING_MODEL_DIR, EMBEDDING_WORKERS,
+                            EMBEDDING_WORKER_THREADS, EMBEDDING_MAX_BATCH, EMBEDDING_MAX_WAIT_MS)
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx_int8")
+
+def embedding_model_id(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND):
+    """
+    Return the name vectors from a model and backend are cached and stamped under.
+
+    The PyTorch and ONNX backends produce the same vectors; int8 vectors differ slightly,
+    so they are kept apart from them.
+
+    Args:
+        model_name (str): Embedding model name.
+        backend (str): One of ``EMBEDDING_BACKENDS``.
+
+    Returns:
+        str: Model identifier.
+    """
+    return f"{model_name}:int8" if backend == "onnx_int8" else model_name
+
+def default_quantization():
+    """
+    Pick the ONNX Runtime dynamic quantization config for this CPU.
+
+    Returns:
+        str: ``arm64``, ``avx512_vnni``, ``avx512`` or ``avx2``.
+    """
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        flags = ""
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    return "avx512" if "avx512f" in flags else "avx2"
+
+def quantized_model_file(model_dir):
+    """
+    Find the int8 ONNX model in a directory written by ``export_embedding_model``.
+
+    Args:
+        model_dir (str): Local model directory.
+
+    Returns:
+        str: Path of the model file relative to ``model_dir``, preferring this CPU's quantization.
+
+    Raises:
+        FileNotFoundError: If the directory holds no int8 model.
+    """
+    files = sorted(glob.glob(os.path.join(model_dir, "onnx", "model_qint8_*.onnx")))
+    if not files:
+        raise FileNotFoundError(f"No int8 ONNX model in {model_dir}; create one with `python -m scripts.embedding_service`")
+    preferred = os.path.join(model_dir, "onnx", f"model_qint8_{default_quantization()}.onnx")
+    return os.path.relpath(preferred if preferred in files else files[0], model_dir)
+
+def backend_model_kwargs(backend, model_dir=None, threads=None):
+    """
+    Build the ``SentenceTransformer`` arguments for an embedding backend.
+
+    Args:
+        backend (str): ``torch``, ``onnx`` or ``onnx_int8``.
+        model_dir (str): Local model directory (required for ``onnx_int8``).
+        threads (int): ONNX Runtime intra-op threads (None lets ONNX Runtime decide).
+
+    Returns:
+        dict: ``model_kwargs`` for ``HuggingFaceEmbeddings``.
+
+    Raises:
+        ValueError: If the backend is unknown or ``onnx_int8`` has no model directory.
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {', '.join(EMBEDDING_BACKENDS)}")
+    if backend == "torch":
+        return {"device": "cpu"}
+    if backend == "onnx_int8" and not model_dir:
+        raise ValueError("The onnx_int8 backend runs from a local model directory; set EMBEDDING_MODEL_DIR")
+
+    try:
+        import onnxruntime
+    except ImportError as e:
+        raise ImportError("The onnx backends need ONNX Runtime and Optimum: pip install 'optimum[onnxruntime]'") from e
+    session_options = onnxruntime.SessionOptions()
+    if threads:
+        session_options.intra_op_num_threads = threads
+    file_name = quantized_model_file(model_dir) if backend == "onnx_int8" else "onnx/model.onnx"
+    return {"device": "cpu", "backend": "onnx",
+            "model_kwargs": {"file_name": file_name, "provider": "CPUExecutionProvider",
+                             "session_options": session_options}}
+
+def load_embedding_model(model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND, model_dir=EMBEDDING_MODEL_DIR,
+                         threads=None):
+    """
+    Load the embedding model on the CPU with the selected backend, producing normalized vectors.
+
+    Args:
+        model_name (str): Embedding model name.
+        backend (str): ``torch`` (PyTorch), ``onnx`` (ONNX Runtime) or ``onnx_int8`` (int8-quantized ONNX).
+        model_dir (str): Local directory to load the model from instead of the Hugging Face Hub.
+        threads (int): ONNX Runtime intra-op threads.
+
+    Returns:
+        HuggingFaceEmbeddings: The loaded model, named by ``embedding_model_id``.
+    """
+    from langchain_huggingface import HuggingFaceEmbeddings
+    start = time.perf_counter()
+    embeddings = HuggingFaceEmbeddings(
+                model_name=model_dir or model_name,
+                model_kwargs=backend_model_kwargs(backend, model_dir, threads),
+                encode_kwargs={"normalize_embeddings": True}
+            )
+    # Stamp vectors with the model and backend, not the directory they were loaded from
+    embeddings.model_name = embedding_model_id(model_name, backend)
+    logging.info(f"🧠 Loaded {model_name} ({backend} backend) in {time.perf_counter() - start:.1f}s")
+    return embeddings
+
+def export_embedding_model(output_dir, model_name=EMBEDDING_MODEL, quantization=None):
+    """
+    Save a model to a local directory for every backend: the PyTorch weights, an ONNX export
+    in ``onnx/model.onnx`` and a dynamically int8-quantized copy in ``onnx/model_qint8_<config>.onnx``.
+
+    Args:
+        output_dir (str): Directory to write, usable as ``EMBEDDING_MODEL_DIR``.
+        model_name (str): Embedding model name on the Hugging Face Hub.
+        quantization (str): ``arm64``, ``avx2``, ``avx512`` or ``avx512_vnni`` (defaults to ``default_quantization()``).
+
+    Returns:
+        str: ``output_dir``.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+    SentenceTransformer(model_name, device="cpu").save_pretrained(output_dir)
+    onnx_model = SentenceTransformer(output_dir, device="cpu", backend="onnx")  # Exported from the saved weights
+    onnx_model.save_pretrained(output_dir)
+    export_dynamic_quantized_onnx_model(onnx_model, quantization or default_quantization(), output_dir)
+    logging.info(f"💾 Exported {model_name} for the torch, onnx and onnx_int8 backends to {output_dir}")
+    return output_dir
+
+# The model loaded in a worker process by _init_worker
+_worker_model = None
+
+def _init_worker(factory, threads):
+    # Pin the math libraries to this worker's share of the CPUs before the model loads
+    global _worker_model
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[variable] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_model = factory()
+
+def _encode(texts):
+    return np.asarray(_worker_model.embed_documents(texts), dtype="float32")
+
+class _Request:
+    def __init__(self, texts):
+        self.texts = texts
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+_STOP = object()
+
+class EmbeddingService:
+    """
+    Embedding model shared by all sessions behind a microbatching request queue.
+
+    Requests are merged into batches of up to ``max_batch`` texts, waiting at most
+    ``max_wait_ms`` for a partial batch to fill, and each batch is one forward pass in a
+    dedicated worker process with a fixed number of threads. While every worker is busy,
+    new requests keep queueing, so batches grow with load instead of callers fighting
+    over the CPU. Implements the LangChain ``embed_documents``/``embed_query`` interface.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL, backend=EMBEDDING_BACKEND, model_dir=EMBEDDING_MODEL_DIR,
+                 workers=EMBEDDING_WORKERS, threads=EMBEDDING_WORKER_THREADS, max_batch=EMBEDDING_MAX_BATCH,
+                 max_wait_ms=EMBEDDING_MAX_WAIT_MS, factory=None):
+        """
+        Initialize the service. Worker processes start on the first request.
+
+        Args:
+            model_name (str): Embedding model name.
+            backend (str): Embedding backend, see ``load_embedding_model``.
+            model_dir (str): Local model directory.
+            workers (int): Worker processes, each holding a copy of the model.
+            threads (int): Torch or ONNX Runtime threads per worker (0 splits the CPUs evenly between workers).
+            max_batch (int): Maximum texts per forward pass; larger requests are split.
+            max_wait_ms (float): Milliseconds to wait for more requests before running a partial batch.
+            factory (callable): Picklable zero-argument function that loads the model in a worker
+                (defaults to ``load_embedding_model`` with the arguments above).
+        """
+        self.model_name = embedding_model_id(model_name, backend)
+        self.workers = max(1, workers)
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.factory = factory or functools.partial(load_embedding_model, model_name, backend, model_dir, self.threads)
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(self.workers)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._closed = False
+        self._metrics = {"requests": 0, "texts": 0, "batches": 0, "max_batch_size": 0, "queue_depth": 0,
+                         "max_queue_depth": 0, "in_flight": 0, "batched_requests": 0, "wait_seconds": 0.0,
+                         "encode_seconds": 0.0, "errors": 0, "restarts": 0}
+        self._batcher = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._batcher.start()
+
+    def embed_documents(self, texts):
+        """
+        Embed texts through the shared queue.
+
+        Args:
+            texts (list): Texts to embed.
+
+        Returns:
+            list: One vector (list of floats) per text.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        requests = [self._submit(texts[start:start + self.max_batch]) for start in range(0, len(texts), self.max_batch)]
+        return np.concatenate([request.future.result() for request in requests]).tolist()
+
+    def embed_query(self, text):
+        """
+        Embed a single query.
+
+        Args:
+            text (str): Query text.
+
+        Returns:
+            list: The query vector.
+        """
+        return self.embed_documents([text])[0]
+
+    def _submit(self, texts):
+        if self._closed:
+            raise RuntimeError("Embedding service is closed")
+        request = _Request(texts)
+        with self._lock:
+            metrics = self._metrics
+            metrics["requests"] += 1
+            metrics["queue_depth"] += len(texts)
+            metrics["max_queue_depth"] = max(metrics["max_queue_depth"], metrics["queue_depth"])
+        self._queue.put(request)
+        return request
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_init_worker, initargs=(self.factory, self.threads))
+                logging.info(f"🧠 Started {self.workers} embedding worker(s) with {self.threads} thread(s) each")
+            return self._pool
+
+    def _run(self):
+        # Batcher thread: take the oldest request, wait for an idle worker, then top the batch up
+        carry = None
+        while True:
+            first, carry = carry if carry is not None else self._queue.get(), None
+            if first is _STOP:
+                return
+            self._slots.acquire()
+            batch, size = [first], len(first.texts)
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch:
+                try:
+                    request = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if request is _STOP or size + len(request.texts) > self.max_batch:
+                    carry = request
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        texts = [text for request in batch for text in request.texts]
+        started = time.perf_counter()
+        with self._lock:
+            metrics = self._metrics
+            metrics["queue_depth"] -= len(texts)
+            metrics["in_flight"] += 1
+            metrics["batches"] += 1
+            metrics["texts"] += len(texts)
+            metrics["max_batch_size"] = max(metrics["max_batch_size"], len(texts))
+            metrics["batched_requests"] += len(batch)
+            metrics["wait_seconds"] += sum(started - request.enqueued for request in batch)
+        try:
+            pool = self._executor()
+            future = pool.submit(_encode, texts)
+        except Exception as e:
+            pool, future = None, Future()
+            future.set_exception(e)
+        future.add_done_callback(lambda done: self._finish(batch, done, started, pool))
+
+    def _finish(self, batch, future, started, pool):
+        self._slots.release()
+        error = future.exception()
+        with self._lock:
+            self._metrics["in_flight"] -= 1
+            self._metrics["encode_seconds"] += time.perf_counter() - started
+            if error is not None:
+                self._metrics["errors"] += 1
+            # A crashed worker breaks the whole pool; the next batch starts a fresh one
+            broken = isinstance(error, BrokenProcessPool) and pool is not None and self._pool is pool
+            if broken:
+                self._pool = None
+                self._metrics["restarts"] += 1
+        if broken:
+            # Not from this callback, which runs on the pool's own management thread
+            threading.Thread(target=pool.shutdown, kwargs={"cancel_futures": True}, daemon=True).start()
+        if error is not None:
+            logging.error(f"❌ Embedding batch of {sum(len(r.texts) for r in batch)} texts failed: {str(error)}")
+            for request in batch:
+                request.future.set_exception(error)
+            return
+
+        vectors, offset = future.result(), 0
+        for request in batch:
+            request.future.set_result(vectors[offset:offset + len(request.texts)])
+            offset += len(request.texts)
+
+    def stats(self):
+        """
+        Return queue and batching metrics.
+
+        Returns:
+            dict: Request, text and batch counts, current and peak queue depth (texts waiting),
+                batches in flight, mean and max batch size, mean queue wait and batch encode
+                time in milliseconds, errors and pool restarts.
+        """
+        with self._lock:
+            stats = dict(self._metrics)
+        batches = stats["batches"]
+        stats.update(
+            workers=self.workers,
+            threads=self.threads,
+            mean_batch_size=stats["texts"] / batches if batches else 0.0,
+            mean_wait_ms=stats.pop("wait_seconds") / max(stats.pop("batched_requests"), 1) * 1000,
+            mean_encode_ms=stats.pop("encode_seconds") / batches * 1000 if batches else 0.0,
+        )
+        return stats
+
+    def close(self):
+        """Finish queued requests and stop the worker processes."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._batcher.join()
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+@functools.lru_cache(maxsize=1)
+def get_embedding_service():
+    """
+    Return the process-wide embedding service.
+
+    Returns:
+        EmbeddingService: Service for ``EMBEDDING_MODEL``, stopped at interpreter exit.
+    """
+    service = EmbeddingService()
+    atexit.register(service.close)
+    return service
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model for the torch, onnx and onnx_int8 backends")
+    parser.add_argument("--output-dir", default=EMBEDDING_MODEL_DIR, required=not EMBEDDING_MODEL_DIR,
+                        help="Model directory to write (defaults to EMBEDDING_MODEL_DIR)")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--quantization", choices=["arm64", "avx2", "avx512", "avx512_vnni"], default=None,
+                        help="int8 quantization config (defaults to the best one for this CPU)")
+    args = parser.parse_args()
+    export_embedding_model(args.output_dir, args.model, args.quantization)
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,141 @@
 from googleapiclient.discovery import build
-from scripts.config import GOOGLE_SEARCH_KEY, SEARCH_ENGINE_ID, TOP_K_RESULTS
+from scripts.cache import get_search_cache
+from scripts.config import GOOGLE_SEARCH_KEY, SEARCH_ENGINE_ID, TOP_K_RESULTS, GOOGLE_API_BASE, SEARCH_LEASE_TIMEOUT
+from scripts.metrics import timed
+from concurrent.futures import Future
 import logging
-import functools
+import threading
+import time
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-@functools.lru_cache(maxsize=100)  # Cache up to 100 queries
+_local = threading.local()
+
+def search_service():
+    """
+    Return this thread's Custom Search client, building it on first use.
+
+    The client (and its HTTP connection) is reused across searches; discovery clients are
+    not thread-safe, so each thread gets its own.
+
+    Returns:
+        googleapiclient.discovery.Resource: The Custom Search service.
+    """
+    if getattr(_local, "service", None) is None:
+        client_options = {"api_endpoint": GOOGLE_API_BASE} if GOOGLE_API_BASE else None
+        _local.service = build("customsearch", "v1", developerKey=GOOGLE_SEARCH_KEY, cache_discovery=False,
+                               client_options=client_options)
+    return _local.service
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the function and
+    the others wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Run ``fn`` once for all concurrent callers with the same key.
+
+        Args:
+            key (str): Identity of the call.
+            fn (callable): Zero-argument function to run.
+
+        Returns:
+            tuple: (result, shared), where ``shared`` is True for callers that waited on another's call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result(), True
+
+        try:
+            call.set_result(fn())
+        except BaseException as e:
+            call.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result(), False
+
+_single_flight = SingleFlight()
+
+def search_cache_key(query):
+    """
+    Build the cache key for a query: the engine, result count and whitespace/case-normalized query.
+
+    Args:
+        query (str): User search query.
+
+    Returns:
+        str: Cache key.
+    """
+    return f"{SEARCH_ENGINE_ID}:{TOP_K_RESULTS}:{' '.join(query.lower().split())}"
+
+def search_upstream(query):
+    """
+    Call the Custom Search API.
+
+    Args:
+        query (str): User search query.
+
+    Returns:
+        list: List of search results (title, URL, snippet).
+
+    Raises:
+        Exception: If the API call fails.
+    """
+    logging.info(f"🔍 Searching Google for: {query}")
+    result = search_service().cse().list(q=query, cx=SEARCH_ENGINE_ID, num=TOP_K_RESULTS).execute()
+    return [
+        {"title": item["title"], "link": item["link"], "snippet": item.get("snippet", "")}
+        for item in result.get("items", [])
+    ]
+
+def _fetch_shared(query, key):
+    # Only one process fetches a key at a time; the others wait for its result in the cache
+    cache = get_search_cache()
+    deadline = time.monotonic() + SEARCH_LEASE_TIMEOUT
+    leased = cache.acquire(key, SEARCH_LEASE_TIMEOUT)
+    while not leased and time.monotonic() < deadline:
+        time.sleep(0.05)
+        results = cache.get(key, count=False)
+        if results is not None:
+            cache.count("coalesced")
+            return results
+        leased = cache.acquire(key, SEARCH_LEASE_TIMEOUT)
+
+    try:
+        # Another process may have finished this search just before we took the lease
+        results = cache.get(key, count=False) if leased else None
+        if results is not None:
+            cache.count("coalesced")
+            return results
+        results = search_upstream(query)
+        cache.count("upstream")
+        cache.put(key, results)
+        return results
+    finally:
+        if leased:
+            cache.release(key)
+
+@timed("search")
 def google_custom_search(query):
     """
     Perform Google Custom Search and return top results.
-    
+
+    Results are cached on disk for all workers: for ``SEARCH_CACHE_TTL`` seconds, or
+    ``SEARCH_CACHE_NEGATIVE_TTL`` if there were none. Failed calls are not cached, and
+    concurrent identical queries share a single upstream call.
+
     Args:
         query (str): User search query.
 
@@ -18,16 +143,17 @@ def google_custom_search(query):
         list: List of search results (title, URL, snippet).
     """
     try:
-        logging.info(f"🔍 Searching Google for: {query}")
-        service = build("customsearch", "v1", developerKey=GOOGLE_SEARCH_KEY)
-        result = service.cse().list(q=query, cx=SEARCH_ENGINE_ID, num=TOP_K_RESULTS).execute()
-
-        search_results = [
-            {"title": item["title"], "link": item["link"], "snippet": item["snippet"]}
-            for item in result.get("items", [])
-        ]
-        logging.info(f"✅ Found {len(search_results)} results.")
-        return search_results
+        key = search_cache_key(query)
+        results = get_search_cache().get(key)
+        if results is not None:
+            logging.info(f"⚡ Search cache hit for: {query}")
+            return results
+
+        results, shared = _single_flight.do(key, lambda: _fetch_shared(query, key))
+        if shared:
+            get_search_cache().count("coalesced")
+        logging.info(f"✅ Found {len(results)} results.")
+        return results
 
     except Exception as e:
         logging.error(f"❌ Google Search Error: {str(e)}")
@@ -0,0 +1,169 @@
+import contextvars
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from scripts.config import INGEST_BATCH_SIZE, INGEST_MAX_FILES
+from scripts.loaders import load_sections
+from scripts.metrics import span
+from scripts.vector_store import VectorStore, build_index, embed_documents, embedding_model_name, split_texts
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+@contextmanager
+def local_path(source, suffix=""):
+    """
+    Provide a file path for a path or a file-like object such as a Streamlit upload.
+
+    Args:
+        source (str | file): File path, or binary file-like object spooled to a temporary file.
+        suffix (str): Suffix of the temporary file.
+
+    Yields:
+        str: Path of a readable file, removed afterwards if it was temporary.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        source.seek(0)
+        shutil.copyfileobj(source, f)
+    try:
+        yield f.name
+    finally:
+        os.unlink(f.name)
+
+def iter_section_chunks(sections, metadata):
+    """
+    Split streamed document sections into chunks, tagging each chunk with where it came from.
+
+    Args:
+        sections (iterable): (section_metadata, text) pairs from a loader, e.g. ({"page": 3}, text).
+        metadata (dict): Metadata copied onto every chunk (e.g. its source).
+
+    Yields:
+        Document: Chunks with the metadata and their section's metadata.
+    """
+    for section, text in sections:
+        yield from split_texts([text], [{**metadata, **section}])
+
+class IndexWriter:
+    """
+    Adds chunk batches to one vector store from any number of ingestion threads, creating
+    the store from the first batch if there is none yet.
+    """
+
+    def __init__(self, vector_db=None):
+        self.vector_db = vector_db
+        self._lock = threading.Lock()
+
+    def add(self, documents):
+        """
+        Embed and index a batch of chunks.
+
+        Args:
+            documents (list): Document chunks.
+
+        Returns:
+            list: The chunks' IDs in the store.
+        """
+        with self._lock:
+            if self.vector_db is None:
+                index = build_index(embed_documents(documents), ids=range(len(documents)))
+                self.vector_db = VectorStore(index, documents, embedding_model=embedding_model_name())
+                return list(range(len(documents)))
+        # Embedding runs outside the lock, so concurrent batches share the embedding service
+        return self.vector_db.add_documents(documents)
+
+def index_chunks(chunks, writer, batch_size=INGEST_BATCH_SIZE):
+    """
+    Embed and index a stream of chunks in batches, so the source keeps being read while
+    earlier batches are embedded and only one batch is waiting at a time.
+
+    If indexing fails part-way, the chunks already added are deleted again.
+
+    Args:
+        chunks (iterable): Document chunks.
+        writer (IndexWriter): Writer for the target store.
+        batch_size (int): Chunks per embedding batch.
+
+    Returns:
+        list: The new chunk IDs.
+    """
+    ids = []
+    try:
+        for batch in itertools.batched(chunks, batch_size):
+            ids.extend(writer.add(list(batch)))
+    except Exception:
+        if ids:
+            writer.vector_db.delete(ids)
+        raise
+    return ids
+
+def _ingest(writer, source, name, metadata=None):
+    start = time.perf_counter()
+    with span("ingest", file=name) as attributes, local_path(source, suffix=os.path.splitext(name)[1]) as path:
+        logging.info(f"📄 Ingesting document: {name}")
+        sections = load_sections(path, name)
+        ids = index_chunks(iter_section_chunks(sections, {"source": name, **(metadata or {})}), writer)
+        attributes["chunks"] = len(ids)
+    logging.info(f"✅ Ingested {name}: {len(ids)} chunks in {time.perf_counter() - start:.1f}s")
+    return ids
+
+def ingest_file(source, name, vector_db=None, metadata=None):
+    """
+    Stream a document into a vector store with the loader for its file type (see
+    ``scripts.loaders.LOADERS``): sections are split and embedded in batches while later
+    ones are still being read, and PDF pages are extracted in the PDF process pool.
+
+    Args:
+        source (str | file): File path or binary file-like object.
+        name (str): File name; its extension picks the loader and it is stored as the chunks' ``source``.
+        vector_db (VectorStore): Store to add to; a new one is created if None.
+        metadata (dict): Extra metadata for every chunk.
+
+    Returns:
+        tuple: (vector_db, ids) - the store (None if there were no chunks) and the new chunk IDs.
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    writer = IndexWriter(vector_db)
+    ids = _ingest(writer, source, name, metadata)
+    return writer.vector_db, ids
+
+def ingest_files(files, vector_db=None, max_workers=INGEST_MAX_FILES, writer=None):
+    """
+    Ingest a batch of documents into one vector store, several files at a time, so one
+    file's extraction overlaps another's embedding and their batches share the embedding service.
+
+    Args:
+        files (list): (source, name, metadata) tuples as taken by ``ingest_file``.
+        vector_db (VectorStore): Store to add to; a new one is created if None.
+        max_workers (int): Files ingested concurrently.
+        writer (IndexWriter): Writer to add through instead of a new one for ``vector_db``.
+
+    Returns:
+        tuple: (vector_db, results) - the store and, per file, its chunk IDs or None if it failed.
+    """
+    writer = writer or IndexWriter(vector_db)
+
+    def ingest(file):
+        source, name, metadata = file
+        try:
+            return _ingest(writer, source, name, metadata)
+        except Exception as e:
+            logging.error(f"❌ Error ingesting {name}: {str(e)}")
+            return None
+
+    with ThreadPoolExecutor(max(1, min(max_workers, len(files)))) as pool:
+        # Each file runs in its own copy of the caller's context, so its spans join the caller's request trace
+        futures = [pool.submit(contextvars.copy_context().run, ingest, file) for file in files]
+        results = [future.result() for future in futures]
+    return writer.vector_db, results
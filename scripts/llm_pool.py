@@ -0,0 +1,227 @@
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+import httpx
+from langchain_groq import ChatGroq
+from scripts.config import (GROQ_API_KEY, GROQ_API_BASE, LLM_MAX_CONCURRENCY, LLM_IDLE_TIMEOUT,
+                            LLM_MAX_RETRIES, LLM_RETRY_BACKOFF)
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+def is_rate_limited(error):
+    """
+    Check whether an LLM client error is a rate-limit (HTTP 429) response.
+
+    Args:
+        error (Exception): Error raised by the Groq client.
+
+    Returns:
+        bool: True if the request should be retried after a backoff.
+    """
+    return getattr(error, "status_code", None) == 429
+
+def retry_after(error, attempt, backoff=LLM_RETRY_BACKOFF):
+    """
+    Work out how long to wait before retrying a rate-limited request.
+
+    Args:
+        error (Exception): The rate-limit error, possibly carrying a ``Retry-After`` header.
+        attempt (int): Zero-based retry attempt.
+        backoff (float): Initial backoff in seconds.
+
+    Returns:
+        float: Seconds to sleep.
+    """
+    response = getattr(error, "response", None)
+    header = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(header)
+    except (TypeError, ValueError):
+        return backoff * (2 ** attempt) * (1 + random.random() * 0.1)  # Exponential backoff with jitter
+
+class _PooledClient:
+    def __init__(self, llm, http_client):
+        self.llm = llm
+        self.http_client = http_client
+        self.last_used = time.monotonic()
+        self.in_flight = 0  # Requests using the client; only clients with none are evicted
+
+class LLMClientPool:
+    """
+    Process-wide pool of Groq chat clients keyed by (model name, temperature).
+
+    Clients keep their HTTP connections alive between requests, each model has a bounded
+    number of requests in flight, rate-limit responses are retried with backoff, and
+    clients with no request in flight that sit idle for ``idle_timeout`` seconds are closed.
+    """
+
+    def __init__(self, api_key=GROQ_API_KEY, base_url=GROQ_API_BASE, max_concurrency=LLM_MAX_CONCURRENCY,
+                 idle_timeout=LLM_IDLE_TIMEOUT, max_retries=LLM_MAX_RETRIES, backoff=LLM_RETRY_BACKOFF):
+        """
+        Initialize the pool.
+
+        Args:
+            api_key (str): Groq API key.
+            base_url (str): Optional API base URL (None uses the Groq default).
+            max_concurrency (int): Maximum in-flight requests per model.
+            idle_timeout (float): Seconds before an unused client is closed.
+            max_retries (int): Retries on rate-limit responses.
+            backoff (float): Initial retry backoff in seconds.
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.idle_timeout = idle_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._clients = {}
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name, temperature=0):
+        """
+        Return the pooled client for a model, creating it on first use.
+
+        Args:
+            model_name (str): Selected LLM model.
+            temperature (float): Sampling temperature.
+
+        Returns:
+            ChatGroq: The shared chat model client.
+        """
+        with self._lock:
+            self._evict_idle()
+            return self._client(model_name, temperature).llm
+
+    @contextmanager
+    def acquire(self, model_name, temperature=0):
+        """
+        Hold one of the model's concurrency slots while using its client.
+
+        The client counts as in flight until the block exits, so it is not closed as idle
+        under a long stream or retry.
+
+        Args:
+            model_name (str): Selected LLM model.
+            temperature (float): Sampling temperature.
+
+        Yields:
+            ChatGroq: The shared chat model client.
+        """
+        with self._lock:
+            semaphore = self._semaphores.setdefault(model_name, threading.BoundedSemaphore(self.max_concurrency))
+        with semaphore:
+            with self._lock:
+                self._evict_idle()
+                pooled = self._client(model_name, temperature)
+                pooled.in_flight += 1
+            try:
+                yield pooled.llm
+            finally:
+                with self._lock:
+                    pooled.in_flight -= 1
+                    pooled.last_used = time.monotonic()
+
+    def invoke(self, model_name, prompt, temperature=0):
+        """
+        Send a prompt, retrying rate-limited requests with backoff.
+
+        Args:
+            model_name (str): Selected LLM model.
+            prompt (str): Prompt text.
+            temperature (float): Sampling temperature.
+
+        Returns:
+            AIMessage: The model response.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.acquire(model_name, temperature) as llm:
+                    return llm.invoke(prompt)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                self._wait(model_name, e, attempt)
+
+    def stream(self, model_name, prompt, temperature=0):
+        """
+        Stream a response, retrying rate-limited requests that fail before the first token.
+
+        Args:
+            model_name (str): Selected LLM model.
+            prompt (str): Prompt text.
+            temperature (float): Sampling temperature.
+
+        Yields:
+            AIMessageChunk: Response chunks as they arrive.
+        """
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                with self.acquire(model_name, temperature) as llm:
+                    for chunk in llm.stream(prompt):
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                if started or not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                self._wait(model_name, e, attempt)
+
+    def close(self):
+        """Close every pooled client and its connections."""
+        with self._lock:
+            for pooled in self._clients.values():
+                pooled.http_client.close()
+            self._clients.clear()
+
+    def _wait(self, model_name, error, attempt):
+        delay = retry_after(error, attempt, self.backoff)
+        logging.warning(f"⚠️ {model_name} rate limited, retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})")
+        time.sleep(delay)
+
+    def _client(self, model_name, temperature):
+        # The pooled client for a model, created on first use; callers hold the lock
+        key = (model_name, temperature)
+        pooled = self._clients.get(key)
+        if pooled is None:
+            logging.info(f"🔌 Creating LLM client: {model_name} (temperature={temperature})")
+            http_client = httpx.Client(
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency,
+                                    keepalive_expiry=self.idle_timeout),
+            )
+            llm = ChatGroq(
+                temperature=temperature,
+                groq_api_key=self.api_key,
+                groq_api_base=self.base_url,
+                model_name=model_name,
+                max_retries=0,  # Rate limits are retried by the pool
+                http_client=http_client,
+            )
+            pooled = self._clients[key] = _PooledClient(llm, http_client)
+        pooled.last_used = time.monotonic()
+        return pooled
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        for key, pooled in list(self._clients.items()):
+            if pooled.in_flight == 0 and now - pooled.last_used > self.idle_timeout:
+                logging.info(f"🧹 Closing idle LLM client: {key[0]}")
+                pooled.http_client.close()
+                del self._clients[key]
+
+@functools.lru_cache(maxsize=1)
+def get_llm_pool():
+    """
+    Return the process-wide LLM client pool shared by all pages.
+
+    Returns:
+        LLMClientPool: The shared pool.
+    """
+    return LLMClientPool()
@@ -0,0 +1,235 @@
+import functools
+import itertools
+import logging
+import multiprocessing
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import lxml.html
+from PyPDF2 import PdfReader
+from scripts.config import PDF_WORKERS, PDF_PAGES_PER_TASK, PDF_INLINE_PAGES
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Each worker process keeps the PDF it is working on open between tasks; only worker tasks use it
+_readers = {}
+
+def _pdf_reader(path):
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if key not in _readers:
+        _readers.clear()
+        _readers[key] = PdfReader(path)
+    return _readers[key]
+
+def extract_pdf_pages(path, start, stop):
+    """
+    Extract the text of a range of PDF pages in a worker process.
+
+    The worker keeps the PDF open for its next task, so call ``read_pdf_pages`` with
+    an open reader instead when extracting in this process.
+
+    Args:
+        path (str): PDF file path.
+        start (int): First page index (zero-based).
+        stop (int): Page index to stop before.
+
+    Returns:
+        list: (page_number, text) pairs with one-based page numbers; pages that fail to
+            extract have empty text.
+    """
+    return read_pdf_pages(_pdf_reader(path), path, start, stop)
+
+def read_pdf_pages(reader, path, start, stop):
+    """
+    Extract the text of a range of pages from an open PDF.
+
+    Args:
+        reader (PdfReader): The open PDF.
+        path (str): PDF file path, for log messages.
+        start (int): First page index (zero-based).
+        stop (int): Page index to stop before.
+
+    Returns:
+        list: (page_number, text) pairs as returned by ``extract_pdf_pages``.
+    """
+    pages = []
+    for index in range(start, stop):
+        try:
+            text = reader.pages[index].extract_text() or ""
+        except Exception as e:
+            logging.warning(f"⚠️ Could not extract page {index + 1} of {path}: {str(e)}")
+            text = ""
+        pages.append((index + 1, text))
+    return pages
+
+@functools.lru_cache(maxsize=1)
+def get_pdf_pool():
+    """
+    Return the process pool shared by all PDF extractions.
+
+    Returns:
+        ProcessPoolExecutor: ``PDF_WORKERS`` spawned processes.
+    """
+    logging.info(f"📄 Starting {PDF_WORKERS} PDF extraction workers")
+    return ProcessPoolExecutor(PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+def iter_pdf_pages(path, pages_per_task=PDF_PAGES_PER_TASK):
+    """
+    Stream the text of a PDF page by page, in page order.
+
+    Page ranges are extracted in the shared process pool, with at most two tasks per worker
+    in flight, so extraction runs ahead of the consumer without holding the whole document
+    in memory. PDFs of up to ``PDF_INLINE_PAGES`` pages are extracted in this process.
+
+    Args:
+        path (str): PDF file path.
+        pages_per_task (int): Pages per worker task.
+
+    Yields:
+        tuple: (page_number, text), with one-based page numbers.
+    """
+    reader = PdfReader(path)
+    num_pages = len(reader.pages)
+    ranges = [(start, min(start + pages_per_task, num_pages)) for start in range(0, num_pages, pages_per_task)]
+    if num_pages <= PDF_INLINE_PAGES or PDF_WORKERS <= 1:
+        # Extracted here with this reader, which is released once the file is done
+        for start, stop in ranges:
+            yield from read_pdf_pages(reader, path, start, stop)
+        return
+    del reader  # Workers open their own
+
+    pool, tasks = get_pdf_pool(), iter(ranges)
+    pending = deque(pool.submit(extract_pdf_pages, path, start, stop)
+                    for start, stop in itertools.islice(tasks, 2 * PDF_WORKERS))
+    try:
+        while pending:
+            pages = pending.popleft().result()
+            for start, stop in itertools.islice(tasks, 1):
+                pending.append(pool.submit(extract_pdf_pages, path, start, stop))
+            yield from pages
+    finally:
+        for future in pending:
+            future.cancel()  # The consumer stopped early
+
+# Long sections are emitted in pieces of about this many characters, so memory stays flat
+SECTION_MAX_CHARS = 64 * 1024
+
+def _sections(blocks):
+    # Group ("heading", title) / ("text", text) blocks into ({"section": title}, text) sections
+    title, parts, size = None, [], 0
+    for kind, text in blocks:
+        if kind == "heading" or size >= SECTION_MAX_CHARS:
+            if parts:
+                yield ({"section": title} if title else {}), "\n\n".join(parts)
+            parts, size = [], 0
+        if kind == "heading":
+            title = text
+        elif text.strip():
+            parts.append(text)
+            size += len(text)
+    if parts:
+        yield ({"section": title} if title else {}), "\n\n".join(parts)
+
+def _paragraphs(path, heading=None):
+    # Blank-line separated paragraphs of a text file, read line by line; lines matching
+    # the ``heading`` pattern (outside fenced code blocks) become headings
+    paragraph, fenced = [], False
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        for line in f:
+            fenced ^= line.lstrip().startswith("```")
+            match = heading.match(line) if heading and not fenced else None
+            if match or not line.strip():
+                if paragraph:
+                    yield "text", "".join(paragraph).rstrip()
+                    paragraph = []
+                if match:
+                    yield "heading", match.group(1).strip()
+                continue
+            paragraph.append(line)
+    if paragraph:
+        yield "text", "".join(paragraph).rstrip()
+
+def iter_pdf_sections(path):
+    """Yield ({"page": n}, text) for each PDF page, see ``iter_pdf_pages``."""
+    for page_number, text in iter_pdf_pages(path):
+        yield {"page": page_number}, text
+
+def iter_text_sections(path):
+    """Yield ({}, text) pieces of a plain-text file."""
+    return _sections(_paragraphs(path))
+
+MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$")
+
+def iter_markdown_sections(path):
+    """Yield ({"section": heading}, text) for each section of a Markdown file."""
+    return _sections(_paragraphs(path, MARKDOWN_HEADING))
+
+HTML_HEADINGS = {"h1", "h2", "h3", "h4"}
+HTML_BLOCKS = HTML_HEADINGS | {"p", "li", "pre", "blockquote", "td", "th", "dt", "dd", "figcaption"}
+
+def iter_html_sections(path):
+    """Yield ({"section": heading}, text) for each section of an HTML page, skipping scripts, styles and navigation."""
+    root = lxml.html.parse(path).getroot()
+    for element in root.xpath("//script | //style | //noscript | //nav | //header | //footer"):
+        element.drop_tree()
+
+    def blocks():
+        for element in root.iter(*HTML_BLOCKS):
+            # Nested blocks (a paragraph inside a list item) are part of their outermost block
+            if any(ancestor.tag in HTML_BLOCKS for ancestor in element.iterancestors()):
+                continue
+            text = " ".join(element.text_content().split())
+            yield ("heading" if element.tag in HTML_HEADINGS else "text"), text
+    return _sections(blocks())
+
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+def iter_docx_sections(path):
+    """Yield ({"section": heading}, text) for each section of a Word document, streaming its XML."""
+    def blocks():
+        with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as document:
+            for _, element in ET.iterparse(document):
+                if element.tag != f"{WORD_NAMESPACE}p":
+                    continue
+                style = element.find(f"{WORD_NAMESPACE}pPr/{WORD_NAMESPACE}pStyle")
+                style = style.get(f"{WORD_NAMESPACE}val", "") if style is not None else ""
+                text = "".join(node.text or "" for node in element.iter(f"{WORD_NAMESPACE}t"))
+                element.clear()
+                yield ("heading" if style.startswith(("Heading", "Title")) else "text"), text
+    return _sections(blocks())
+
+LOADERS = {
+    ".pdf": iter_pdf_sections,
+    ".docx": iter_docx_sections,
+    ".html": iter_html_sections,
+    ".htm": iter_html_sections,
+    ".md": iter_markdown_sections,
+    ".markdown": iter_markdown_sections,
+    ".txt": iter_text_sections,
+}
+SUPPORTED_EXTENSIONS = [extension.lstrip(".") for extension in LOADERS]
+
+def load_sections(path, name=None):
+    """
+    Stream a document's text with the loader for its file type.
+
+    Args:
+        path (str): File path.
+        name (str): Original file name, whose extension picks the loader (defaults to ``path``).
+
+    Returns:
+        iterator: (metadata, text) sections, where metadata holds the ``page`` (PDF) or
+            ``section`` heading (DOCX, HTML, Markdown) the text comes from.
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    extension = os.path.splitext(name or path)[1].lower()
+    if extension not in LOADERS:
+        raise ValueError(f"Unsupported file type '{extension}', expected one of {', '.join(LOADERS)}")
+    return LOADERS[extension](path)
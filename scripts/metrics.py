@@ -0,0 +1,290 @@
+import contextvars
+import functools
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from scripts.config import METRICS_ENABLED, METRICS_HOST, METRICS_PORT, METRICS_WINDOW, METRICS_MAX_TRACES
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PERCENTILES = (50, 95, 99)
+METRIC_PREFIX = "search_"
+
+METRIC_HELP = {
+    "stage_duration_seconds": "Time spent in each pipeline stage.",
+    "request_duration_seconds": "End-to-end time of traced requests.",
+    "stage_errors_total": "Pipeline stages that raised an exception.",
+    "requests_total": "Traced requests.",
+    "cache_events_total": "Cache lookups by cache and outcome (hits, misses, stale, ...).",
+    "chunks_total": "Chunks produced by text splitting.",
+    "embedded_texts_total": "Texts sent to the embedding model.",
+    "prompt_tokens_total": "Prompt tokens sent to the LLM.",
+    "api_rejected_total": "API requests turned away with HTTP 503 by a concurrency limiter.",
+}
+
+# Trace of the request being handled in this thread or task, if any
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+class Histogram:
+    """
+    Latency histogram with Prometheus buckets, plus a window of recent samples for percentiles.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window=METRICS_WINDOW):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentiles(self):
+        """dict: p50/p95/p99 of the recent samples (None before the first sample)."""
+        values = np.percentile(list(self.recent), PERCENTILES).tolist() if self.recent else [None] * len(PERCENTILES)
+        return {f"p{p}": value for p, value in zip(PERCENTILES, values)}
+
+class Metrics:
+    """
+    Process-wide registry of counters, stage latency histograms and recent request traces.
+
+    Stages are timed with ``span``; the spans of a request started with ``trace`` are
+    collected into that request's trace, including spans run in threads that copied its context.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, window=METRICS_WINDOW, max_traces=METRICS_MAX_TRACES):
+        self.enabled = enabled
+        self.window = window
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.traces = deque(maxlen=max_traces)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1, **labels):
+        """Add ``value`` to a counter."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record a duration in a histogram."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(window=self.window)
+            self.histograms[key].observe(seconds)
+
+    @contextmanager
+    def span(self, stage, **attributes):
+        """
+        Time a pipeline stage.
+
+        Args:
+            stage (str): Stage name, e.g. ``embed``.
+            **attributes: Details stored with the span in the current trace (e.g. ``texts=12``).
+
+        Yields:
+            dict: The span's attributes, which the caller may add to (e.g. cache hits).
+        """
+        if not self.enabled:
+            yield attributes
+            return
+        trace, start = _current_trace.get(), time.perf_counter()
+        try:
+            yield attributes
+        except BaseException:
+            attributes["error"] = True
+            self.increment("stage_errors_total", stage=stage)
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.observe("stage_duration_seconds", duration, stage=stage)
+            if trace is not None:
+                trace["spans"].append({"stage": stage, "offset": start - trace["start"], "duration": duration,
+                                       **attributes})
+
+    @contextmanager
+    def trace(self, name, **attributes):
+        """
+        Trace one request: every span run within it is recorded in a trace kept for the admin page.
+
+        Args:
+            name (str): Request kind, e.g. ``web_search``.
+            **attributes: Details stored with the trace (e.g. the query).
+
+        Yields:
+            dict: The trace.
+        """
+        if not self.enabled:
+            yield {"spans": []}
+            return
+        trace = {"id": next(self._ids), "name": name, "started_at": time.time(), "start": time.perf_counter(),
+                 "attributes": attributes, "spans": []}
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(token)
+            trace["duration"] = time.perf_counter() - trace["start"]
+            self.increment("requests_total", kind=name)
+            self.observe("request_duration_seconds", trace["duration"], kind=name)
+            with self._lock:
+                self.traces.append(trace)
+
+    def summary(self):
+        """
+        Return a snapshot for display.
+
+        Returns:
+            dict: ``stages`` and ``requests`` (count, mean, p50, p95, p99 and total seconds by
+                name), ``counters`` (by metric name and labels) and recent ``traces``, newest first.
+        """
+        with self._lock:
+            histograms = [(name, dict(labels), h.count, h.sum, h.percentiles()) for (name, labels), h in self.histograms.items()]
+            counters = [(name, dict(labels), value) for (name, labels), value in self.counters.items()]
+            traces = list(self.traces)[::-1]
+        stages, requests = {}, {}
+        for name, labels, count, total, percentiles in histograms:
+            target = stages if name == "stage_duration_seconds" else requests
+            target[labels.get("stage") or labels.get("kind")] = {"count": count, "mean": total / count if count else 0.0,
+                                                                  **percentiles, "total": total}
+        return {"stages": stages, "requests": requests, "counters": counters, "traces": traces}
+
+    def render_prometheus(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Histograms get ``_bucket``/``_sum``/``_count`` series plus a ``_quantile`` gauge with the
+        p50/p95/p99 of recent samples.
+
+        Returns:
+            str: The exposition text.
+        """
+        def series(name, labels, value, extra=()):
+            pairs = list(labels) + list(extra)
+            label_text = "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+            return f"{METRIC_PREFIX}{name}{label_text} {value:g}"
+
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        for name, group in itertools.groupby(counters, key=lambda item: item[0][0]):
+            lines += [f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP.get(name, name)}", f"# TYPE {METRIC_PREFIX}{name} counter"]
+            lines += [series(name, labels, value) for (_, labels), value in group]
+
+        for name, group in itertools.groupby(histograms, key=lambda item: item[0][0]):
+            group = list(group)
+            lines += [f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP.get(name, name)}", f"# TYPE {METRIC_PREFIX}{name} histogram"]
+            for (_, labels), histogram in group:
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(series(f"{name}_bucket", labels, cumulative, [("le", f"{bound:g}")]))
+                lines.append(series(f"{name}_bucket", labels, histogram.count, [("le", "+Inf")]))
+                lines.append(series(f"{name}_sum", labels, histogram.sum))
+                lines.append(series(f"{name}_count", labels, histogram.count))
+            lines += [f"# HELP {METRIC_PREFIX}{name}_quantile Percentiles of the last {self.window} samples.",
+                      f"# TYPE {METRIC_PREFIX}{name}_quantile gauge"]
+            for (_, labels), histogram in group:
+                for p, value in histogram.percentiles().items():
+                    if value is not None:
+                        lines.append(series(f"{name}_quantile", labels, value, [("quantile", f"{int(p[1:]) / 100:g}")]))
+        return "\n".join(lines) + "\n"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+@functools.lru_cache(maxsize=1)
+def get_metrics():
+    """
+    Return the process-wide metrics registry.
+
+    Returns:
+        Metrics: Shared registry.
+    """
+    return Metrics()
+
+def span(stage, **attributes):
+    """Time a pipeline stage in the shared registry, see ``Metrics.span``."""
+    return get_metrics().span(stage, **attributes)
+
+def trace(name, **attributes):
+    """Trace a request in the shared registry, see ``Metrics.trace``."""
+    return get_metrics().trace(name, **attributes)
+
+def increment(name, value=1, **labels):
+    """Add to a counter in the shared registry."""
+    get_metrics().increment(name, value, **labels)
+
+def timed(stage):
+    """
+    Decorator that records every call of a function as a ``stage`` span.
+
+    Args:
+        stage (str): Stage name.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = get_metrics().render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes are too frequent to log
+
+@functools.lru_cache(maxsize=1)
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """
+    Serve ``/metrics`` in the Prometheus text format from a background thread, once per process.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on.
+
+    Returns:
+        ThreadingHTTPServer: The server, or None if the port is taken (e.g. by another worker process).
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logging.warning(f"⚠️ Metrics endpoint not started on {host}:{port}: {str(e)}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logging.info(f"📈 Serving Prometheus metrics on http://{host}:{server.server_port}/metrics")
+    return server
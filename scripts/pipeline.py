@@ -0,0 +1,197 @@
+import asyncio
+import contextvars
+import logging
+import queue
+import threading
+import time
+import numpy as np
+from scripts.config import CONTEXT_CANDIDATES, PIPELINE_MIN_ARTICLES, PIPELINE_RETRIEVAL_DEADLINE
+from scripts.google_search import google_custom_search
+from scripts.reranker import retrieve
+from scripts.scraper import extract_articles
+from scripts.utils import stream_llm
+from scripts.vector_store import VectorStore, build_index, embed_documents, embedding_model_name, split_texts
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+class StageTimer:
+    """Records stage durations and milestones in seconds since the pipeline started."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.timings = {}
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def mark(self, name):
+        """Record a milestone, once."""
+        self.timings.setdefault(name, self.elapsed())
+
+    def add(self, name, seconds):
+        """Accumulate time spent in a stage that runs in several pieces."""
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+class _Corpus:
+    # Chunks and vectors of the articles embedded so far
+    def __init__(self):
+        self.documents = []
+        self.vectors = []
+        self.articles = 0
+        self.changed = asyncio.Event()
+
+def _embed_article(url, text):
+    documents = split_texts([text], [{"source": url}])
+    return documents, embed_documents(documents) if documents else None
+
+async def _scrape_and_embed(urls, corpus, timer):
+    # Scrape in the existing thread pool and embed each article as soon as it arrives
+    loop = asyncio.get_running_loop()
+    articles = asyncio.Queue()
+
+    def scrape():
+        try:
+            for url, text in extract_articles(urls):
+                loop.call_soon_threadsafe(articles.put_nowait, (url, text))
+            loop.call_soon_threadsafe(articles.put_nowait, None)
+        except RuntimeError:
+            pass  # The pipeline finished and closed its loop; remaining articles are not needed
+
+    # A daemon thread, so abandoned downloads never hold up the event loop's shutdown
+    threading.Thread(target=scrape, name="pipeline-scraper", daemon=True).start()
+    while (article := await articles.get()) is not None:
+        url, text = article
+        if not text or not text.strip():
+            continue
+        timer.mark("first_article")
+        start = time.perf_counter()
+        documents, vectors = await asyncio.to_thread(_embed_article, url, text)
+        timer.add("embed", time.perf_counter() - start)
+        if documents:
+            corpus.documents.extend(documents)
+            corpus.vectors.append(vectors)
+            corpus.articles += 1
+            corpus.changed.set()
+    timer.mark("scrape_done")
+
+async def _wait_for_content(corpus, scraper, min_articles, deadline):
+    # Until enough articles are embedded, the deadline passes with some content, or scraping ends
+    while not scraper.done():
+        if corpus.articles >= min_articles:
+            return
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0 and corpus.articles:
+            return
+        corpus.changed.clear()
+        waiter = asyncio.ensure_future(corpus.changed.wait())
+        await asyncio.wait({waiter, scraper}, timeout=remaining if remaining > 0 else None,
+                           return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+
+def _retrieve(query, documents, vectors, k):
+    vector_db = VectorStore(build_index(np.vstack(vectors), ids=range(len(documents))), documents,
+                            embedding_model=embedding_model_name())
+    return [doc.page_content for doc, _ in retrieve(vector_db, query, k=k)]
+
+async def search_pipeline(query, model_name, emit, k=CONTEXT_CANDIDATES, min_articles=PIPELINE_MIN_ARTICLES,
+                          retrieval_deadline=PIPELINE_RETRIEVAL_DEADLINE, llm=None):
+    """
+    Answer a query from the live web, overlapping search, scraping, embedding and generation.
+
+    Each article is chunked and embedded as soon as it is scraped. Retrieval runs once
+    ``min_articles`` articles are embedded, or ``retrieval_deadline`` seconds after the start
+    if at least one is, and the LLM call starts right after; articles still downloading
+    are abandoned.
+
+    Args:
+        query (str): User query.
+        model_name (str): LLM to answer with.
+        emit (callable): Called with ``(kind, payload)`` events: ``sources`` (search results),
+            ``chunks`` (retrieved chunk texts), ``token`` (answer text), ``error`` (message)
+            and finally ``done`` (stage timings, see ``run_search_pipeline``).
+        k (int): Chunks to retrieve.
+        min_articles (int): Embedded articles that trigger retrieval.
+        retrieval_deadline (float): Seconds after which retrieval starts with whatever has arrived.
+        llm: Optional chat model to use instead of the pooled Groq client.
+    """
+    timer = StageTimer()
+    scraper = None
+    try:
+        # 🔍 Search
+        search_results = await asyncio.to_thread(google_custom_search, query)
+        timer.mark("search")
+        if not search_results:
+            emit("error", "⚠️ No search results found for the query.")
+            return
+        emit("sources", search_results)
+
+        # 📄 Scrape and 🧠 embed concurrently, until there is enough to answer from
+        corpus = _Corpus()
+        scraper = asyncio.ensure_future(_scrape_and_embed([r["link"] for r in search_results], corpus, timer))
+        await _wait_for_content(corpus, scraper, min_articles, timer.start + retrieval_deadline)
+        if not corpus.documents:
+            emit("error", "⚠️ Could not extract meaningful content from search results. Try a different query.")
+            return
+        timer.timings["articles"] = corpus.articles
+
+        # 🔎 Retrieve from the articles embedded so far
+        start = time.perf_counter()
+        chunks = await asyncio.to_thread(_retrieve, query, list(corpus.documents), list(corpus.vectors), k)
+        timer.add("retrieve", time.perf_counter() - start)
+        timer.mark("retrieved")
+        if not chunks:
+            emit("error", "⚠️ No relevant content found for your query.")
+            return
+        emit("chunks", chunks)
+
+        # 🤖 Generate, forwarding tokens as they arrive
+        metrics = {}
+
+        def generate():
+            for token in stream_llm(query, chunks, model_name, metrics=metrics, llm=llm):
+                timer.mark("first_token")
+                emit("token", token)
+
+        await asyncio.to_thread(generate)
+        timer.timings["prompt_tokens"] = metrics.get("prompt_tokens")
+        if "error" in metrics:
+            timer.timings["error"] = metrics["error"]
+
+    except Exception as e:
+        logging.error(f"❌ Search pipeline error: {str(e)}")
+        emit("error", f"⚠️ An error occurred: {str(e)}")
+    finally:
+        if scraper is not None and not scraper.done():
+            scraper.cancel()
+        timer.mark("total")
+        logging.info(f"⏱️ Pipeline timings: {timer.timings}")
+        emit("done", timer.timings)
+
+def run_search_pipeline(query, model_name, **options):
+    """
+    Run ``search_pipeline`` on its own event loop and yield its events as they happen.
+
+    Args:
+        query (str): User query.
+        model_name (str): LLM to answer with.
+        **options: Passed to ``search_pipeline``.
+
+    Yields:
+        tuple: ``(kind, payload)`` events. The last one is ``("done", timings)``, where timings
+            holds ``search``, ``first_article``, ``retrieved``, ``first_token`` and ``total``
+            (seconds since the start), ``embed`` and ``retrieve`` (seconds spent), ``articles`` (articles
+            answered from) and ``error`` if generation failed.
+    """
+    events = queue.Queue()
+    emit = lambda kind, payload: events.put((kind, payload))
+    # The pipeline runs in a copy of the caller's context, so its spans join the caller's request trace
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=lambda: context.run(asyncio.run, search_pipeline(query, model_name, emit, **options)),
+                              name="search-pipeline", daemon=True)
+    thread.start()
+    while True:
+        kind, payload = events.get()
+        yield kind, payload
+        if kind == "done":
+            return
@@ -0,0 +1,175 @@
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from scripts.config import (RERANK_ENABLED, RERANK_MODEL, RERANK_CANDIDATES, RERANK_TOP_K, RERANK_BATCH_SIZE,
+                            RERANK_MAX_LENGTH, RERANK_BUDGET_MS, RERANK_CACHE_SIZE)
+from scripts.metrics import timed
+from scripts.vector_store import chunk_hash
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+class Reranker:
+    """
+    Rescores retrieved chunks with a local cross-encoder on CPU.
+
+    Pairs are scored in batches against a per-query latency budget: the cost of one pair is
+    tracked as a moving average, the candidate list is cut to what the budget affords before
+    scoring starts, and scoring stops early if a batch runs slow. Scores are cached per
+    (query, chunk hash), so repeated queries only pay for chunks they have not seen.
+    """
+
+    def __init__(self, model_name=RERANK_MODEL, batch_size=RERANK_BATCH_SIZE, max_length=RERANK_MAX_LENGTH,
+                 budget_ms=RERANK_BUDGET_MS, cache_size=RERANK_CACHE_SIZE):
+        """
+        Args:
+            model_name (str): Sentence-transformers cross-encoder to load.
+            batch_size (int): Pairs scored per forward pass.
+            max_length (int): Tokens per (query, chunk) pair.
+            budget_ms (float): Scoring time allowed per query, in milliseconds.
+            cache_size (int): Scores kept in the LRU cache.
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.budget = budget_ms / 1000
+        self.cache_size = cache_size
+        self.pair_cost = None  # Moving average of seconds per scored pair
+        self._model = None
+        self._load_failed = False
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """CrossEncoder: The model, loaded on first use; None if it cannot be loaded."""
+        with self._lock:
+            if self._model is None and not self._load_failed:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    logging.info(f"🧮 Loading reranker model {self.model_name}...")
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+                except Exception as e:
+                    logging.error(f"❌ Error loading reranker model {self.model_name}: {str(e)}")
+                    self._load_failed = True
+            return self._model
+
+    def _cached(self, key):
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _remember(self, keys, scores):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._cache[key] = score
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def affordable(self, num_pairs):
+        """
+        Work out how many uncached pairs fit in the latency budget.
+
+        Args:
+            num_pairs (int): Pairs waiting to be scored.
+
+        Returns:
+            int: Pairs to score, at least one batch.
+        """
+        if self.pair_cost is None:
+            return num_pairs  # No measurement yet
+        return min(num_pairs, max(self.batch_size, int(self.budget / self.pair_cost)))
+
+    @timed("rerank")
+    def rerank(self, query, documents, k=RERANK_TOP_K):
+        """
+        Reorder retrieved chunks by cross-encoder relevance.
+
+        Candidates are taken in retrieval order. Those the budget cannot afford are dropped,
+        unless fewer than ``k`` chunks were scored, in which case they fill the remaining slots
+        in retrieval order.
+
+        Args:
+            query (str): User query.
+            documents (list): Retrieved Document objects, best first.
+            k (int): Number of chunks to keep.
+
+        Returns:
+            list: (Document, score) pairs, best first. Scores are cross-encoder logits, or None for
+                chunks kept unscored (including every chunk if the model could not be loaded).
+        """
+        if not documents:
+            return []
+        model = self.model
+        if model is None:
+            return [(doc, None) for doc in documents[:k]]
+
+        keys = [(self.model_name, query, chunk_hash(doc.page_content)) for doc in documents]
+        scores = [self._cached(key) for key in keys]
+        pending = [i for i, score in enumerate(scores) if score is None]
+        pending = pending[:self.affordable(len(pending))]
+
+        start = time.perf_counter()
+        for offset in range(0, len(pending), self.batch_size):
+            batch = pending[offset:offset + self.batch_size]
+            batch_start = time.perf_counter()
+            try:
+                batch_scores = model.predict([(query, documents[i].page_content) for i in batch],
+                                             batch_size=self.batch_size, show_progress_bar=False)
+            except Exception as e:
+                logging.error(f"❌ Error reranking chunks: {str(e)}")
+                break
+            cost = (time.perf_counter() - batch_start) / len(batch)
+            self.pair_cost = cost if self.pair_cost is None else 0.7 * self.pair_cost + 0.3 * cost
+
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+            self._remember([keys[i] for i in batch], [scores[i] for i in batch])
+
+            # Stop before a batch that would overrun the budget
+            if time.perf_counter() - start + self.pair_cost * self.batch_size > self.budget:
+                break
+
+        scored = sorted((i for i, score in enumerate(scores) if score is not None), key=lambda i: -scores[i])
+        unscored = [i for i, score in enumerate(scores) if score is None]
+        skipped = len(unscored)
+        ranked = (scored + unscored)[:k]
+        elapsed = (time.perf_counter() - start) * 1000
+        logging.info(f"🧮 Reranked {len(documents) - skipped}/{len(documents)} chunks in {elapsed:.0f} ms")
+        return [(documents[i], scores[i]) for i in ranked]
+
+@functools.lru_cache(maxsize=1)
+def get_reranker():
+    """
+    Return the process-wide reranker shared by all pages.
+
+    Returns:
+        Reranker: The shared reranker.
+    """
+    return Reranker()
+
+def retrieve(vector_db, query, k=5):
+    """
+    Retrieve the chunks to send to the LLM.
+
+    With ``RERANK_ENABLED``, ``RERANK_CANDIDATES`` chunks are over-fetched and the best
+    ``min(k, RERANK_TOP_K)`` by cross-encoder score are kept; otherwise this is a plain
+    similarity search.
+
+    Args:
+        vector_db (VectorStore): Store to search.
+        query (str): User query.
+        k (int): Number of chunks to return without reranking.
+
+    Returns:
+        list: (Document, score) pairs, best first.
+    """
+    if not RERANK_ENABLED:
+        return vector_db.similarity_search_with_score(query, k=k)
+    candidates = vector_db.similarity_search_with_score(query, k=max(k, RERANK_CANDIDATES))
+    return get_reranker().rerank(query, [doc for doc, _ in candidates], k=min(k, RERANK_TOP_K))
@@ -1,18 +1,59 @@
-from newspaper import Article
-from scripts.config import MAX_LENGTH
+from newspaper import Article, Config
+from collections import deque
+from scripts.cache import get_content_cache
+from scripts.config import (MAX_LENGTH, SCRAPER_MAX_THREADS, SCRAPER_MAX_WORKERS, SCRAPER_TOTAL_TIMEOUT,
+                            SCRAPER_URL_TIMEOUT)
+from scripts.metrics import timed
+import contextvars
 import logging
+import queue
+import requests
+import threading
+import time
 import validators
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def extract_full_article(url, max_length=MAX_LENGTH):
+BROWSER_USER_AGENT = Config().browser_user_agent
+
+# Download threads alive in this process, across batches; a thread keeps its slot after its URL times out
+_thread_slots = threading.BoundedSemaphore(max(1, SCRAPER_MAX_THREADS))
+
+def parse_article(url, html):
+    """
+    Parse article title and text out of already downloaded HTML.
+
+    Args:
+        url (str): The article URL.
+        html (str): The page HTML.
+
+    Returns:
+        Article: The parsed newspaper article, or None if it has no meaningful text.
+    """
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+
+    # Check if extracted text is valid
+    if not article.text or len(article.text.strip()) < 50:  # Minimum length to ensure meaningful content
+        logging.warning(f"⚠️ No meaningful content extracted from: {url}")
+        return None
+    return article
+
+@timed("scrape")
+def extract_full_article(url, max_length=MAX_LENGTH, timeout=SCRAPER_URL_TIMEOUT, use_cache=True):
     """
     Extract full text from a given article URL.
 
+    Fresh results are served from the shared content cache without touching the network.
+    Stale entries are revalidated with ETag/Last-Modified when the server supports it.
+
     Args:
         url (str): The article URL.
         max_length (int): The maximum length of the text to extract.
+        timeout (float): Network timeout in seconds for the download.
+        use_cache (bool): Whether to read from and write to the content cache.
 
     Returns:
         str: Extracted article text or None if extraction fails or content is invalid.
@@ -23,19 +64,121 @@ def extract_full_article(url, max_length=MAX_LENGTH):
             logging.error(f"❌ Invalid URL: {url}")
             return None
 
+        cache = get_content_cache() if use_cache else None
+        entry = cache.get(url) if cache else None
+        if entry is not None and entry.fresh:
+            logging.info(f"⚡ Serving cached article: {url}")
+            return entry.text[:max_length]
+
         logging.info(f"📄 Extracting article from: {url}")
-        article = Article(url)
-        article.download()
-        article.parse()
+        headers = {"User-Agent": BROWSER_USER_AGENT}
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        response = requests.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            logging.info(f"⚡ Cached article still valid: {url}")
+            cache.touch(url)
+            return entry.text[:max_length]
+        response.raise_for_status()
 
-        # Check if extracted text is valid
-        if not article.text or len(article.text.strip()) < 50:  # Minimum length to ensure meaningful content
-            logging.warning(f"⚠️ No meaningful content extracted from: {url}")
+        article = parse_article(url, response.text)
+        if article is None:
             return None
 
+        if cache:
+            cache.put(url, article.text, etag=response.headers.get("ETag"),
+                      last_modified=response.headers.get("Last-Modified"))
+
         logging.info("✅ Successfully extracted article.")
         return article.text[:max_length]  # Limit content length dynamically
 
     except Exception as e:
         logging.error(f"❌ Error extracting article from {url}: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+def extract_articles(urls, max_length=MAX_LENGTH, max_workers=SCRAPER_MAX_WORKERS,
+                     url_timeout=SCRAPER_URL_TIMEOUT, total_timeout=SCRAPER_TOTAL_TIMEOUT, use_cache=True):
+    """
+    Extract many articles concurrently, yielding each result as soon as it completes.
+
+    URLs that miss their own deadline, or have not finished when the overall deadline
+    passes, are yielded with ``None`` so callers always get one result per URL. A URL
+    that times out is abandoned and stops counting towards ``max_workers``, so one
+    hanging site cannot starve the rest of the batch. Its thread keeps running until the
+    download gives up, though, so every thread still alive counts towards the process-wide
+    ``SCRAPER_MAX_THREADS`` limit; when abandoned threads hold all of it, new downloads wait.
+
+    Args:
+        urls (list): Article URLs to extract (duplicates are fetched once).
+        max_length (int): The maximum length of the text to extract per article.
+        max_workers (int): Maximum number of downloads in flight at once.
+        url_timeout (float): Seconds allowed for a single URL once it has started.
+        total_timeout (float): Seconds allowed for the whole batch.
+        use_cache (bool): Whether to read from and write to the content cache.
+
+    Yields:
+        tuple: (url, text) where text is the extracted article text or None.
+    """
+    queued = deque(dict.fromkeys(url.strip() for url in urls if url and url.strip()))
+    if not queued:
+        return
+
+    logging.info(f"📄 Extracting {len(queued)} articles with up to {max_workers} workers...")
+    deadline = time.monotonic() + total_timeout
+    results = queue.Queue()
+    active = {}  # url -> monotonic start time of the download in flight
+
+    def _worker(url):
+        try:
+            text = extract_full_article(url, max_length=max_length, timeout=url_timeout, use_cache=use_cache)
+        except Exception as e:
+            logging.error(f"❌ Error extracting article from {url}: {str(e)}")
+            text = None
+        finally:
+            _thread_slots.release()
+        results.put((url, text))
+
+    def _launch(wait=0.0):
+        while queued and len(active) < max(1, max_workers):
+            if not _thread_slots.acquire(timeout=wait):
+                return
+            wait = 0.0  # Only the first slot is worth waiting for
+            url = queued.popleft()
+            active[url] = time.monotonic()
+            # Workers run in a copy of the caller's context, so their spans join its request trace
+            threading.Thread(target=contextvars.copy_context().run, args=(_worker, url), name="scraper",
+                             daemon=True).start()
+
+    _launch()
+    while active or queued:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        if not active:
+            # Threads abandoned by this or other batches hold every slot; wait for one to exit
+            _launch(wait=deadline - now)
+            continue
+
+        # Wake up for whichever comes first: a completion, a URL deadline or the batch deadline
+        next_expiry = min(min(active.values()) + url_timeout, deadline)
+        try:
+            url, text = results.get(timeout=max(0.0, next_expiry - now))
+            if url in active:  # Late results from abandoned URLs are dropped
+                del active[url]
+                yield url, text
+        except queue.Empty:
+            pass
+
+        now = time.monotonic()
+        for url in [u for u, started in active.items() if now - started >= url_timeout]:
+            del active[url]
+            logging.warning(f"⚠️ Article extraction timed out after {url_timeout}s: {url}")
+            yield url, None
+        _launch()
+
+    for url in list(active) + list(queued):
+        logging.warning(f"⚠️ Batch deadline of {total_timeout}s reached before extracting: {url}")
+        yield url, None
@@ -1,61 +1,167 @@
-from langchain_groq import ChatGroq
 import streamlit as st
-from langchain_huggingface import HuggingFaceEmbeddings
-from scripts.config import GROQ_API_KEY, EMBEDDING_MODEL
+from scripts.config import EMBEDDING_SERVICE_ENABLED
+from scripts.context import count_tokens, pack_context
+from scripts.embedding_service import get_embedding_service, load_embedding_model
+from scripts.llm_pool import get_llm_pool
+from scripts.metrics import get_metrics, increment, span
+import functools
 import logging
+import textwrap
+import time
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def query_llm(query, retrieved_chunks, model_name):
+# Built once at import: dedented so the indentation does not cost prompt tokens
+PROMPT_TEMPLATE = textwrap.dedent("""
+    🎯 You are an **AI expert** providing **concise, well-structured, and engaging** responses.
+
+    🔍 **User Query:** {query}
+
+    🔎 **Extracted Information from Trusted Sources:**
+    {context_text}
+
+    ✨ **Response Guidelines:**
+    - Use **structured bullet points** ✅
+    - Highlight **key facts** with **emojis** 🎯
+    - Keep it **concise yet highly informative** 📌
+    - **No unnecessary filler text**—focus on **value-driven insights** 🚀
+    - Maintain a **professional yet engaging** tone 🎤
+    - End with a **brief but powerful conclusion** ✍️
+
+    Now, generate the structured response using **emojis** to enhance clarity and engagement.
+    """).strip()
+
+@functools.lru_cache(maxsize=None)
+def template_tokens(model_name=None):
+    """Tokens of the prompt template itself for a model, counted once."""
+    return count_tokens(PROMPT_TEMPLATE.format(query="", context_text=""), model_name)
+
+def build_prompt(query, retrieved_chunks, model_name=None, metrics=None):
+    """
+    Builds the LLM prompt from the user query and retrieved chunks, packing the chunks
+    into ``CONTEXT_TOKEN_BUDGET`` tokens (see ``scripts.context.pack_context``).
+
+    Args:
+        query (str): User query.
+        retrieved_chunks (list): Retrieved chunk texts, best first, or (Document, score) pairs.
+        model_name (str): LLM model whose tokenizer counts the budget.
+        metrics (dict): Optional dict that receives ``prompt_tokens``, ``context_tokens``,
+            ``context_chunks`` and the ``duplicate_chunks`` / ``over_budget_chunks`` left out.
+
+    Returns:
+        str: The prompt text.
+    """
+    with span("context") as attributes:
+        context = pack_context(retrieved_chunks, model_name)
+        prompt_tokens = template_tokens(model_name) + count_tokens(query, model_name) + context["tokens"]
+        attributes.update(prompt_tokens=prompt_tokens, chunks=len(context["chunks"]))
+    increment("prompt_tokens_total", prompt_tokens)
+    if metrics is not None:
+        metrics.update({
+            "prompt_tokens": prompt_tokens,
+            "context_tokens": context["tokens"],
+            "context_chunks": len(context["chunks"]),
+            "duplicate_chunks": context["duplicates"],
+            "over_budget_chunks": context["over_budget"],
+        })
+    return PROMPT_TEMPLATE.format(query=query, context_text="\n\n".join(context["chunks"]))
+
+def query_llm(query, retrieved_chunks, model_name, metrics=None):
     """
     Generates a structured response using LLM.
 
     Args:
         query (str): User query.
-        retrieved_chunks (list): Retrieved document chunks.
+        retrieved_chunks (list): Retrieved chunk texts, best first, or (Document, score) pairs.
         model_name (str): Selected LLM model.
+        metrics (dict): Optional dict that receives the prompt token counts from ``build_prompt``.
 
     Returns:
         str: AI-generated structured response.
     """
     try:
         logging.info(f"🤖 Querying LLM: {model_name}")
-        llm = ChatGroq(
-            temperature=0,
-            groq_api_key=GROQ_API_KEY,
-            model_name=model_name
-        )
+        metrics = metrics if metrics is not None else {}
+        prompt = build_prompt(query, retrieved_chunks, model_name, metrics)
 
-        context_text = "\n".join(retrieved_chunks)
+        with span("llm", model=model_name, prompt_tokens=metrics["prompt_tokens"]):
+            response = get_llm_pool().invoke(model_name, prompt)
+        logging.info(f"✅ LLM Response Generated Successfully ({metrics['prompt_tokens']} prompt tokens).")
+        return response
 
-        prompt = f"""
-        🎯 You are an **AI expert** providing **concise, well-structured, and engaging** responses.
+    except Exception as e:
+        logging.error(f"❌ LLM Query Error: {str(e)}")
+        return "❌ Error generating LLM response."
 
-        🔍 **User Query:** {query}
+def stream_llm(query, retrieved_chunks, model_name, metrics=None, llm=None):
+    """
+    Streams a structured response from the LLM token by token.
 
-        🔎 **Extracted Information from Trusted Sources:** 
-        {context_text}
+    Args:
+        query (str): User query.
+        retrieved_chunks (list): Retrieved chunk texts, best first, or (Document, score) pairs.
+        model_name (str): Selected LLM model.
+        metrics (dict): Optional dict that receives the prompt token counts from ``build_prompt``,
+            ``time_to_first_token`` and ``total_time`` (seconds) once the stream finishes, and
+            ``error`` if it failed.
+        llm: Optional chat model to use instead of the pooled Groq client (e.g. a local fake).
 
-        ✨ **Response Guidelines:**  
-        - Use **structured bullet points** ✅  
-        - Highlight **key facts** with **emojis** 🎯  
-        - Keep it **concise yet highly informative** 📌  
-        - **No unnecessary filler text**—focus on **value-driven insights** 🚀  
-        - Maintain a **professional yet engaging** tone 🎤  
-        - End with a **brief but powerful conclusion** ✍️  
+    Yields:
+        str: Response text fragments as they arrive.
+    """
+    metrics = metrics if metrics is not None else {}
+    start = time.perf_counter()
+    metrics["time_to_first_token"] = None
+    with span("llm", model=model_name) as attributes:
+        try:
+            prompt = build_prompt(query, retrieved_chunks, model_name, metrics)
+            attributes["prompt_tokens"] = metrics["prompt_tokens"]
+            logging.info(f"🤖 Streaming LLM: {model_name} ({metrics['prompt_tokens']} prompt tokens, "
+                         f"{metrics['context_chunks']} chunks, {metrics['duplicate_chunks']} near-duplicates and "
+                         f"{metrics['over_budget_chunks']} over budget left out)")
+            for chunk in llm.stream(prompt) if llm else get_llm_pool().stream(model_name, prompt):
+                if not chunk.content:
+                    continue
+                if metrics["time_to_first_token"] is None:
+                    metrics["time_to_first_token"] = time.perf_counter() - start
+                    attributes["first_token"] = metrics["time_to_first_token"]
+                    get_metrics().observe("stage_duration_seconds", metrics["time_to_first_token"], stage="llm_first_token")
+                yield chunk.content
+
+            metrics["total_time"] = time.perf_counter() - start
+            logging.info(f"✅ LLM Response Streamed Successfully (first token {metrics['time_to_first_token'] or 0:.2f}s, "
+                         f"total {metrics['total_time']:.2f}s).")
+
+        except Exception as e:
+            metrics["total_time"] = time.perf_counter() - start
+            metrics["error"] = str(e)
+            attributes["error"] = True
+            logging.error(f"❌ LLM Stream Error: {str(e)}")
+            yield "❌ Error generating LLM response."
+
+def render_stream(token_stream, placeholder, render=lambda text: text, interval=0.05):
+    """
+    Renders a token stream into a Streamlit placeholder as it arrives.
 
-        Now, generate the structured response using **emojis** to enhance clarity and engagement.  
-        """
+    Args:
+        token_stream (iterable): Text fragments, e.g. from ``stream_llm``.
+        placeholder: ``st.empty()`` placeholder to draw into.
+        render (callable): Turns the text received so far into the markdown/HTML to show.
+        interval (float): Minimum seconds between redraws, so long answers do not redraw per token.
 
-        response = llm.invoke(prompt)
-        logging.info("✅ LLM Response Generated Successfully.")
-        return response
+    Returns:
+        str: The complete response text.
+    """
+    text, last_draw = "", 0.0
+    for token in token_stream:
+        text += token
+        if time.perf_counter() - last_draw >= interval:
+            placeholder.markdown(render(text), unsafe_allow_html=True)
+            last_draw = time.perf_counter()
+    placeholder.markdown(render(text), unsafe_allow_html=True)
+    return text
 
-    except Exception as e:
-        logging.error(f"❌ LLM Query Error: {str(e)}")
-        return "❌ Error generating LLM response."
-    
 # ✅ Decorator to enable chat history
 def enable_chat_history(func):
     """
@@ -116,16 +222,18 @@ def print_qa(cls, question, answer):
 @st.cache_resource
 def configure_vector_embeddings():
     """
-    Configures and caches the vector embeddings for Groq API.
+    Configures and caches the vector embeddings.
+
+    With ``EMBEDDING_SERVICE_ENABLED``, all sessions share the microbatching embedding service,
+    which runs the model in worker processes; otherwise the model is loaded in this process.
+    Either way the model runs on the ``EMBEDDING_BACKEND`` backend.
 
     Returns:
-        vector_embeddings (HuggingFaceEmbeddings): The loaded vector embeddings.
+        vector_embeddings: ``EmbeddingService`` or ``HuggingFaceEmbeddings``.
     """
-    return HuggingFaceEmbeddings(
-                model_name=EMBEDDING_MODEL,
-                model_kwargs={"device": "cpu"},
-                encode_kwargs={"normalize_embeddings": True}
-            )  # Load and return the vector embeddings
+    if EMBEDDING_SERVICE_ENABLED:
+        return get_embedding_service()
+    return load_embedding_model()  # Load and return the vector embeddings
 
 def sync_st_session():
     """
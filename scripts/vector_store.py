@@ -2,59 +2,1020 @@ import faiss
 import numpy as np
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
-from scripts.config import CHUNK_SIZE, CHUNK_OVERLAP
+from scipy import sparse
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, HashingVectorizer
+from scripts.cache import SQLiteStore
+from scripts.config import (CHUNK_SIZE, CHUNK_OVERLAP, CACHE_DIR, EMBEDDING_MODEL, VECTOR_INDEX_TYPE,
+                            SEARCH_NPROBE, SEARCH_EF, COMPACT_THRESHOLD, SEARCH_MODE, HYBRID_FUSION,
+                            HYBRID_ALPHA, HYBRID_CANDIDATES, RRF_K, BM25_K1, BM25_B)
+from scripts.metrics import increment, timed
 from scripts.utils import configure_vector_embeddings
+import contextlib
+import functools
+import hashlib
+import json
 import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+def chunk_hash(text):
+    """
+    Hash a chunk after normalizing whitespace, so trivially different copies share a key.
+
+    Args:
+        text (str): Chunk text.
+
+    Returns:
+        str: Hex digest of the normalized text.
+    """
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+class EmbeddingCache(SQLiteStore):
+    """
+    Persistent embedding cache for one embedding model.
+
+    Vectors are stored as float32 rows in a memory-mapped array file; a SQLite index maps
+    each chunk hash to its row. Appends happen inside a write transaction, so several
+    processes can share the cache safely.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, row INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    """
+
+    def __init__(self, directory, model_name):
+        """
+        Initialize the cache.
+
+        Args:
+            directory (str): Directory holding ``index.sqlite`` and ``vectors.f32``.
+            model_name (str): Embedding model the vectors belong to.
+        """
+        self.model_name = model_name
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.hits = 0
+        self.misses = 0
+        self._mmap = None
+        self._mmap_lock = threading.Lock()
+        super().__init__(os.path.join(directory, "index.sqlite"))
+
+    def _meta(self, conn, key):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _rows(self, conn, hashes):
+        rows = {}
+        for start in range(0, len(hashes), 500):  # Stay below SQLite's bound-parameter limit
+            batch = hashes[start:start + 500]
+            query = f"SELECT hash, row FROM vectors WHERE hash IN ({','.join('?' * len(batch))})"
+            rows.update(conn.execute(query, batch).fetchall())
+        return rows
+
+    def _vectors(self, rows_needed, dimension):
+        # Re-map the array file when other writers have appended past our current view
+        with self._mmap_lock:
+            if self._mmap is None or self._mmap.shape[0] < rows_needed:
+                rows = os.path.getsize(self.vectors_path) // (dimension * 4)
+                self._mmap = np.memmap(self.vectors_path, dtype="float32", mode="r", shape=(rows, dimension))
+            return self._mmap
+
+    def lookup(self, hashes):
+        """
+        Fetch cached vectors.
+
+        Args:
+            hashes (list): Chunk hashes from ``chunk_hash``.
+
+        Returns:
+            dict: hash -> float32 vector for every hash found in the cache.
+        """
+        rows = self._rows(self.conn, list(dict.fromkeys(hashes)))
+        if not rows:
+            return {}
+
+        dimension = self._meta(self.conn, "dimension")
+        vectors = self._vectors(max(rows.values()) + 1, dimension)
+        return {h: np.array(vectors[row]) for h, row in rows.items()}
+
+    def store(self, hashes, vectors):
+        """
+        Append vectors for new chunk hashes.
+
+        Args:
+            hashes (list): Chunk hashes, one per vector.
+            vectors (np.ndarray): float32 array of shape (len(hashes), dimension).
+        """
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        with self.transaction() as conn:
+            dimension = self._meta(conn, "dimension")
+            if dimension is None:
+                dimension = vectors.shape[1]
+                conn.execute("INSERT INTO meta (key, value) VALUES ('dimension', ?)", (dimension,))
+            elif dimension != vectors.shape[1]:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match cache dimension {dimension}")
+
+            # Another process may have cached some of these since our lookup
+            existing = self._rows(conn, list(dict.fromkeys(hashes)))
+            new = [(h, v) for h, v in zip(hashes, vectors) if h not in existing]
+            if not new:
+                return
+
+            next_row = self._meta(conn, "rows") or 0
+            with open(self.vectors_path, "r+b" if os.path.exists(self.vectors_path) else "wb") as f:
+                f.seek(next_row * dimension * 4)
+                f.write(np.stack([v for _, v in new]).tobytes())
+            conn.executemany("INSERT INTO vectors (hash, row) VALUES (?, ?)",
+                             [(h, next_row + i) for i, (h, _) in enumerate(new)])
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rows', ?)", (next_row + len(new),))
+
+    def embed_documents(self, embeddings, texts):
+        """
+        Embed texts, sending only chunks missing from the cache to the model.
+
+        Args:
+            embeddings: LangChain embeddings object (e.g. from ``configure_vector_embeddings``).
+            texts (list): Chunk texts.
+
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dimension).
+        """
+        hashes = [chunk_hash(text) for text in texts]
+        cached = self.lookup(hashes)
+
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in cached:
+                missing.setdefault(h, text)
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        increment("cache_events_total", len(texts) - len(missing), cache="embedding", event="hits")
+        increment("cache_events_total", len(missing), cache="embedding", event="misses")
+        increment("embedded_texts_total", len(missing))
+
+        if missing:
+            new_vectors = np.array(embeddings.embed_documents(list(missing.values())), dtype="float32")
+            self.store(list(missing), new_vectors)
+            cached.update(zip(missing, new_vectors))
+
+        logging.info(f"🧮 Embedded {len(missing)} new chunks, {len(texts) - len(missing)} served from cache")
+        return np.stack([cached[h] for h in hashes]).astype("float32")
+
+    def stats(self):
+        """
+        Return cache statistics for this process.
+
+        Returns:
+            dict: hits, misses, hit rate, cached vector count and bytes used on disk.
+        """
+        lookups = self.hits + self.misses
+        size = sum(os.path.getsize(p) for p in (self.vectors_path, self.path) if os.path.exists(p))
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "vectors": self._meta(self.conn, "rows") or 0,
+            "bytes": size,
+        }
+
+@functools.lru_cache(maxsize=None)
+def get_embedding_cache(model_name=EMBEDDING_MODEL):
+    """
+    Return the process-wide embedding cache for a model.
+
+    Args:
+        model_name (str): Embedding model name.
+
+    Returns:
+        EmbeddingCache: Cache stored under ``CACHE_DIR/embeddings``.
+    """
+    directory = os.path.join(CACHE_DIR, "embeddings", re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name))
+    return EmbeddingCache(directory, model_name)
+
+# Words, plus whole compounds joined by ".", "-", "/" or ":" (E-1234, v2.3.1, std::vector)
+WORD_PATTERN = re.compile(r"\w+")
+COMPOUND_PATTERN = re.compile(r"\b\w++(?:[.\-/:]+\w++)+")
+
+def bm25_tokenize(text):
+    """
+    Lowercase and tokenize text for the BM25 index.
+
+    Compound tokens such as error codes, versions and paths are kept whole so exact matches
+    score highly, alongside their parts. English stop words are dropped.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        list: Tokens.
+    """
+    text = text.lower()
+    tokens = [word for word in WORD_PATTERN.findall(text) if word not in ENGLISH_STOP_WORDS]
+    tokens.extend(COMPOUND_PATTERN.findall(text))
+    return tokens
+
+class BM25Index:
+    """
+    Sparse inverted index scored with Okapi BM25, kept alongside the FAISS index.
+
+    Texts are vectorized in batches into hashed term-frequency blocks. Document frequencies,
+    document lengths and the document count are updated incrementally on every add and
+    delete, and a query scores only the postings of its own terms with the current
+    statistics, so adding a batch costs time proportional to the batch, not to the index.
+    Deleted rows are masked out; blocks are merged log-structured, so there are only
+    O(log n) of them.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B, n_features=2 ** 20):
+        """
+        Args:
+            k1 (float): Term frequency saturation.
+            b (float): Document length normalization.
+            n_features (int): Hash space size for terms.
+        """
+        self.k1 = k1
+        self.b = b
+        self.vectorizer = HashingVectorizer(analyzer=bm25_tokenize, n_features=n_features, alternate_sign=False,
+                                            norm=None, dtype=np.float32)
+        self._blocks = []  # _BM25Block objects, oldest (and largest) first
+        self._document_frequency = np.zeros(n_features, dtype=np.int32)
+        self._total_length = 0.0
+        self._num_docs = 0
+        self._max_id = -1
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_documents(cls, documents):
+        """
+        Build an index from a mapping of ID -> Document.
+
+        Args:
+            documents (dict): Documents keyed by chunk ID.
+
+        Returns:
+            BM25Index: The new index.
+        """
+        index = cls()
+        index.add(list(documents), [doc.page_content for doc in documents.values()])
+        return index
+
+    def __len__(self):
+        with self._lock:
+            return self._num_docs
+
+    def add(self, ids, texts):
+        """
+        Tokenize and add texts.
+
+        Args:
+            ids (list): Chunk IDs.
+            texts (list): Chunk texts, aligned with ``ids``.
+        """
+        if not ids:
+            return
+        term_frequencies = self.vectorizer.transform(texts)
+        ids = np.asarray(ids, dtype="int64")
+        with self._lock:
+            if ids.min() <= self._max_id:
+                self._delete(ids)  # Re-added IDs replace their old rows
+            self._append(ids, term_frequencies)
+
+    def delete(self, ids):
+        """
+        Remove chunks by ID.
+
+        Args:
+            ids (list): Chunk IDs.
+        """
+        if len(ids):
+            with self._lock:
+                self._delete(np.asarray(list(ids), dtype="int64"))
+
+    def _append(self, ids, term_frequencies):
+        # Caller holds the lock
+        block = _BM25Block(ids, term_frequencies)
+        # Each row holds a term at most once, so its column indices count the documents per term
+        self._document_frequency += np.bincount(term_frequencies.indices,
+                                                minlength=len(self._document_frequency)).astype(np.int32)
+        self._total_length += float(block.lengths.sum())
+        self._num_docs += len(ids)
+        self._max_id = max(self._max_id, int(ids.max()))
+        self._blocks.append(block)
+        while len(self._blocks) > 1 and self._blocks[-2].live_count <= 2 * self._blocks[-1].live_count:
+            newer = self._blocks.pop()
+            self._blocks[-1] = self._blocks[-1].merge(newer)
+
+    def _delete(self, ids):
+        # Caller holds the lock
+        for i, block in enumerate(self._blocks):
+            rows = np.flatnonzero(np.isin(block.ids, ids) & block.live)
+            if not len(rows):
+                continue
+            removed = block.term_frequencies[rows]
+            self._document_frequency -= np.bincount(removed.indices,
+                                                    minlength=len(self._document_frequency)).astype(np.int32)
+            self._total_length -= float(block.lengths[rows].sum())
+            self._num_docs -= len(rows)
+            self._blocks[i] = block.without(rows)
+        self._blocks = [block for block in self._blocks if block.live_count]
+
+    def _merged(self):
+        if not self._blocks:
+            return np.empty(0, dtype="int64"), sparse.csr_matrix((0, self.vectorizer.n_features), dtype=np.float32)
+        merged = functools.reduce(_BM25Block.merge, self._blocks)
+        return merged.ids, merged.term_frequencies
+
+    def search(self, queries, k=4):
+        """
+        Score queries with BM25.
+
+        Args:
+            queries (list): Query texts.
+            k (int): Number of results per query.
+
+        Returns:
+            list: One list of (chunk ID, score) pairs per query, best first. Chunks sharing
+                no terms with the query are never returned.
+        """
+        query_terms = self.vectorizer.transform(list(queries))
+        with self._lock:
+            blocks = list(self._blocks)
+            for block in blocks:
+                block.prepare()
+            num_docs, document_frequency = self._num_docs, self._document_frequency.copy()
+            average_length = max(self._total_length / num_docs if num_docs else 0.0, 1e-9)
+
+        results = []
+        for i in range(len(queries)):
+            terms = query_terms.indices[query_terms.indptr[i]:query_terms.indptr[i + 1]]
+            frequency = document_frequency[terms]
+            idf = np.log1p((num_docs - frequency + 0.5) / (frequency + 0.5)).astype(np.float32)
+            doc_ids, weights = [], []
+            for block in blocks:
+                # Gather the postings of the query terms, skipping deleted rows
+                starts, ends = block.by_term.indptr[terms], block.by_term.indptr[terms + 1]
+                counts = ends - starts
+                if not counts.any():
+                    continue
+                postings = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+                rows, tf = block.by_term.indices[postings], block.by_term.data[postings]
+                live = block.live[rows]
+                rows, tf, term_idf = rows[live], tf[live], np.repeat(idf, counts)[live]
+                norm = self.k1 * (1 - self.b + self.b * block.lengths[rows] / average_length)
+                doc_ids.append(block.ids[rows])
+                weights.append(term_idf * tf * (self.k1 + 1) / (tf + norm))
+            if not doc_ids or not sum(len(ids) for ids in doc_ids):
+                results.append([])
+                continue
+            # Sum the weights per document
+            unique_ids, inverse = np.unique(np.concatenate(doc_ids), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate(weights))
+            top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+            results.append([(int(unique_ids[j]), float(scores[j])) for j in top])
+        return results
+
+    def save(self, path):
+        """
+        Write the term-frequency matrix and IDs to an ``.npz`` file.
+
+        Args:
+            path (str): Target file.
+        """
+        with self._lock:
+            ids, term_frequencies = self._merged()
+        with open(path, "wb") as f:
+            np.savez(f, ids=ids, data=term_frequencies.data, indices=term_frequencies.indices,
+                     indptr=term_frequencies.indptr, shape=term_frequencies.shape,
+                     params=np.array([self.k1, self.b]))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index written by ``save``.
+
+        Args:
+            path (str): File written by ``save``.
+
+        Returns:
+            BM25Index: The loaded index, or None if it is missing or unreadable.
+        """
+        try:
+            with np.load(path) as data:
+                k1, b = data["params"]
+                index = cls(k1=float(k1), b=float(b), n_features=int(data["shape"][1]))
+                term_frequencies = sparse.csr_matrix((data["data"], data["indices"], data["indptr"]),
+                                                     shape=tuple(data["shape"]))
+                if len(data["ids"]):
+                    index._append(np.asarray(data["ids"], dtype="int64"), term_frequencies)
+            return index
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.error(f"❌ Error loading BM25 index from {path}: {str(e)}")
+            return None
+
+class _BM25Block:
+    """One batch of BM25 rows: IDs, term frequencies (CSR), lengths and a live-row mask."""
+
+    def __init__(self, ids, term_frequencies, live=None):
+        self.ids = ids
+        self.term_frequencies = term_frequencies
+        self.lengths = np.asarray(term_frequencies.sum(axis=1), dtype=np.float32).ravel()
+        self.live = live if live is not None else np.ones(len(ids), dtype=bool)
+        self.live_count = int(self.live.sum())
+        self.by_term = None  # Term-major (CSC) copy for searching, built on first use
+
+    def prepare(self):
+        if self.by_term is None:
+            self.by_term = self.term_frequencies.tocsc()
+
+    def without(self, rows):
+        # Copy-on-write, so a search holding the old block is not affected
+        live = self.live.copy()
+        live[rows] = False
+        block = _BM25Block.__new__(_BM25Block)
+        block.__dict__.update(self.__dict__, live=live, live_count=int(live.sum()))
+        return block
+
+    def merge(self, other):
+        # Live rows of both blocks in one block
+        ids = np.concatenate([self.ids[self.live], other.ids[other.live]])
+        term_frequencies = sparse.vstack([self.term_frequencies[self.live], other.term_frequencies[other.live]],
+                                         format="csr")
+        return _BM25Block(ids, term_frequencies)
+
+def fuse_rankings(rankings, k=4, method=HYBRID_FUSION, alpha=HYBRID_ALPHA):
+    """
+    Fuse a dense and a sparse ranking of the same chunks.
+
+    Args:
+        rankings (tuple): (dense, sparse) lists of (chunk ID, score) pairs, best first.
+        k (int): Number of results to return.
+        method (str): ``rrf`` sums ``weight / (RRF_K + rank)``; ``weighted`` sums min-max normalized scores.
+        alpha (float): Weight of the dense ranking; the sparse ranking gets ``1 - alpha``.
+
+    Returns:
+        list: (chunk ID, fused score) pairs, best first.
+    """
+    fused = {}
+    for ranking, weight in zip(rankings, (alpha, 1 - alpha)):
+        if not ranking:
+            continue
+        if method == "weighted":
+            scores = [score for _, score in ranking]
+            low, span = min(scores), max(scores) - min(scores)
+            contributions = [(doc_id, weight * ((score - low) / span if span else 1.0)) for doc_id, score in ranking]
+        else:
+            contributions = [(doc_id, weight / (RRF_K + rank)) for rank, (doc_id, _) in enumerate(ranking, 1)]
+        for doc_id, contribution in contributions:
+            fused[doc_id] = fused.get(doc_id, 0.0) + contribution
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+
+STORE_FORMAT_VERSION = 2
+# Files of a saved store, in the order they are moved into place
+STORE_FILES = ("index.faiss", "documents.jsonl", "bm25.npz", "manifest.json")
+
 class VectorStore:
-    def __init__(self, index, documents):
+    def __init__(self, index, documents, embedding_model=EMBEDDING_MODEL, index_type=None, sparse_index=None):
         """
         Initialize the VectorStore with a FAISS index and documents.
         
         Args:
-            index (faiss.Index): The FAISS index containing embeddings.
-            documents (list): List of Document objects.
+            index (faiss.Index): The FAISS index containing embeddings. Its labels are the document IDs.
+            documents (list | dict): Document objects, either a list whose positions are the IDs
+                or a dict mapping ID -> Document.
+            embedding_model (str): Name of the model that produced the embeddings.
+            index_type (str): Index type used when the index is rebuilt during compaction.
+            sparse_index (BM25Index): BM25 index over the same IDs; built from the documents if omitted.
         """
         self.index = index
-        self.documents = documents
+        self.documents = documents if isinstance(documents, dict) else dict(enumerate(documents))
+        self.sparse_index = sparse_index or BM25Index.from_documents(self.documents)
+        self.embedding_model = embedding_model
+        self.index_type = index_type
+        self.tombstones = index.ntotal - len(self.documents)  # Deleted vectors still in the index
+        self._next_id = max(self.documents, default=-1) + 1
+        self._lock = threading.RLock()
+        self._compaction = None
+        self._read_only = False  # Set for memory-mapped indexes
+
+    def add_texts(self, texts, metadatas=None):
+        """
+        Split, embed and add texts to the existing index without rebuilding it.
+
+        Args:
+            texts (list): Texts to add.
+            metadatas (list): Optional metadata dict per text (e.g. its source), copied onto every chunk.
+
+        Returns:
+            list: IDs of the new chunks.
+        """
+        return self.add_documents(split_texts(texts, metadatas))
+
+    def add_documents(self, documents):
+        """
+        Embed and add already-split chunks.
+
+        Args:
+            documents (list): Document objects.
+
+        Returns:
+            list: IDs of the new chunks.
+        """
+        if not documents:
+            return []
+        vectors = embed_documents(documents)
+        with self._lock:
+            self._ensure_writable()
+            ids = list(range(self._next_id, self._next_id + len(documents)))
+            self._add_vectors(vectors, ids)
+            self.documents.update(zip(ids, documents))
+            self.sparse_index.add(ids, [doc.page_content for doc in documents])
+            self._next_id += len(documents)
+        logging.info(f"➕ Added {len(documents)} chunks to the vector store")
+        return ids
+
+    def delete(self, doc_ids):
+        """
+        Delete chunks by ID.
+
+        Deleted vectors are tombstoned and filtered out of searches; the index is compacted
+        in the background once tombstones exceed ``COMPACT_THRESHOLD`` of its vectors.
+
+        Args:
+            doc_ids (list): Chunk IDs returned by ``add_texts``/``add_documents`` or ``source_ids``.
+
+        Returns:
+            int: Number of chunks deleted.
+        """
+        with self._lock:
+            deleted = sum(self.documents.pop(doc_id, None) is not None for doc_id in doc_ids)
+            self.sparse_index.delete(doc_ids)
+            self.tombstones += deleted
+            if deleted and self.tombstones > COMPACT_THRESHOLD * max(self.index.ntotal, 1):
+                self.compact(background=True)
+        logging.info(f"🗑️ Deleted {deleted} chunks from the vector store ({self.tombstones} tombstones)")
+        return deleted
+
+    def source_ids(self, source):
+        """
+        Return the IDs of every chunk from a source.
+
+        Args:
+            source (str): Value of the chunks' ``source`` metadata (e.g. a URL or file name).
+
+        Returns:
+            list: Matching chunk IDs.
+        """
+        with self._lock:
+            return [doc_id for doc_id, doc in self.documents.items() if doc.metadata.get("source") == source]
+
+    @property
+    def sources(self):
+        """list: Distinct ``source`` metadata values, in insertion order."""
+        with self._lock:
+            return list(dict.fromkeys(doc.metadata.get("source") for doc in self.documents.values()
+                                      if doc.metadata.get("source") is not None))
+
+    def compact(self, background=False):
+        """
+        Rebuild the index without tombstoned vectors.
+
+        Live vectors come from the embedding cache, so compaction does not re-run the model
+        for chunks embedded before. Chunks added while compacting are carried over.
+
+        Args:
+            background (bool): Run in a daemon thread instead of blocking.
+        """
+        if background:
+            if self._compaction is None or not self._compaction.is_alive():
+                self._compaction = threading.Thread(target=self.compact, name="vector-compaction", daemon=True)
+                self._compaction.start()
+            return
+
+        try:
+            with self._lock:
+                snapshot = dict(self.documents)
+                purged = self.tombstones
+            if not snapshot:
+                return
+
+            ids = list(snapshot)
+            index = build_index(embed_documents(list(snapshot.values())), self.index_type, ids=ids)
+
+            with self._lock:
+                added = [doc_id for doc_id in self.documents if doc_id not in snapshot]
+                if added:
+                    vectors = embed_documents([self.documents[doc_id] for doc_id in added])
+                    index.add_with_ids(vectors, np.array(added, dtype="int64"))
+                self.index = index
+                self._read_only = False  # The rebuilt index lives in RAM, not in the mapped file
+                # Chunks deleted while compacting are still in the new index, and are its only tombstones
+                self.tombstones = sum(doc_id not in self.documents for doc_id in ids)
+            logging.info(f"🧹 Compacted vector store: {len(self.documents)} live chunks, {purged} tombstones purged")
+        except Exception as e:
+            logging.error(f"❌ Error compacting vector store: {str(e)}")
+
+    def _ensure_writable(self):
+        # Memory-mapped indexes are read-only; copy into RAM before the first write
+        if self._read_only:
+            self.index = faiss.clone_index(self.index)
+            self._read_only = False
+
+    def _add_vectors(self, vectors, ids):
+        if isinstance(faiss.downcast_index(self.index), (faiss.IndexIDMap, faiss.IndexIDMap2)):
+            self.index.add_with_ids(vectors, np.array(ids, dtype="int64"))
+        elif ids[0] == self.index.ntotal:
+            self.index.add(vectors)  # Positional labels line up with sequentially allocated IDs
+        else:
+            raise ValueError("Index without an ID map cannot take non-sequential IDs")
+
+    def save(self, path):
+        """
+        Save the index, documents, BM25 index and a manifest to a directory.
+
+        Files are written to unique temporary files in the same directory and moved into
+        place, with the manifest last, so readers never see a half-written store and
+        concurrent writers never overwrite each other's temporary files.
+
+        Args:
+            path (str): Target directory (created if missing).
+        """
+        os.makedirs(path, exist_ok=True)
+        temporary = {}
+        try:
+            for name in STORE_FILES:
+                fd, temporary[name] = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=path)
+                os.close(fd)
+
+            with self._lock:
+                manifest = {
+                    "version": STORE_FORMAT_VERSION,
+                    "embedding_model": self.embedding_model,
+                    "dimension": self.index.d,
+                    "num_vectors": self.index.ntotal,
+                    "num_documents": len(self.documents),
+                    "index_class": type(faiss.downcast_index(self.index)).__name__,
+                    "index_type": self.index_type,
+                    "sparse_index": "bm25",
+                    "chunk_size": CHUNK_SIZE,
+                    "chunk_overlap": CHUNK_OVERLAP,
+                    "created_at": time.time(),
+                }
+
+                faiss.write_index(self.index, temporary["index.faiss"])
+                with open(temporary["documents.jsonl"], "w", encoding="utf-8") as f:
+                    for doc_id, doc in self.documents.items():
+                        f.write(json.dumps({"id": doc_id, "text": doc.page_content, "metadata": doc.metadata},
+                                           ensure_ascii=False) + "\n")
+                self.sparse_index.save(temporary["bm25.npz"])
+                with open(temporary["manifest.json"], "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, indent=2)
+
+            for name in STORE_FILES:
+                os.replace(temporary.pop(name), os.path.join(path, name))
+        finally:
+            for leftover in temporary.values():
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(leftover)
+        logging.info(f"💾 Saved vector store with {len(self.documents)} documents to {path}")
+
+    @classmethod
+    def load(cls, path, mmap=True, embedding_model=None):
+        """
+        Load a store written by ``save``.
+
+        Args:
+            path (str): Directory written by ``save``.
+            mmap (bool): Memory-map the index read-only (``IO_FLAG_MMAP``) so processes share its pages.
+                It is copied into RAM on the first ``add_texts``/compaction.
+            embedding_model (str): Model queries will be embedded with (defaults to ``embedding_model_name()``);
+                stores built with another model are rejected.
+
+        Returns:
+            VectorStore: The loaded store, or None if it is missing, incompatible or corrupt.
+        """
+        try:
+            embedding_model = embedding_model or embedding_model_name()
+            with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+
+            if manifest.get("version") != STORE_FORMAT_VERSION:
+                logging.error(f"❌ Unsupported vector store version {manifest.get('version')} in {path}")
+                return None
+            if manifest.get("embedding_model") != embedding_model:
+                logging.error(f"❌ Vector store in {path} was built with {manifest.get('embedding_model')}, "
+                              f"but the configured embedding model is {embedding_model}")
+                return None
+
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+            index = faiss.read_index(os.path.join(path, "index.faiss"), flags)
+            if index.d != manifest["dimension"] or index.ntotal != manifest["num_vectors"]:
+                logging.error(f"❌ Vector store index in {path} does not match its manifest")
+                return None
+
+            with open(os.path.join(path, "documents.jsonl"), encoding="utf-8") as f:
+                documents = {row["id"]: Document(page_content=row["text"], metadata=row["metadata"])
+                             for row in map(json.loads, f)}
+
+            # Stores saved without a matching BM25 index have it rebuilt from their documents
+            sparse_index = BM25Index.load(os.path.join(path, "bm25.npz"))
+            if sparse_index is not None and len(sparse_index) != len(documents):
+                logging.warning(f"⚠️ BM25 index in {path} does not match its documents, rebuilding it")
+                sparse_index = None
+
+            logging.info(f"📂 Loaded vector store with {len(documents)} documents from {path} (mmap={mmap})")
+            store = cls(index, documents, embedding_model=embedding_model, index_type=manifest.get("index_type"),
+                        sparse_index=sparse_index)
+            store._read_only = mmap
+            return store
+
+        except Exception as e:
+            logging.error(f"❌ Error loading vector store from {path}: {str(e)}")
+            return None
+
+    @timed("index_search")
+    def batch_similarity_search(self, queries, k=4, score_threshold=None, nprobe=None, ef_search=None, mode=None,
+                                fusion=None):
+        """
+        Search many queries at once: one embedding forward pass, one FAISS matrix search and
+        one BM25 pass.
+
+        Args:
+            queries (list): Query texts.
+            k (int): Number of top results to return per query.
+            score_threshold (float): Optional minimum cosine similarity a dense result must reach.
+            nprobe (int): IVF lists to visit (IVF indexes only).
+            ef_search (int): HNSW candidate list size (HNSW indexes only).
+            mode (str): ``dense`` (FAISS only), ``sparse`` (BM25 only) or ``hybrid`` (both, fused with
+                ``fuse_rankings``). Defaults to ``SEARCH_MODE``.
+            fusion (str): Hybrid fusion method, ``rrf`` or ``weighted``. Defaults to ``HYBRID_FUSION``.
+
+        Returns:
+            list: One list of (Document, score) pairs per query, best first. Scores are cosine
+                similarities in dense mode, BM25 scores in sparse mode and fused scores in hybrid mode.
+        """
+        try:
+            if not queries:
+                return []
+            mode = mode or SEARCH_MODE
+            documents = self.documents
+            candidates = max(k, HYBRID_CANDIDATES) if mode == "hybrid" else k
+
+            dense = self._dense_search(queries, candidates, score_threshold, nprobe, ef_search) \
+                if mode != "sparse" else None
+            lexical = self.sparse_index.search(queries, candidates) if mode != "dense" else None
+
+            if mode == "hybrid":
+                rankings = [fuse_rankings(pair, k, method=fusion or HYBRID_FUSION) for pair in zip(dense, lexical)]
+            else:
+                rankings = dense if dense is not None else lexical
+
+            # Chunks deleted during the search are skipped
+            results = [[(documents[i], score) for i, score in ranking if i in documents][:k] for ranking in rankings]
+            logging.info(f"✅ Retrieved results for {len(queries)} queries ({mode} search)")
+            return results
+        except Exception as e:
+            logging.error(f"❌ Error in batch similarity search: {str(e)}")
+            return [[] for _ in queries]
+
+    def _dense_search(self, queries, k, score_threshold=None, nprobe=None, ef_search=None):
+        # Embed all queries in a single batch
+        embeddings = configure_vector_embeddings()
+        query_embeddings = np.array(embeddings.embed_documents(list(queries)), dtype="float32")
+
+        # Search the FAISS index, over-fetching to make up for tombstoned vectors
+        index, documents = self.index, self.documents
+        params = search_parameters(index, nprobe, ef_search)
+        fetch = min(k + self.tombstones, index.ntotal)
+        if fetch == 0:
+            return [[] for _ in queries]
+        scores, indices = index.search(query_embeddings, fetch, params=params)
 
-    def similarity_search(self, query, k=4):
+        # FAISS pads missing results with -1; tombstoned IDs are no longer in documents
+        results = []
+        for row_scores, row_ids in zip(scores, indices):
+            hits = [(int(i), float(score)) for score, i in zip(row_scores, row_ids)
+                    if i != -1 and i in documents and (score_threshold is None or score >= score_threshold)]
+            results.append(hits[:k])
+        return results
+
+    def similarity_search_with_score(self, query, k=4, score_threshold=None, nprobe=None, ef_search=None, mode=None):
+        """
+        Perform similarity search and return scores.
+
+        Args:
+            query (str): The query text.
+            k (int): Number of top results to return.
+            score_threshold (float): Optional minimum cosine similarity a dense result must reach.
+            nprobe (int): IVF lists to visit (IVF indexes only).
+            ef_search (int): HNSW candidate list size (HNSW indexes only).
+            mode (str): ``dense``, ``sparse`` or ``hybrid`` (defaults to ``SEARCH_MODE``).
+
+        Returns:
+            list: (Document, score) pairs, best first.
+        """
+        return self.batch_similarity_search([query], k, score_threshold, nprobe, ef_search, mode)[0]
+
+    def similarity_search(self, query, k=4, nprobe=None, ef_search=None, mode=None):
         """
-        Perform similarity search using the FAISS index.
+        Perform similarity search using the FAISS and BM25 indexes.
         
         Args:
             query (str): The query text.
             k (int): Number of top results to return.
+            nprobe (int): IVF lists to visit (IVF indexes only).
+            ef_search (int): HNSW candidate list size (HNSW indexes only).
+            mode (str): ``dense``, ``sparse`` or ``hybrid`` (defaults to ``SEARCH_MODE``).
             
         Returns:
             list: List of Document objects matching the query.
         """
-        try:
-            # Embed the query
-            embeddings = configure_vector_embeddings()
-            query_embedding = embeddings.embed_query(query)
-            query_embedding = np.array([query_embedding]).astype('float32')
-            
-            # Search the FAISS index
-            distances, indices = self.index.search(query_embedding, k)
-            
-            # Retrieve matching documents
-            results = [self.documents[i] for i in indices[0] if i < len(self.documents)]
-            logging.info(f"✅ Retrieved {len(results)} documents for query: {query}")
-            return results
-        except Exception as e:
-            logging.error(f"❌ Error in similarity search: {str(e)}")
-            return []
+        results = [doc for doc, _ in self.similarity_search_with_score(query, k, nprobe=nprobe, ef_search=ef_search,
+                                                                       mode=mode)]
+        logging.info(f"✅ Retrieved {len(results)} documents for query: {query}")
+        return results
+
+def embedding_model_name():
+    """
+    Return the name of the configured embedding model.
 
-def create_vector_db(texts):
+    Returns:
+        str: Model name used to key caches and stamp saved stores.
+    """
+    return getattr(configure_vector_embeddings(), "model_name", EMBEDDING_MODEL)
+
+@timed("embed")
+def embed_documents(documents):
+    """
+    Embed document chunks with the configured model, reusing cached vectors.
+
+    Args:
+        documents (list): List of Document objects.
+
+    Returns:
+        np.ndarray: float32 array of shape (len(documents), dimension).
+    """
+    embeddings = configure_vector_embeddings()
+    cache = get_embedding_cache(embedding_model_name())
+    return cache.embed_documents(embeddings, [doc.page_content for doc in documents])
+
+def choose_index_type(num_vectors):
+    """
+    Pick an index type for a corpus size.
+
+    Exhaustive search is exact and fast enough for small corpora; HNSW keeps recall high
+    for medium ones; IVF-PQ keeps memory bounded for large ones.
+
+    Args:
+        num_vectors (int): Number of vectors to index.
+
+    Returns:
+        str: One of the ``build_index`` index types.
+    """
+    if num_vectors < 10_000:
+        return "flat"
+    if num_vectors < 250_000:
+        return "hnsw"
+    return "ivf_pq"
+
+def index_factory_string(index_type, num_vectors, dimension):
+    """
+    Translate an index type into a FAISS ``index_factory`` description.
+
+    Args:
+        index_type (str): flat, hnsw, ivf_flat, ivf_pq, sq8, hnsw_sq8 or ivf_sq8.
+        num_vectors (int): Number of training/indexed vectors (sizes the IVF lists).
+        dimension (int): Embedding dimension (sizes the PQ code).
+
+    Returns:
+        str: FAISS factory string.
+    """
+    nlist = max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))  # ~39 training points per list
+    pq_m = next(m for m in range(max(1, dimension // 8), 0, -1) if dimension % m == 0)  # ~8 dims per sub-quantizer
+    pq_bits = max(4, min(8, int(math.log2(max(num_vectors, 1) / 39))))  # Codebook small enough to train
+    factories = {
+        "flat": "Flat",
+        "hnsw": "HNSW32",
+        "ivf_flat": f"IVF{nlist},Flat",
+        "ivf_pq": f"IVF{nlist},PQ{pq_m}x{pq_bits}",
+        "sq8": "SQ8",
+        "hnsw_sq8": "HNSW32,SQ8",
+        "ivf_sq8": f"IVF{nlist},SQ8",
+    }
+    if index_type not in factories:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {sorted(factories)} or 'auto'")
+    return factories[index_type]
+
+@timed("index_build")
+def build_index(embedding_array, index_type=None, ids=None):
+    """
+    Build a FAISS inner-product index over precomputed embeddings.
+
+    The embeddings are L2-normalized, so inner product ranks exactly like L2 distance
+    while being cheaper, and scores are cosine similarities.
+
+    Args:
+        embedding_array (np.ndarray): float32 array of shape (n, dimension).
+        index_type (str): Index type (see ``index_factory_string``) or "auto" to choose
+            by corpus size. Defaults to ``VECTOR_INDEX_TYPE``.
+        ids (list): Optional int64 label per row. When given, the index is wrapped in an
+            ``IndexIDMap2`` so rows can be added and tombstoned by stable ID.
+
+    Returns:
+        faiss.Index: Trained index containing every row of ``embedding_array``.
+    """
+    num_vectors, dimension = embedding_array.shape
+    index_type = index_type or VECTOR_INDEX_TYPE
+    if index_type == "auto":
+        index_type = choose_index_type(num_vectors)
+
+    factory = index_factory_string(index_type, num_vectors, dimension)
+    if factory.startswith("IVF") and num_vectors < 256:
+        logging.warning(f"⚠️ Too few vectors ({num_vectors}) to train {factory}, using a flat index")
+        factory = "Flat"
+
+    index = faiss.index_factory(dimension, factory, faiss.METRIC_INNER_PRODUCT)
+    base = _base_index(index)
+    if hasattr(base, "hnsw"):
+        base.hnsw.efConstruction = 80
+    if hasattr(base, "do_polysemous_training"):
+        base.do_polysemous_training = False  # Only useful for Hamming pre-filtering, and very slow to train
+    if not index.is_trained:
+        logging.info(f"🏋️ Training {factory} index on {num_vectors} vectors...")
+        index.train(embedding_array)
+    if ids is not None:
+        index = faiss.IndexIDMap2(index)
+        index.add_with_ids(embedding_array, np.asarray(ids, dtype="int64"))
+    else:
+        index.add(embedding_array)  # Add embeddings to the index
+    logging.info(f"✅ Built {factory} index with {num_vectors} vectors")
+    return index
+
+def _base_index(index):
+    # Concrete index class (unwrapping ID maps), so HNSW/IVF attributes are reachable
+    index = faiss.downcast_index(index)
+    while isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+def search_parameters(index, nprobe=None, ef_search=None):
+    """
+    Build per-query search parameters for approximate indexes.
+
+    Args:
+        index (faiss.Index): The index that will be searched.
+        nprobe (int): IVF lists to visit. Defaults to ``SEARCH_NPROBE``.
+        ef_search (int): HNSW candidate list size. Defaults to ``SEARCH_EF``.
+
+    Returns:
+        faiss.SearchParameters: Parameters for ``index.search``, or None for exhaustive indexes.
+    """
+    base = _base_index(index)
+    if faiss.try_extract_index_ivf(base) is not None:
+        return faiss.SearchParametersIVF(nprobe=nprobe or SEARCH_NPROBE)
+    if hasattr(base, "hnsw"):
+        return faiss.SearchParametersHNSW(efSearch=ef_search or SEARCH_EF)
+    return None
+
+@timed("split")
+def split_texts(texts, metadatas=None):
+    """
+    Split texts into chunks, copying each text's metadata onto its chunks.
+
+    Args:
+        texts (list): Texts to split; non-string or blank entries are skipped.
+        metadatas (list): Optional metadata dict per text.
+
+    Returns:
+        list: Document chunks.
+    """
+    metadatas = metadatas or [{} for _ in texts]
+    valid = [(text, meta) for text, meta in zip(texts, metadatas) if isinstance(text, str) and text.strip()]
+    if not valid:
+        return []
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = text_splitter.create_documents([text for text, _ in valid], metadatas=[meta for _, meta in valid])
+    increment("chunks_total", len(chunks))
+    return chunks
+
+def create_vector_db(texts, metadatas=None, index_type=None):
     """
     Create FAISS vector database from extracted texts using faiss-cpu.
     
     Args:
         texts (list): List of extracted article texts.
+        metadatas (list): Optional metadata dict per text (e.g. its source), copied onto every chunk.
+        index_type (str): FAISS index type for ``build_index`` (defaults to ``VECTOR_INDEX_TYPE``).
 
     Returns:
         VectorStore: Object containing FAISS index and documents, or None if creation fails.
@@ -71,33 +1032,23 @@ def create_vector_db(texts):
         logging.info(f"📚 Creating Vector Database with {len(valid_texts)} valid texts...")
 
         # Split texts into chunks
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-        documents = text_splitter.create_documents(valid_texts)
+        documents = split_texts(texts, metadatas)
         if not documents:
             logging.error("❌ No documents created after text splitting")
             return None
 
-        # Generate embeddings
-        embeddings = configure_vector_embeddings()
-        text_embeddings = embeddings.embed_documents([doc.page_content for doc in documents])
-        if not text_embeddings:
-            logging.error("❌ No embeddings generated")
-            return None
-
-        # Convert embeddings to numpy array
-        embedding_array = np.array(text_embeddings).astype('float32')
+        # Generate embeddings, reusing cached vectors for chunks seen before
+        embedding_array = embed_documents(documents)
         if embedding_array.size == 0:
             logging.error("❌ Embedding array is empty")
             return None
 
-        # Create FAISS index
-        dimension = embedding_array.shape[1]
-        index = faiss.IndexFlatL2(dimension)  # L2 distance index
-        index.add(embedding_array)  # Add embeddings to the index
+        # Create FAISS index with stable chunk IDs, so chunks can be added and deleted later
+        index = build_index(embedding_array, index_type, ids=range(len(documents)))
 
         logging.info("✅ Vector database created successfully.")
-        return VectorStore(index, documents)
+        return VectorStore(index, documents, embedding_model=embedding_model_name(), index_type=index_type)
 
     except Exception as e:
         logging.error(f"❌ Error creating vector DB: {str(e)}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,7 @@
+from langchain.schema import Document
+from scripts.api import chunk_json
+
+def test_chunk_json_passes_missing_scores_through():
+    doc = Document(page_content="text", metadata={"source": "a.pdf", "page": 2, "chunk_hash": "x", "source_key": "y"})
+    assert chunk_json(doc, None) == {"text": "text", "score": None, "metadata": {"source": "a.pdf", "page": 2}}
+    assert chunk_json(doc, 0.25)["score"] == 0.25
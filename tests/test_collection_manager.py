@@ -0,0 +1,68 @@
+import fcntl
+import io
+import json
+import os
+import pytest
+from benchmarks.stubs import StubEmbeddings, use_stub_embeddings
+from scripts.collection_manager import CollectionManager, document_hash
+from scripts.vector_store import STORE_FILES
+
+TEXT = "FAISS indexes dense vectors for similarity search. BM25 ranks documents by the terms they share with a query."
+
+@pytest.fixture
+def manager(tmp_path):
+    use_stub_embeddings(StubEmbeddings(call_cost=0.0, text_cost=0.0))
+    return CollectionManager(str(tmp_path))
+
+def add_text(manager, name, text=TEXT, file_name="notes.txt", owner=None):
+    data = text.encode("utf-8")
+    return manager.add_files(name, [(document_hash(data), file_name, io.BytesIO(data))], owner=owner)
+
+def test_saved_store_leaves_no_temporary_files(manager):
+    add_text(manager, "notes")
+    assert sorted(os.listdir(manager.store_path("notes"))) == sorted(STORE_FILES)
+
+def test_collection_lock_excludes_other_processes(manager):
+    with manager._collection_lock("notes") as lock, open(lock.path, "a") as other:
+        # flock locks belong to the open file, so a second open conflicts just like another process would
+        with pytest.raises(BlockingIOError):
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    with open(lock.path, "a") as other:
+        fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+def test_damaged_store_is_not_rebuilt(manager, tmp_path):
+    add_text(manager, "notes")
+    index_path = os.path.join(manager.store_path("notes"), "index.faiss")
+    with open(index_path, "wb") as f:
+        f.write(b"damaged")
+    with pytest.raises(RuntimeError):
+        CollectionManager(str(tmp_path)).get("notes")
+    with open(index_path, "rb") as f:
+        assert f.read() == b"damaged"
+
+def test_store_from_another_model_is_rebuilt(manager, tmp_path):
+    add_text(manager, "notes")
+    manifest_path = os.path.join(manager.store_path("notes"), "manifest.json")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({**manifest, "embedding_model": "another-model"}, f)
+
+    vector_db = CollectionManager(str(tmp_path)).get("notes")
+    assert vector_db is not None and len(vector_db.documents) == manifest["num_documents"]
+    with open(manifest_path, encoding="utf-8") as f:
+        assert json.load(f)["embedding_model"] == "stub-embeddings"
+
+def test_private_collections_are_hidden_from_other_owners(manager):
+    add_text(manager, "documents-alice", owner="alice")
+    add_text(manager, "team", text="Shared notes about hybrid search.", file_name="team.txt")
+
+    assert manager.names("alice") == ["documents-alice", "team"]
+    assert manager.names("bob") == ["team"]
+    assert manager.names() == ["team"]
+    assert not manager.accessible("documents-alice", "bob") and not manager.accessible("documents-alice")
+    assert manager.accessible("team", "bob")
+    with pytest.raises(PermissionError):
+        add_text(manager, "documents-alice", owner="bob")
+    assert manager.describe("documents-alice")["shared"] is False
+    assert isinstance(manager.stats()["loaded"], int)
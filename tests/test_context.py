@@ -0,0 +1,17 @@
+from langchain.schema import Document
+from scripts.context import pack_context
+
+def test_pack_context_keeps_ranking_with_missing_scores():
+    # Reranker fallbacks return None scores; the retriever's order must be kept as is
+    retrieved = [(Document(page_content="alpha beta gamma delta epsilon zeta"), None),
+                 (Document(page_content="one two three four five six"), 0.5),
+                 (Document(page_content="red green blue cyan magenta yellow"), None)]
+    context = pack_context(retrieved, "llama3-8b-8192")
+    assert context["items"] == retrieved
+    assert context["chunks"] == [doc.page_content for doc, _ in retrieved]
+
+def test_pack_context_drops_near_duplicates():
+    text = "the quick brown fox jumps over the lazy dog near the river bank"
+    context = pack_context([text, text, "something else entirely different from the rest"], "llama3-8b-8192")
+    assert context["duplicates"] == 1
+    assert len(context["items"]) == 2
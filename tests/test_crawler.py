@@ -0,0 +1,59 @@
+import pytest
+from benchmarks.stubs import StubEmbeddings, static_site_server, use_stub_embeddings
+from scripts.crawler import Crawler, WebIndex
+
+ARTICLE = "Vector databases store embeddings and answer nearest neighbour queries over them. " * 5
+REWRITE = "Search engines combine keyword ranking with dense retrieval to answer questions. " * 5
+
+@pytest.fixture
+def web_index(tmp_path):
+    use_stub_embeddings(StubEmbeddings(call_cost=0.0, text_cost=0.0))
+    return WebIndex(str(tmp_path))
+
+def committed(web_index):
+    return web_index.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+def sources(web_index):
+    return {doc.metadata["source"] for doc in web_index.vector_db.documents.values()}
+
+def test_page_rows_are_committed_with_the_store(web_index, tmp_path):
+    assert web_index.upsert_page("https://a.test/1", "One", ARTICLE) == "added"
+    assert committed(web_index) == 0 and not web_index.needs_fetch("https://a.test/1")
+    web_index.save()
+    assert committed(web_index) == 1
+    assert sources(WebIndex(str(tmp_path))) == {"https://a.test/1"}
+
+def test_duplicate_takes_over_when_the_original_changes(web_index):
+    web_index.upsert_page("https://a.test/1", "One", ARTICLE)
+    assert web_index.upsert_page("https://b.test/copy", "Copy", ARTICLE) == "duplicate"
+    web_index.save()
+
+    assert web_index.upsert_page("https://a.test/1", "One", REWRITE) == "updated"
+    web_index.save()
+    assert sources(web_index) == {"https://a.test/1", "https://b.test/copy"}
+
+def test_duplicate_takes_over_when_the_original_is_removed(web_index):
+    web_index.upsert_page("https://a.test/1", "One", ARTICLE)
+    web_index.upsert_page("https://b.test/copy", "Copy", ARTICLE)
+    assert web_index.remove_page("https://a.test/1")
+    web_index.save()
+    assert sources(web_index) == {"https://b.test/copy"}
+    assert committed(web_index) == 1
+
+    assert web_index.remove_page("https://b.test/copy")
+    web_index.save()
+    assert not web_index.vector_db.documents
+
+def test_recrawl_follows_links_of_fresh_pages(web_index):
+    with static_site_server(num_pages=10) as server:
+        seeds = [server.url("/page/0")]
+        assert Crawler(web_index, delay=0, max_pages=1).crawl(seeds)["added"] == 1
+        stats = Crawler(web_index, delay=0, max_pages=1).crawl(seeds)
+    assert stats["added"] == 1 and not web_index.needs_fetch(server.url("/page/1"))
+
+def test_crawl_of_only_duplicates_commits_their_rows(web_index, tmp_path):
+    with static_site_server(num_pages=10) as server:
+        Crawler(web_index, delay=0, max_pages=1).crawl([server.url("/page/0")])
+        # Page 5 repeats the content of page 0
+        assert Crawler(web_index, delay=0, max_pages=1, max_depth=0).crawl([server.url("/page/5")])["duplicate"] == 1
+    assert not WebIndex(str(tmp_path)).needs_fetch(server.url("/page/5"))
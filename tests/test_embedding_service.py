@@ -0,0 +1,25 @@
+import glob
+import os
+import numpy as np
+import pytest
+from scripts.config import EMBEDDING_MODEL, EMBEDDING_MODEL_DIR
+from scripts.embedding_service import load_embedding_model
+
+TEXTS = [
+    "FAISS indexes dense vectors for similarity search.",
+    "BM25 ranks documents by the terms they share with a query.",
+    "Cross-encoders rerank retrieved passages by reading the query and passage together.",
+    "Streamlit reruns the whole script whenever a widget changes.",
+]
+TOLERANCE = 0.98  # Same default as benchmarks/bench_embedding_backends.py
+
+def test_onnx_int8_embeddings_match_torch():
+    pytest.importorskip("optimum.onnxruntime", reason="optimum[onnxruntime] is not installed")
+    if not EMBEDDING_MODEL_DIR or not glob.glob(os.path.join(EMBEDDING_MODEL_DIR, "onnx", "model_qint8_*.onnx")):
+        pytest.skip("No exported int8 model; set EMBEDDING_MODEL_DIR and run `python -m scripts.embedding_service`")
+
+    vectors = {backend: np.array(load_embedding_model(EMBEDDING_MODEL, backend, EMBEDDING_MODEL_DIR).embed_documents(TEXTS))
+               for backend in ("torch", "onnx_int8")}
+    # Vectors are normalized, so the row-wise dot product is the cosine similarity
+    similarity = (vectors["torch"] * vectors["onnx_int8"]).sum(axis=1)
+    assert similarity.min() >= TOLERANCE
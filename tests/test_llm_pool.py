@@ -0,0 +1,14 @@
+import time
+from scripts.llm_pool import LLMClientPool
+
+def test_clients_in_flight_are_not_evicted_as_idle():
+    pool = LLMClientPool(api_key="stub", idle_timeout=0.01)
+    with pool.acquire("llama3-8b-8192") as llm:
+        time.sleep(0.05)  # A stream running longer than the idle timeout
+        pool.get("gemma2-9b-it")
+        assert not llm.http_client.is_closed and ("llama3-8b-8192", 0) in pool._clients
+
+    time.sleep(0.05)
+    pool.get("gemma2-9b-it")
+    assert llm.http_client.is_closed and ("llama3-8b-8192", 0) not in pool._clients
+    pool.close()
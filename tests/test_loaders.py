@@ -0,0 +1,10 @@
+from benchmarks.stubs import synthetic_pdf
+from scripts import loaders
+
+def test_inline_pdf_extraction_keeps_no_reader_open(tmp_path):
+    path = tmp_path / "notes.pdf"
+    path.write_bytes(synthetic_pdf(3, seed=1))
+
+    pages = list(loaders.iter_pdf_pages(str(path)))
+    assert [number for number, _ in pages] == [1, 2, 3] and all(text for _, text in pages)
+    assert loaders._readers == {}
@@ -0,0 +1,29 @@
+import threading
+import time
+from scripts import scraper
+
+def test_abandoned_downloads_count_against_the_thread_limit(monkeypatch):
+    release, live, peak = threading.Event(), [0], [0]
+    lock = threading.Lock()
+
+    def hanging_download(url, **kwargs):
+        with lock:
+            live[0] += 1
+            peak[0] = max(peak[0], live[0])
+        release.wait(5)
+        with lock:
+            live[0] -= 1
+        return "text"
+
+    monkeypatch.setattr(scraper, "extract_full_article", hanging_download)
+    monkeypatch.setattr(scraper, "_thread_slots", threading.BoundedSemaphore(3))
+    urls = [f"https://example.com/{i}" for i in range(6)]
+
+    start = time.monotonic()
+    results = dict(scraper.extract_articles(urls, max_workers=2, url_timeout=0.1, total_timeout=0.5))
+    # Timed-out threads keep their slots, so only three downloads ever start and the rest wait out the batch
+    assert results == {url: None for url in urls}
+    assert peak[0] == 3 and time.monotonic() - start < 1.0
+
+    release.set()
+    assert scraper._thread_slots.acquire(timeout=1) and scraper._thread_slots.acquire(timeout=1)
@@ -0,0 +1,46 @@
+from benchmarks.stubs import StubChatModel
+from scripts.utils import render_stream, stream_llm
+
+REPLY = "FAISS finds the nearest neighbours of a query vector."
+CHUNKS = ["FAISS is a library for efficient similarity search over dense vectors."]
+
+class RecordingPlaceholder:
+    def __init__(self):
+        self.drawn = []
+
+    def markdown(self, body, unsafe_allow_html=False):
+        self.drawn.append(body)
+
+def test_stream_llm_yields_tokens_in_order_and_times_them():
+    metrics = {}
+    llm = StubChatModel(REPLY, first_token_delay=0.05, token_delay=0.001)
+    tokens = list(stream_llm("What does FAISS do?", CHUNKS, "llama3-8b-8192", metrics=metrics, llm=llm))
+
+    assert tokens[:3] == ["FAISS", " ", "finds"]
+    assert "".join(tokens) == REPLY
+    assert metrics["time_to_first_token"] >= 0.05
+    assert metrics["total_time"] >= metrics["time_to_first_token"] + 0.001 * (len(tokens) - 1)
+    assert metrics["prompt_tokens"] > 0 and "error" not in metrics
+
+def test_render_stream_draws_each_prefix_of_the_answer():
+    placeholder = RecordingPlaceholder()
+    llm = StubChatModel(REPLY)
+    text = render_stream(stream_llm("What does FAISS do?", CHUNKS, "llama3-8b-8192", llm=llm), placeholder,
+                         render=lambda text: f"<p>{text}</p>", interval=0)
+
+    assert text == REPLY
+    assert placeholder.drawn[-1] == f"<p>{REPLY}</p>"
+    drawn = [body[3:-4] for body in placeholder.drawn]
+    assert all(later.startswith(earlier) for earlier, later in zip(drawn, drawn[1:]))
+
+def test_stream_llm_reports_errors_in_metrics():
+    class FailingModel(StubChatModel):
+        def _stream(self, *args, **kwargs):
+            raise RuntimeError("rate limited")
+            yield
+
+    metrics = {}
+    tokens = list(stream_llm("What does FAISS do?", CHUNKS, "llama3-8b-8192", metrics=metrics, llm=FailingModel()))
+    assert tokens == ["❌ Error generating LLM response."]
+    assert metrics["error"] == "rate limited" and metrics["time_to_first_token"] is None
+    assert metrics["total_time"] >= 0
@@ -0,0 +1,63 @@
+import sqlite3
+import numpy as np
+import pytest
+from scripts import vector_store
+from benchmarks.stubs import StubEmbeddings, use_stub_embeddings
+from scripts.vector_store import BM25Index, EmbeddingCache, VectorStore, chunk_hash, create_vector_db
+
+TEXTS = [f"chunk {i} about {topic} with error E-{i % 7} and version v{i % 3}.0" for i, topic in
+         enumerate(["faiss indexes", "python asyncio", "http caching", "bm25 ranking"] * 25)]
+
+def test_incremental_bm25_matches_a_rebuilt_index():
+    index = BM25Index()
+    for start in range(0, len(TEXTS), 7):
+        index.add(list(range(start, min(start + 7, len(TEXTS)))), TEXTS[start:start + 7])
+    index.delete(list(range(0, len(TEXTS), 5)))
+    index.add([3], ["chunk 3 rewritten about faiss indexes"])
+
+    kept = {i: text for i, text in enumerate(TEXTS) if i % 5 and i != 3}
+    rebuilt = BM25Index()
+    rebuilt.add([*kept, 3], [*kept.values(), "chunk 3 rewritten about faiss indexes"])
+
+    queries = ["faiss indexes", "error E-4", "python v2.0"]
+    assert len(index) == len(rebuilt)
+    for got, expected in zip(index.search(queries, 10), rebuilt.search(queries, 10)):
+        assert [doc_id for doc_id, _ in got] == [doc_id for doc_id, _ in expected]
+        assert [score for _, score in got] == pytest.approx([score for _, score in expected], rel=1e-5)
+
+def test_embedding_cache_stores_more_hashes_than_sqlite_parameters(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "test-model")
+    cache.conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)  # The SQLite default before 3.32
+    hashes = [chunk_hash(f"chunk {i}") for i in range(2500)]
+    vectors = np.arange(len(hashes) * 4, dtype="float32").reshape(-1, 4)
+    cache.store(hashes[:1200], vectors[:1200])
+    cache.store(hashes, vectors)  # Some of them are cached already
+    found = cache.lookup(hashes)
+    assert len(found) == len(hashes)
+    np.testing.assert_array_equal(found[hashes[-1]], vectors[-1])
+
+def test_compacting_a_memory_mapped_store_makes_it_writable(tmp_path):
+    use_stub_embeddings(StubEmbeddings(call_cost=0.0, text_cost=0.0))
+    create_vector_db(TEXTS[:20]).save(str(tmp_path))
+    vector_db = VectorStore.load(str(tmp_path), mmap=True)
+    assert vector_db._read_only
+
+    vector_db.delete(list(vector_db.documents)[:5])
+    vector_db.compact()
+    assert not vector_db._read_only and vector_db.index.ntotal == len(vector_db.documents) == 15
+
+def test_deleting_while_compacting_counts_each_tombstone_once(monkeypatch):
+    use_stub_embeddings(StubEmbeddings(call_cost=0.0, text_cost=0.0))
+    vector_db = create_vector_db(TEXTS[:20])
+    ids = list(vector_db.documents)
+    vector_db.delete(ids[:2])
+    build_index = vector_store.build_index
+
+    def build_index_then_delete(*args, **kwargs):
+        index = build_index(*args, **kwargs)
+        vector_db.delete(ids[2:4])  # Lands after the snapshot, before the swap
+        return index
+
+    monkeypatch.setattr(vector_store, "build_index", build_index_then_delete)
+    vector_db.compact()
+    assert vector_db.tombstones == vector_db.index.ntotal - len(vector_db.documents) == 2